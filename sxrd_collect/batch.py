@@ -0,0 +1,191 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Headless batch runner executing a collection plan file through the measurement functions, without Qt. The plan is a
+JSON file with the experiment setups, sample points and their states (see SxrdModel.to_dict) and the file settings:
+
+    {"filepath": "/DATA/...", "basename": "sample1", "point_number": 1,
+     "setups": [{"name": "E1", "detector_pos_x": 0, "detector_pos_z": 49, "omega_start": -110, "omega_end": -70,
+                 "omega_step": 1, "time_per_step": 1}],
+     "points": [{"name": "P1", "x": 0.1, "y": -0.2, "z": 0, "states": {"E1": ["still", "wide", "step"]}}]}
+
+Without "basename" the current file name and number of the detector are kept (auto increment), otherwise the
+frames are named like the "rename files" option of the GUI. Progress is written to stdout as text or, with --json, as
+one JSON object per line. Ctrl-C finishes the running acquisition and stops.
+
+Usage (from the sxrd_collect folder): python -m batch plan.json [--json] [--simulate TIME_SCALE]
+"""
+__author__ = 'Clemens Prescher'
+
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+
+import timing
+import pv_registry
+from pv import caput, caget
+from models import SxrdModel
+from plan import create_plan, AXES, STILL, FILENAME_SUFFICES
+from config import epics_config, collection_config
+from measurement import collect_acquisition, check_conditions, check_omega_in_limits
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRunner(object):
+    """
+    :param plan: dictionary as read from the plan file
+    :param output: file the progress is written to
+    :param json_output: whether to write the progress as JSON lines instead of text
+    """
+
+    def __init__(self, plan, output=sys.stdout, json_output=False):
+        self.plan = plan
+        self.model = SxrdModel.from_dict(plan)
+        self.output = output
+        self.json_output = json_output
+        self.aborted = False
+        self.failed = False
+
+    def abort(self, *args):
+        self.aborted = True
+
+    def is_running(self):
+        return not self.aborted
+
+    def run(self):
+        """
+        Collects all acquisitions of the plan.
+        :return: number of collected acquisitions
+        """
+        t_start = time.time()
+        pv_registry.connect()
+        skip_setups = [ind for ind, setup in enumerate(self.model.experiment_setups)
+                       if not (check_omega_in_limits(setup.omega_start) and check_omega_in_limits(setup.omega_end))]
+        for ind in skip_setups:
+            self.emit('skipped', setup=self.model.experiment_setups[ind].name, reason='omega out of limits')
+
+        start_positions = dict((axis, pv_registry.get(epics_config[axis])) for axis in AXES)
+        velocities = dict((axis, pv_registry.get(epics_config[axis] + '.VELO') or 1.0) for axis in AXES)
+        acquisitions, report = create_plan(self.model, start_positions, velocities, skip_setups=skip_setups,
+                                           optimize=collection_config['OPTIMIZE COLLECTION ORDER'],
+                                           point_order=collection_config['SAMPLE POINT ORDER'])
+        self.emit('plan', acquisitions=len(acquisitions), motion_time=report.optimized_motion_time)
+
+        previous_shutter_mode = caget(epics_config['detector_control'] + ':ShutterMode')
+        collected = 0
+        try:
+            for ind, acquisition in enumerate(acquisitions):
+                if self.aborted:
+                    self.emit('aborted', index=ind)
+                    break
+                if acquisition.scan_type != STILL and not check_conditions():
+                    self.emit('error', index=ind, message='mirrors and microscope are not in the right positions')
+                    self.failed = True
+                    break
+
+                self.set_filename(acquisition)
+                self.emit('start', index=ind, total=len(acquisitions), scan_type=acquisition.scan_type,
+                          point=acquisition.sample_point.name, setup=acquisition.experiment_setup.name)
+                t1 = time.time()
+                timing.set_context(scan_type=acquisition.scan_type, point=acquisition.sample_point.name,
+                                   setup=acquisition.experiment_setup.name)
+                try:
+                    with timing.span('acquisition', exposure=acquisition.exposure_time,
+                                     frames=acquisition.num_frames,
+                                     detector_x=acquisition.experiment_setup.detector_pos_x,
+                                     detector_z=acquisition.experiment_setup.detector_pos_z):
+                        collect_acquisition(acquisition, callback_fcn=self.is_running)
+                except Exception as e:
+                    # like in the GUI, the remaining acquisitions are skipped after a failed one
+                    logger.exception('Acquisition {} failed.'.format(ind))
+                    self.emit('error', index=ind, message=str(e))
+                    self.failed = True
+                    break
+                collected += 1
+                self.emit('done', index=ind, total=len(acquisitions), duration=time.time() - t1)
+        finally:
+            timing.set_context()
+            timing.recorder.flush(collection_config['TIMING FOLDER'])
+            caput(epics_config['detector_control'] + ':ShutterMode', previous_shutter_mode, wait=True)
+
+        self.emit('finished', collected=collected, wall_time=time.time() - t_start)
+        return collected
+
+    def set_filename(self, acquisition):
+        if 'filepath' in self.plan:
+            caput(epics_config['detector_file'] + ':FilePath', str(self.plan['filepath']))
+        if 'basename' in self.plan:
+            filename = '{}_{}_P{}_{}{}'.format(self.plan['basename'], acquisition.sample_point.name,
+                                               self.plan.get('point_number', 1), acquisition.experiment_setup.name,
+                                               FILENAME_SUFFICES[acquisition.scan_type])
+            caput(epics_config['detector_file'] + ':FileName', str(filename))
+            caput(epics_config['detector_file'] + ':FileNumber', 1)
+
+    def emit(self, event, **values):
+        values['event'] = event
+        values['time'] = time.time()
+        if self.json_output:
+            self.output.write(json.dumps(values) + '\n')
+        else:
+            details = ', '.join('{}: {}'.format(key, format_value(values[key])) for key in sorted(values)
+                                if key not in ('event', 'time'))
+            self.output.write('{} {:9s} {}\n'.format(time.strftime('%H:%M:%S'), event, details))
+        self.output.flush()
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return '{:.2f}'.format(value)
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Runs a collection plan file without the GUI')
+    parser.add_argument('plan', help='JSON plan file')
+    parser.add_argument('--json', action='store_true', help='write the progress as JSON lines')
+    parser.add_argument('--simulate', type=float, metavar='TIME_SCALE',
+                        help='run against the simulated beamline with the given time scale')
+    parser.add_argument('--verbose', action='store_true', help='log the collection details to stderr')
+    args = parser.parse_args(argv)
+
+    with open(args.plan) as fp:
+        plan = json.load(fp)
+
+    runner = BatchRunner(plan, json_output=args.json)
+    signal.signal(signal.SIGINT, runner.abort)
+    # measurement configures the root logger for the GUI
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    if args.simulate is None:
+        collected = runner.run()
+    else:
+        from simulation.beamline import SimulatedBeamline
+        with SimulatedBeamline(time_scale=args.simulate):
+            collected = runner.run()
+    # a failed acquisition is reported by the exit status, e.g. for scripts running several plans
+    if runner.failed:
+        sys.exit(1)
+    return collected
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
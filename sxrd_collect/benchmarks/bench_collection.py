@@ -0,0 +1,157 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+End-to-end benchmark of the collection overhead. Still, wide, step and map (grid of stills) collections are run
+through the measurement functions against the simulated beamline (simulation.beamline), reporting per scenario:
+
+    wall time           time from calling the measurement function until it returned
+    exposure time       requested exposure, i.e. the useful part of the wall time
+    motion time         time in which at least one motor was moving
+    detector dead time  wall time in which the detector was not exposing
+    overhead per frame  (wall time - exposure time) / number of frames
+    efficiency          exposure time / wall time
+
+The results are printed and written as JSON (--output) for comparing runs across code changes. All times are given
+in beamline seconds, i.e. the measured times divided by the time scale of the simulation. Delays in the program
+which are not scaled (e.g. fixed sleeps) therefore count time_scale^-1 times, use the default time scale of 1 for
+numbers comparable to the beamline.
+
+Run from the sxrd_collect folder with: python -m benchmarks.bench_collection [--output results.json]
+"""
+__author__ = 'Clemens Prescher'
+
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+import measurement
+from pv import caput
+from duty_cycle import get_union_time
+from config import epics_config
+from simulation.beamline import SimulatedBeamline
+
+# the simulated detector starts at 0, so the scenarios measure the sample motion only
+DETECTOR_X = 0
+DETECTOR_Z = 0
+
+
+def run_still(exposure_time, num_frames):
+    for _ in range(num_frames):
+        measurement.collect_single_data(DETECTOR_X, DETECTOR_Z, exposure_time, 0.5, 0.5, 0.5, -90)
+    return num_frames
+
+
+def run_wide(exposure_time, num_frames):
+    for _ in range(num_frames):
+        measurement.collect_wide_data(DETECTOR_X, DETECTOR_Z, -110, -70, exposure_time, 0.5, 0.5, 0.5)
+    return num_frames
+
+
+def run_step(exposure_time, num_frames):
+    measurement.collect_step_data(DETECTOR_X, DETECTOR_Z, -110, -110 + num_frames, 1.0, exposure_time,
+                                  0.5, 0.5, 0.5)
+    return num_frames
+
+
+def run_map(exposure_time, num_frames):
+    """stills on a square grid with 0.1 mm spacing and num_frames points"""
+    size = max(int(round(num_frames ** 0.5)), 1)
+    for row in range(size):
+        for column in range(size):
+            measurement.collect_single_data(DETECTOR_X, DETECTOR_Z, exposure_time, 0.1 * column, 0.1 * row, 0, -90)
+    return size * size
+
+
+SCENARIOS = [('still', run_still), ('wide', run_wide), ('step', run_step), ('map', run_map)]
+
+
+def run_scenario(name, scenario_fcn, exposure_time, num_frames, time_scale):
+    folder = tempfile.mkdtemp()
+    try:
+        with SimulatedBeamline(time_scale=time_scale, data_folder=folder) as beamline:
+            caput(epics_config['detector_file'] + ':FileName', name)
+            caput(epics_config['detector_file'] + ':FileNumber', 1)
+            simulator = beamline.epics
+            t1 = time.time()
+            num_frames = scenario_fcn(exposure_time, num_frames)
+            t2 = time.time()
+    finally:
+        shutil.rmtree(folder)
+
+    def clip(intervals):
+        return [(max(start, t1), min(end, t2)) for start, end in intervals if end > t1 and start < t2]
+
+    motion_intervals = []
+    for motor in simulator.motors.values():
+        motion_intervals.extend(clip(motor.moves))
+    scale = time_scale if time_scale > 0 else 1.0
+    wall_time = (t2 - t1) / scale
+    exposure = exposure_time * num_frames
+    return {'scenario': name,
+            'frames': num_frames,
+            'wall_time': wall_time,
+            'exposure_time': exposure,
+            'motion_time': get_union_time(motion_intervals) / scale,
+            'detector_dead_time': wall_time - get_union_time(clip(simulator.detector.exposures)) / scale,
+            'overhead_per_frame': (wall_time - exposure) / num_frames,
+            'efficiency': exposure / wall_time}
+
+
+def print_results(results):
+    print('{:8s} {:>6s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s} {:>10s}'.format(
+        'scenario', 'frames', 'wall [s]', 'expo [s]', 'motion [s]', 'dead [s]', 'ovh/frame', 'efficiency'))
+    for result in results:
+        print('{scenario:8s} {frames:6d} {wall_time:10.2f} {exposure_time:10.2f} {motion_time:10.2f} '
+              '{detector_dead_time:10.2f} {overhead_per_frame:10.2f} {efficiency:10.1%}'.format(**result))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end collection overhead benchmark on simulated hardware')
+    parser.add_argument('--scenarios', nargs='+', default=[name for name, _ in SCENARIOS],
+                        choices=[name for name, _ in SCENARIOS])
+    parser.add_argument('--exposure', type=float, default=1.0, help='exposure time per frame in s')
+    parser.add_argument('--frames', type=int, default=4, help='number of frames (map: grid points) per scenario')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='factor applied to simulated motion and detector durations')
+    parser.add_argument('--label', default='', help='free text stored with the results, e.g. the git revision')
+    parser.add_argument('--output', help='JSON file for the results')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    results = []
+    for name, scenario_fcn in SCENARIOS:
+        if name in args.scenarios:
+            results.append(run_scenario(name, scenario_fcn, args.exposure, args.frames, args.time_scale))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump({'label': args.label,
+                       'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'exposure': args.exposure,
+                       'time_scale': args.time_scale,
+                       'results': results}, fp, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
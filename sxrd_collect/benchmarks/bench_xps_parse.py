@@ -0,0 +1,69 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Compares the typed reply parser of the XPS driver with the previous getter implementation (character loop and eval
+of every value) for typical getter replies.
+
+Run from the sxrd_collect folder with: python -m benchmarks.bench_xps_parse
+"""
+__author__ = 'Clemens Prescher'
+
+import time
+
+from xps_trajectory.XPS_C8_drivers import get_return_types, parse_reply
+
+REPLIES = [
+    ('GatheringCurrentNumberGet(int *,int *)', '1234,1000000'),
+    ('GroupPositionCurrentGet(G1,double *,double *,double *,double *)',
+     '0.0123456789,-1.2345678901,2.5,-90.000012345'),
+    ('PositionerMaximumVelocityAndAccelerationGet(G1.OM,double *,double *)', '20,80'),
+    ('PositionerCorrectorPIDFFVelocityGet(G1.OM,bool *,double *,double *,double *,double *,double *,double *,'
+     'double *,double *,double *,double *,double *)', '1,0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,1.0,1.1'),
+]
+
+
+def parse_reply_eval(returned_string, num_values):
+    i, j, retList = 0, 0, [0]
+    for paramNb in range(num_values):
+        while ((i+j) < len(returned_string) and returned_string[i+j] != ','):
+            j += 1
+        retList.append(eval(returned_string[i:i+j]))
+        i, j = i+j+1, 0
+    return retList
+
+
+def time_parse(parse_fcn, repeats):
+    t1 = time.time()
+    for _ in range(repeats):
+        for command, reply in REPLIES:
+            parse_fcn(command, reply)
+    return time.time() - t1
+
+
+def main(repeats=20000):
+    old_time = time_parse(lambda command, reply: parse_reply_eval(reply, command.count('*')), repeats)
+    new_time = time_parse(lambda command, reply: parse_reply(reply, get_return_types(command)), repeats)
+    num_replies = repeats * len(REPLIES)
+    print('Parsed {} getter replies'.format(num_replies))
+    print('  character loop and eval: {:10.0f} replies/s'.format(num_replies / old_time))
+    print('  typed parser:            {:10.0f} replies/s'.format(num_replies / new_time))
+    print('  speed-up:                {:10.1f} x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
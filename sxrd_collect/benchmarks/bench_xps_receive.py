@@ -0,0 +1,73 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Compares the receive path of the XPS driver with the previous implementation (1024 byte recv, string concatenation
+and a search of the whole buffer for the terminator after every piece) for a 1 MB gathering reply.
+
+Run from the sxrd_collect folder with: python -m benchmarks.bench_xps_receive
+"""
+__author__ = 'Clemens Prescher'
+
+import socket
+import time
+from threading import Thread
+
+from xps_trajectory.XPS_C8_drivers import receive_reply, split_reply, REPLY_TERMINATOR
+
+
+def receive_reply_concatenating(sock):
+    ret = sock.recv(1024)
+    while ret.find(REPLY_TERMINATOR) == -1:
+        ret += sock.recv(1024)
+    return ret
+
+
+def create_gathering_reply(size):
+    line = '1.23456789012;-0.0001234567;12.3456789012;0.000123456789\n'
+    return '0,' + line * (size // len(line)) + REPLY_TERMINATOR
+
+
+def time_receive(receive_fcn, reply, repeats=5):
+    times = []
+    for _ in range(repeats):
+        sender_sock, receiver_sock = socket.socketpair()
+        sender = Thread(target=sender_sock.sendall, args=(reply,))
+        sender.start()
+        t1 = time.time()
+        received = receive_fcn(receiver_sock)
+        times.append(time.time() - t1)
+        sender.join()
+        sender_sock.close()
+        receiver_sock.close()
+        assert received == reply
+    return min(times)
+
+
+def main():
+    reply = create_gathering_reply(1024 * 1024)
+    old_time = time_receive(receive_reply_concatenating, reply)
+    new_time = time_receive(receive_reply, reply)
+    error, data = split_reply(reply)
+    print('Received {:.1f} MB gathering reply ({} lines)'.format(len(reply) / 1024. ** 2, data.count('\n')))
+    print('  string concatenation: {:8.2f} ms'.format(old_time * 1000))
+    print('  bytearray recv_into:  {:8.2f} ms'.format(new_time * 1000))
+    print('  speed-up:             {:8.1f} x'.format(old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
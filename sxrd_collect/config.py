@@ -3,6 +3,7 @@ __author__ = 'Clemens Prescher'
 xps_config = {
     'HOST': '164.54.160.34',
     'PORT': 5001,
+    'FTP PORT': 21,
     'TIMEOUT': 10,
     'GROUP NAME': 'G1',
     'POSITIONERS': "STX STZ STY OM",
@@ -13,6 +14,15 @@ xps_config = {
     'GATHER OUTPUTS': ('CurrentPosition', 'FollowingError',
                        'SetpointPosition', 'CurrentVelocity'),
     'DEFAULT ACCEL': [2, 2, 2, 2],
+    # gathering data of each scan is saved as <frame name>.npz in this folder, relative to the detector FilePath mapped
+    # to the local FILEPATH like in the GUI
+    'GATHER FOLDER': 'gather',
+    'TRAJECTORY CACHE SIZE': 50,  # number of content named trajectory files kept in TRAJ_FOLDER
+    # send batches of XPS commands back to back instead of waiting for every reply, only verified with the simulator
+    # (simulation.xps_simulator) so far, enable it after it has been verified on the XPS-C8
+    'PIPELINE COMMANDS': False,
+    'GATHER REPLY LIMIT': 65536,  # maximum size in bytes of a reply of the XPS
+    'GATHER BYTES PER VALUE': 25,  # maximum size in bytes of a gathered value including the separator
 }
 
 epics_config = {
@@ -26,4 +36,31 @@ epics_config = {
     'sample_position_omega': '13IDD:m96',
 }
 
+collection_config = {
+    'CONTINUOUS STEP SCAN': False,  # run step scans as a single externally triggering XPS trajectory
+    'PIPELINED STEP SCAN': True,  # move to the next step while the detector still corrects and writes the frame
+    'DETECTOR READOUT TIME': 3.0,  # time in s between two frames of a continuous step scan
+    # time in s added to exposure and readout time before waiting for the detector is given up
+    'DETECTOR TIMEOUT MARGIN': 30.0,
+    # MarCCD trigger mode in which every frame is started by the XPS trajectory pulse, 'Timed' would use the internal
+    # timer of the detector instead
+    'DETECTOR TRIGGER MODE': 'Frame',
+    # groups of epics_config motor names which must not move at the same time, e.g.
+    # [('detector_position_x', 'detector_position_z')], all other motors are moved simultaneously
+    'SERIALIZED AXES': [],
+    # maximum time in s a motor move may take and the number of readback update intervals the readback has to stay at
+    # rest within the retry deadband before the move counts as settled, given per epics_config motor name or as default
+    'MOTION TIMEOUT': {'default': 120, 'detector_position_x': 300, 'detector_position_z': 300},
+    'MOTION SETTLE READBACKS': {'default': 2},
+    # batch experiment setups by detector position and chain their omega ranges instead of using the table order
+    'OPTIMIZE COLLECTION ORDER': True,
+    # visiting order of the sample points when optimizing: 'table', 'serpentine' (grids), 'shortest path' or 'auto'
+    'SAMPLE POINT ORDER': 'auto',
+    'PV BACKEND': 'epics',  # 'epics' for the beamline or 'simulation' for the in-process simulator
+    'TIMING FOLDER': 'timing',  # the timing spans of every collection are written to this folder as CSV and JSON
+    'STARTUP BUDGET': 1.0,  # s until the main window is shown, a warning is logged when the startup is slower
+    # time in s the program waits on quitting for the running acquisition to abort and the state to be restored
+    'QUIT TIMEOUT': 30,
+}
+
 FILEPATH = 'T:/dac_user/2016/IDD_2016-1'
\ No newline at end of file
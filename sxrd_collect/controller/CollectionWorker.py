@@ -0,0 +1,107 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import time
+import logging
+import Queue
+
+from PyQt4 import QtCore
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionWorker(QtCore.QThread):
+    """
+    Long-lived thread running the collection jobs of the GUI one after the other. Jobs are queued with submit() and
+    report through the signals, which are delivered to the slots in the GUI thread:
+
+        job_started(name)
+        progress(name, value)  - emitted by the running job with report_progress()
+        job_finished(name, result)
+        job_failed(name, message)  - the job raised, message is the exception text
+        idle()  - the last queued job has finished
+    """
+    job_started = QtCore.pyqtSignal(str)
+    progress = QtCore.pyqtSignal(str, object)
+    job_finished = QtCore.pyqtSignal(str, object)
+    job_failed = QtCore.pyqtSignal(str, str)
+    idle = QtCore.pyqtSignal()
+
+    def __init__(self):
+        super(CollectionWorker, self).__init__()
+        self._queue = Queue.Queue()
+        self._current_name = None
+
+    def submit(self, name, fcn, *args, **kwargs):
+        """queues fcn(*args, **kwargs), the worker thread is started if it is not running yet"""
+        self._queue.put((name, fcn, args, kwargs))
+        if not self.isRunning():
+            self.start()
+
+    def cancel_pending(self, names=None):
+        """
+        removes queued jobs which have not been started, returns their number
+        :param names: only jobs with one of these names are removed, all jobs if None
+        """
+        with self._queue.mutex:
+            jobs = list(self._queue.queue)
+            # a pending stop request is always kept
+            kept = [job for job in jobs if job is None or (names is not None and job[0] not in names)]
+            self._queue.queue.clear()
+            self._queue.queue.extend(kept)
+        return len(jobs) - len(kept)
+
+    def is_busy(self):
+        return self._current_name is not None or not self._queue.empty()
+
+    def report_progress(self, value):
+        """emits the progress signal for the running job, to be called from within the job"""
+        self.progress.emit(self._current_name, value)
+
+    def stop(self, timeout=None):
+        """
+        Stops the thread after the running and the queued jobs have finished, use cancel_pending to skip queued jobs.
+        :param timeout: maximum time in s to wait for the thread, waits without limit if None
+        :return: True if the thread has stopped
+        """
+        self._queue.put(None)
+        if timeout is None:
+            return self.wait()
+        return self.wait(int(timeout * 1000))
+
+    def run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            name, fcn, args, kwargs = job
+            self._current_name = name
+            self.job_started.emit(name)
+            t1 = time.time()
+            try:
+                result = fcn(*args, **kwargs)
+            except Exception as e:
+                logger.exception('Job {} failed after {:.2f} s.'.format(name, time.time() - t1))
+                self._current_name = None
+                self.job_failed.emit(name, str(e))
+            else:
+                self._current_name = None
+                self.job_finished.emit(name, result)
+            if self._queue.empty():
+                self.idle.emit()
@@ -23,19 +23,25 @@ import time
 from threading import Thread
 import logging
 
-from epics import caget, caput, camonitor
+from pv import caget, caput, camonitor, ChannelAccessException
 
 import os.path
-import epics
 import subprocess
 
 from PyQt4 import QtGui, QtCore
 
-from config import epics_config, FILEPATH
+from config import epics_config, collection_config, FILEPATH
 from views.MainView import MainView
+from controller.CollectionWorker import CollectionWorker
 from models import SxrdModel
-from measurement import move_to_sample_pos, collect_step_data, collect_wide_data, collect_background
-from measurement import collect_single_data
+from startup import lazy_import
+import timing
+import pv_registry
+
+# numpy, the XPS driver and the measurement functions are imported on first use, so that the window shows up at once
+measurement = lazy_import('measurement')
+plan = lazy_import('plan')
+estimator = lazy_import('estimator')
 
 
 
@@ -51,9 +57,10 @@ class MainController(object):
         self.connect_buttons()
         self.connect_tables()
         self.connect_txt()
-        self.populate_filename()
+        self.populate_filename(('', 'test', 0))
         self.connect_checkboxes()
         self.abort_collection = False
+        self.overhead_model = None  # the default overheads are used until the fitted ones are loaded
         self.logging_handler = InfoLoggingHandler(self.update_status_txt)
         logger.addHandler(self.logging_handler)
 
@@ -66,6 +73,37 @@ class MainController(object):
         # self.filename_update_timer.timeout.connect(self.set_example_lbl)
         # self.filename_update_timer.start(1000)
 
+        # the collection runs in its own thread, which reports back through Qt signals
+        self.collection_worker = CollectionWorker()
+        self.collection_worker.progress.connect(self.collection_progress)
+        self.collection_worker.job_finished.connect(self.collection_job_finished)
+        self.collection_worker.job_failed.connect(self.collection_job_failed)
+        QtGui.QApplication.instance().aboutToQuit.connect(self.stop_collection_worker)
+
+        # the window is already shown, connecting the PVs and importing the measurement code happens in the background
+        self.widget.collect_btn.setEnabled(False)
+        self.widget.collect_bkg_btn.setEnabled(False)
+        self.background_loader = BackgroundLoader(self.load_in_background)
+        self.background_loader.finished.connect(self.background_loading_finished)
+        QtCore.QTimer.singleShot(0, self.background_loader.start)
+
+    @staticmethod
+    def load_in_background():
+        pv_registry.connect()
+        filename_info = MainController.get_filename_info()
+        overhead_model = estimator.load_overhead_model(collection_config['TIMING FOLDER'])
+        measurement.load()
+        return filename_info, overhead_model
+
+    def background_loading_finished(self, result):
+        if result is None:
+            logger.warning('Could not connect to the detector file plugin, please check the EPICS connection.')
+        else:
+            filename_info, self.overhead_model = result
+            self.populate_filename(filename_info)
+        self.widget.collect_btn.setEnabled(True)
+        self.widget.collect_bkg_btn.setEnabled(True)
+
 
     def connect_checkboxes(self):
         self.widget.no_suffices_cb.clicked.connect(lambda: self.update_cb('no_suffices'))
@@ -147,8 +185,14 @@ class MainController(object):
         self.widget.status_txt.textChanged.connect(self.update_status_txt_scrollbar)
         self.widget.status_txt.verticalScrollBar().valueChanged.connect(self.update_status_txt_scrollbar_value)
 
-    def populate_filename(self):
-        self.prev_filepath, self.prev_filename, self.prev_file_number = self.get_filename_info()
+    def populate_filename(self, filename_info=None):
+        """
+        :param filename_info: (path, filename, file_number) as returned by get_filename_info, read from the detector
+                              if None
+        """
+        if filename_info is None:
+            filename_info = self.get_filename_info()
+        self.prev_filepath, self.prev_filename, self.prev_file_number = filename_info
 
         self.filepath = self.prev_filepath
         self.basename = self.prev_filename
@@ -412,7 +456,7 @@ class MainController(object):
 
     def move_sample_btn_clicked(self, ind):
         x, y, z = self.widget.get_sample_point_values(ind)
-        move_to_sample_pos(x, y, z)
+        measurement.move_to_sample_pos(x, y, z)
 
     def set_sample_btn_clicked(self, ind):
         x, y, z = self.get_current_sample_position()
@@ -498,13 +542,13 @@ class MainController(object):
 
     def set_total_frames(self):
         nr = self.frame_counter()
-        tm = self.estimate_collection_time(epics_config)
+        estimate = self.estimate_collection_time()
         if nr == 0:
             self.widget.total_frames_txt.setText(' ')
         elif nr == 1:
-            self.widget.total_frames_txt.setText(str(nr) + ' image' + "\n" + str(int(tm)) + ' s')
+            self.widget.total_frames_txt.setText(str(nr) + ' image' + "\n" + str(estimate))
         else:
-            self.widget.total_frames_txt.setText(str(nr) + ' images' + "\n" + str(int(tm)) + ' s')
+            self.widget.total_frames_txt.setText(str(nr) + ' images' + "\n" + str(estimate))
 
     def set_example_lbl(self):
         no_exp = False
@@ -538,7 +582,7 @@ class MainController(object):
                 if no_exp:
                     example_str = self.filepath + '/' + self.basename + '_' + 'S1_P1_E1_s_001'
         else:
-            example_str = self.filepath + '/' + caget(epics_config['detector_file'] + ':FileName', as_string=True)+'_'+str('%03d' %caget(epics_config['detector_file'] + ':FileNumber'))
+            example_str = self.filepath + '/' + pv_registry.get(epics_config['detector_file'] + ':FileName', as_string=True)+'_'+str('%03d' %pv_registry.get(epics_config['detector_file'] + ':FileNumber'))
             if example_str is None:
                 example_str = self.filepath + '/None'
 
@@ -571,9 +615,8 @@ class MainController(object):
 
     def collect_bkg_data(self):
         self.set_status_lbl("Collecting", "#FF0000")
-        QtGui.QApplication.processEvents()
-        collect_background()
-        self.set_status_lbl("Finished", "#00FF00")
+        self.widget.collect_bkg_btn.setEnabled(False)
+        self.collection_worker.submit('background', measurement.collect_background)
 
     def collect_data(self):
 
@@ -611,8 +654,9 @@ class MainController(object):
         else:
             self.set_status_lbl("Collecting" + "\n" + str(nr) + ' images', "#FF0000")
 
-        # save current state to be able to restore after the measurement when the checkboxes are selected.
-        previous_filepath, previous_filename, previous_filenumber = self.get_filename_info()
+        # save current state to be able to restore after the measurement when the checkboxes are selected. The values
+        # are read with caget, a monitor of the registry which is not connected (anymore) would restore a stale value
+        previous_filepath, previous_filename, previous_filenumber = self.get_filename_info(use_cache=False)
         previous_exposure_time = caget(epics_config['detector_control'] + ':AcquireTime')
         previous_detector_pos_x = caget(epics_config['detector_position_x'])
         previous_detector_pos_z = caget(epics_config['detector_position_z'])
@@ -624,187 +668,77 @@ class MainController(object):
         self.widget.collect_btn.setText('Abort')
         self.widget.collect_btn.clicked.disconnect(self.collect_data)
         self.widget.collect_btn.clicked.connect(self.abort_data_collection)
+        self.widget.collect_bkg_btn.setEnabled(False)
         self.widget.status_txt.clear()
-        QtGui.QApplication.processEvents()
 
+        skip_setups = []
         for exp_ind, experiment in enumerate(self.model.experiment_setups):
             if not (self.check_omega_in_limits(experiment.omega_start) and
                     self.check_omega_in_limits(experiment.omega_end)):
                 self.show_error_message_box('Experiment starting and/or end angle are out of epics limits'
                                             'Please adjust either of them!')
-                continue
-
-            for sample_point in self.model.sample_points:
-
-                if sample_point.perform_still_for_setup[exp_ind]:
-                    if self.widget.rename_files_cb.isChecked():
-                        point_number = str(self.widget.point_txt.text())
-                        filename = self.basename + '_' + sample_point.name + '_P' + point_number + '_' + \
-                                   experiment.name
-                        filenumber = 1
-
-                    elif self.widget.no_suffices_cb.isChecked():
-                        filename = self.basename
-                        _, _, filenumber = self.get_filename_info()
-
-                    else:
-                        _, filename, filenumber = self.get_filename_info()
-
-                    caput(epics_config['detector_file'] + ':FilePath', str(self.filepath))
-                    caput(epics_config['detector_file'] + ':FileName', str(filename))
-                    caput(epics_config['detector_file'] + ':FileNumber', filenumber)
-
-                    logger.info("Performing still image for:\n\t\t{}\n\t\t{}".format(sample_point, experiment))
-                    exposure_time = abs(experiment.omega_end - experiment.omega_start) / experiment.omega_step * \
-                                        experiment.time_per_step
-
-                    collect_single_data_thread = Thread(target=collect_single_data,
-                                                        kwargs={"detector_position_x": experiment.detector_pos_x,
-                                                                "detector_position_z": experiment.detector_pos_z,
-                                                                "exposure_time": abs(exposure_time),
-                                                                "x": sample_point.x,
-                                                                "y": sample_point.y,
-                                                                "z": sample_point.z,
-                                                                "omega": -90.0
-                                                               }
-                                                        )
-                    collect_single_data_thread.start()
-
-                    while collect_single_data_thread.isAlive():
-                        QtGui.QApplication.processEvents()
-                        time.sleep(.2)
-
-                if not self.check_if_aborted():
-                    break
-
-                if sample_point.perform_wide_scan_for_setup[exp_ind]:
-
-                    # check if all motor positions are in a correct position
-                    if self.check_conditions() is False:
-                        self.show_error_message_box('Please Move mirrors and microscope in the right positions!')
-                        return
-
-                    if self.widget.rename_files_cb.isChecked():
-                        point_number = str(self.widget.point_txt.text())
-                        filename = self.basename + '_' + sample_point.name + '_P' + point_number + '_' + \
-                                   experiment.name + '_w'
-                        filenumber = 1
-
-                    elif self.widget.no_suffices_cb.isChecked():
-                        filename = self.basename
-                        _, _, filenumber = self.get_filename_info()
-
-                    else:
-                        _, filename, filenumber = self.get_filename_info()
-
-                    caput(epics_config['detector_file'] + ':FilePath', str(self.filepath))
-                    caput(epics_config['detector_file'] + ':FileName', str(filename))
-                    caput(epics_config['detector_file'] + ':FileNumber', filenumber)
-
-                    logger.info("Performing wide scan for:\n\t\t{}\n\t\t{}".format(sample_point, experiment))
-                    exposure_time = abs(experiment.omega_end - experiment.omega_start) / experiment.omega_step * \
-                                    experiment.time_per_step
-
-                    collect_wide_data_thread = Thread(target=collect_wide_data,
-                                                      kwargs={"detector_position_x": experiment.detector_pos_x,
-                                                              "detector_position_z": experiment.detector_pos_z,
-                                                              "omega_start": experiment.omega_start,
-                                                              "omega_end": experiment.omega_end,
-                                                              "exposure_time": abs(exposure_time),
-                                                              "x": sample_point.x,
-                                                              "y": sample_point.y,
-                                                              "z": sample_point.z
-                                                              }
-                                                      )
-                    collect_wide_data_thread.start()
-
-                    while collect_wide_data_thread.isAlive():
-                        QtGui.QApplication.processEvents()
-                        time.sleep(.2)
-
-                    time.sleep(.2)
-
-                if not self.check_if_aborted():
-                    break
-
-                if sample_point.perform_step_scan_for_setup[exp_ind]:
-
-                    # check if all motor positions are in a correct position
-                    if self.check_conditions() is False:
-                        self.show_error_message_box('Please Move mirrors and microscope in the right positions!')
-                        return
-
-                    if self.widget.rename_files_cb.isChecked():
-                        point_number = str(self.widget.point_txt.text())
-                        filename = self.basename + '_' + sample_point.name + '_P' + point_number + '_' + \
-                                   experiment.name + '_s'
-                        print filename
-                        filenumber = 1
-
-                    elif self.widget.no_suffices_cb.isChecked():
-                        filename = self.basename
-                        _, _, filenumber = self.get_filename_info()
-
-                    else:
-                        _, filename, filenumber = self.get_filename_info()
-
-                    caput(epics_config['detector_file'] + ':FilePath', str(self.filepath))
-                    caput(epics_config['detector_file'] + ':FileName', str(filename))
-                    caput(epics_config['detector_file'] + ':FileNumber', filenumber)
-
-                    logger.info("Performing step scan for:\n\t\t{}\n\t\t{}".format(sample_point, experiment))
-
-                    collect_step_data_thread = Thread(target=collect_step_data,
-                                                      kwargs={"detector_position_x": experiment.detector_pos_x,
-                                                              "detector_position_z": experiment.detector_pos_z,
-                                                              "omega_start": experiment.omega_start,
-                                                              "omega_end": experiment.omega_end,
-                                                              "omega_step": experiment.omega_step,
-                                                              "exposure_time": experiment.time_per_step,
-                                                              "x": sample_point.x,
-                                                              "y": sample_point.y,
-                                                              "z": sample_point.z,
-                                                              "callback_fcn": self.check_if_aborted,
-                                                              "collect_bkg_flag":
-                                                                  bool(self.widget.auto_bkg_cb.isChecked())})
-                    collect_step_data_thread.start()
-
-                    while collect_step_data_thread.isAlive():
-                        QtGui.QApplication.processEvents()
-                        time.sleep(0.2)
-
-                if not self.check_if_aborted():
-                    break
-
-                #print filename
-                
-        caput(epics_config['detector_control'] + ':AcquireTime', previous_exposure_time)
-
-        # move to previous detector position:
-        if self.widget.reset_detector_position_cb.isChecked():
-            caput(epics_config['detector_position_x'], previous_detector_pos_x, wait=True, timeout=300)
-            caput(epics_config['detector_position_z'], previous_detector_pos_z, wait=True, timeout=300)
-
-        # move to previous sample position
-        if self.widget.reset_sample_position_cb.isChecked():
-            caput(epics_config['sample_position_omega'], previous_omega_pos)
-            move_to_sample_pos(sample_x, sample_y, sample_z)
-
-        caput(epics_config['detector_control'] + ':ShutterMode', 1)  # enable epics PV shutter mode
-
+                skip_setups.append(exp_ind)
+
+        start_positions = {'sample_position_x': sample_x,
+                           'sample_position_y': sample_y,
+                           'sample_position_z': sample_z,
+                           'sample_position_omega': previous_omega_pos,
+                           'detector_position_x': previous_detector_pos_x,
+                           'detector_position_z': previous_detector_pos_z}
+        acquisitions, plan_report = plan.create_plan(self.model, start_positions, self.get_motor_velocities(),
+                                                     skip_setups=skip_setups,
+                                                     optimize=collection_config['OPTIMIZE COLLECTION ORDER'],
+                                                     point_order=collection_config['SAMPLE POINT ORDER'])
+        logger.info('Collection plan: {}'.format(plan_report))
+
+        settings = self.get_collection_settings()
+        for ind, acquisition in enumerate(acquisitions):
+            self.collection_worker.submit('acquisition', self.collect_acquisition, acquisition, settings,
+                                          '{}/{}'.format(ind + 1, len(acquisitions)))
+
+        previous_state = {'filepath': previous_filepath,
+                          'filename': previous_filename,
+                          'file_number': previous_filenumber,
+                          'exposure_time': previous_exposure_time,
+                          'detector_position_x': previous_detector_pos_x,
+                          'detector_position_z': previous_detector_pos_z,
+                          'sample_position': (sample_x, sample_y, sample_z),
+                          'omega': previous_omega_pos}
+        self.collection_worker.submit('collection end', self.restore_after_collection, previous_state, settings)
+
+    def collection_progress(self, name, value):
+        if name == 'acquisition':
+            self.set_status_lbl(value, "#FF0000")
+
+    def collection_job_finished(self, name, result):
+        if name == 'background':
+            self.set_status_lbl("Finished", "#00FF00")
+            self.widget.collect_bkg_btn.setEnabled(True)
+        elif name == 'collection end':
+            self.overhead_model = result
+            self.collection_finished()
+
+    def collection_job_failed(self, name, message):
+        if name == 'acquisition':
+            # the remaining acquisitions are skipped, the previous state is restored by the queued collection end
+            self.abort_collection = True
+            self.show_error_message_box(message)
+        elif name == 'background':
+            self.set_status_lbl("Failed", "#FF0000")
+            self.widget.collect_bkg_btn.setEnabled(True)
+            self.show_error_message_box('Background collection failed: ' + message)
+        elif name == 'collection end':
+            self.show_error_message_box('Restoring the state after the collection failed: ' + message)
+            self.collection_finished()
+
+    def collection_finished(self):
         if self.widget.rename_files_cb.isChecked():
             self.increase_point_number()
 
-        if self.widget.rename_after_cb.isChecked():
-            caput(epics_config['detector_file'] + ':FilePath', previous_filepath)
-            caput(epics_config['detector_file'] + ':FileName', previous_filename)
-            if self.widget.rename_files_cb.isChecked():
-                caput(epics_config['detector_file'] + ':FileNumber', previous_filenumber)
-
         #update frame number
 
         if self.widget.no_suffices_cb.isChecked() or ((not self.widget.rename_files_cb.isChecked()) and (not self.widget.no_suffices_cb.isChecked())):
-            _, _, filenumber = self.get_filename_info()
+            _, _, filenumber = self.get_filename_info(use_cache=False)
             self.widget.frame_number_txt.setText(str(filenumber))
 
         #if MONITOR:
@@ -816,12 +750,147 @@ class MainController(object):
         self.widget.collect_btn.setText('Collect')
         self.widget.collect_btn.clicked.connect(self.collect_data)
         self.widget.collect_btn.clicked.disconnect(self.abort_data_collection)
+        self.widget.collect_bkg_btn.setEnabled(True)
         self.set_status_lbl("Finished", "#00FF00")
         self.set_example_lbl()
 
+    def get_collection_settings(self):
+        """state of the file naming and reset widgets, read in the GUI thread and passed to the collection jobs"""
+        return {'filepath': str(self.filepath),
+                'basename': self.basename,
+                'point_number': str(self.widget.point_txt.text()),
+                'rename_files': self.widget.rename_files_cb.isChecked(),
+                'rename_after': self.widget.rename_after_cb.isChecked(),
+                'no_suffices': self.widget.no_suffices_cb.isChecked(),
+                'collect_bkg': bool(self.widget.auto_bkg_cb.isChecked()),
+                'reset_detector_position': self.widget.reset_detector_position_cb.isChecked(),
+                'reset_sample_position': self.widget.reset_sample_position_cb.isChecked()}
+
+    def collect_acquisition(self, acquisition, settings, progress=''):
+        """
+        Collects an acquisition, runs in the collection worker thread.
+        :param settings: see get_collection_settings
+        :param progress: position of the acquisition in the collection, e.g. "3/10"
+        :return: True if collected, False if the collection was aborted before
+        """
+        if not self.check_if_aborted():
+            return False
+
+        # check if all motor positions are in a correct position
+        if acquisition.scan_type != plan.STILL and self.check_conditions() is False:
+            raise RuntimeError('Please Move mirrors and microscope in the right positions!')
+
+        experiment = acquisition.experiment_setup
+        sample_point = acquisition.sample_point
+        self.collection_worker.report_progress('Collecting\n{} {}'.format(acquisition.scan_type, progress))
+
+        filename, filenumber = self.get_acquisition_filename(acquisition, settings)
+        caput(epics_config['detector_file'] + ':FilePath', settings['filepath'])
+        caput(epics_config['detector_file'] + ':FileName', str(filename))
+        caput(epics_config['detector_file'] + ':FileNumber', filenumber)
+
+        logger.info("Performing {} for:\n\t\t{}\n\t\t{}".format(plan.SCAN_DESCRIPTIONS[acquisition.scan_type],
+                                                                 sample_point, experiment))
+        timing.set_context(scan_type=acquisition.scan_type, point=sample_point.name, setup=experiment.name)
+        timing.timed('acquisition', measurement.collect_acquisition, exposure=acquisition.exposure_time,
+                     frames=acquisition.num_frames, detector_x=experiment.detector_pos_x,
+                     detector_z=experiment.detector_pos_z)(acquisition, callback_fcn=self.check_if_aborted,
+                                                           collect_bkg_flag=settings['collect_bkg'])
+
+        if acquisition.scan_type == plan.WIDE:
+            time.sleep(.2)
+        return True
+
+    def restore_after_collection(self, previous_state, settings):
+        """
+        Writes the timing of the collection and restores the detector, motor and file settings selected in the GUI,
+        runs in the collection worker thread.
+        :return: overhead model fitted to the timing of all collections
+        """
+        timing.set_context()
+        timing.recorder.flush(collection_config['TIMING FOLDER'])
+        overhead_model = estimator.load_overhead_model(collection_config['TIMING FOLDER'])
+        if previous_state['exposure_time'] is not None:
+            caput(epics_config['detector_control'] + ':AcquireTime', previous_state['exposure_time'])
+        else:
+            logger.warning('The exposure time could not be read before the collection and is not restored.')
+
+        # move to previous detector and sample position
+        targets = []
+        if settings['reset_detector_position']:
+            targets.append(('detector_position_x', previous_state['detector_position_x']))
+            targets.append(('detector_position_z', previous_state['detector_position_z']))
+        if settings['reset_sample_position']:
+            targets.append(('sample_position_omega', previous_state['omega']))
+            targets.extend(zip(('sample_position_x', 'sample_position_y', 'sample_position_z'),
+                               previous_state['sample_position']))
+        for axis, position in targets:
+            if position is None:
+                logger.warning('The position of {} could not be read before the collection and is not restored.'.format(
+                    axis))
+        targets = [(axis, position) for axis, position in targets if position is not None]
+        if targets:
+            measurement.move_axes(targets)
+
+        caput(epics_config['detector_control'] + ':ShutterMode', 1)  # enable epics PV shutter mode
+
+        if settings['rename_after']:
+            caput(epics_config['detector_file'] + ':FilePath', previous_state['filepath'])
+            caput(epics_config['detector_file'] + ':FileName', previous_state['filename'])
+            if settings['rename_files']:
+                caput(epics_config['detector_file'] + ':FileNumber', previous_state['file_number'], wait=True)
+        return overhead_model
+
+    def get_acquisition_filename(self, acquisition, settings):
+        """
+        :param settings: see get_collection_settings
+        :return: filename and file number for an acquisition depending on the chosen file naming scheme
+        """
+        if settings['rename_files']:
+            filename = settings['basename'] + '_' + acquisition.sample_point.name + '_P' + settings['point_number'] + \
+                       '_' + acquisition.experiment_setup.name + plan.FILENAME_SUFFICES[acquisition.scan_type]
+            filenumber = 1
+        elif settings['no_suffices']:
+            filename = settings['basename']
+            _, _, filenumber = self.get_filename_info(use_cache=False)
+        else:
+            _, filename, filenumber = self.get_filename_info(use_cache=False)
+        return filename, filenumber
+
+    @staticmethod
+    def get_motor_velocities():
+        velocities = {}
+        for axis in plan.AXES:
+            velocity = pv_registry.get(epics_config[axis] + '.VELO')
+            velocities[axis] = velocity if velocity else 1.0
+        return velocities
+
+    @staticmethod
+    def get_motor_acceleration_times():
+        acceleration_times = {}
+        for axis in plan.AXES:
+            acceleration_time = pv_registry.get(epics_config[axis] + '.ACCL')
+            acceleration_times[axis] = acceleration_time if acceleration_time else 0.0
+        return acceleration_times
+
+    @staticmethod
+    def get_motor_positions():
+        return dict((axis, pv_registry.get(epics_config[axis])) for axis in plan.AXES)
+
     def abort_data_collection(self):
         self.abort_collection = True
 
+    def stop_collection_worker(self):
+        """
+        Aborts a running collection when the program quits. The queued acquisitions are skipped, but the state is
+        still restored by the queued collection end. Waits at most collection_config "QUIT TIMEOUT" for the worker.
+        """
+        self.abort_collection = True
+        self.collection_worker.cancel_pending(['acquisition'])
+        if not self.collection_worker.stop(collection_config['QUIT TIMEOUT']):
+            logger.warning('Collection did not finish within {} s after quitting.'.format(
+                collection_config['QUIT TIMEOUT']))
+
     def check_if_aborted(self):
         # QtGui.QApplication.processEvents()
         return not self.abort_collection
@@ -834,39 +903,19 @@ class MainController(object):
         cur_point_number = int(str(self.widget.point_txt.text()))
         self.widget.point_txt.setText(str(cur_point_number + 1))
 
-    def estimate_collection_time(self, epics_config):
-        total_time = 0
-        det_x_speed = caget(epics_config['detector_position_x'] + '.VELO')
-        det_z_speed = caget(epics_config['detector_position_z'] + '.VELO')
-        det_x_pos = caget(epics_config['detector_position_x'])
-        det_z_pos = caget(epics_config['detector_position_z'])
-
-        for exp_ind, experiment in enumerate(self.model.experiment_setups):
-            exp_collection = False
-            for sample_point in self.model.sample_points:
-                if sample_point.perform_still_for_setup[exp_ind]:
-                    exposure_time = abs(experiment.omega_end - experiment.omega_start) / experiment.omega_step * \
-                                    experiment.time_per_step
-                    total_time += exposure_time + 4.5
-                    exp_collection = True
-                if sample_point.perform_wide_scan_for_setup[exp_ind]:
-                    exposure_time = abs(experiment.omega_end - experiment.omega_start) / experiment.omega_step * \
-                                    experiment.time_per_step
-                    total_time += exposure_time + 4.5
-                    exp_collection = True
-                if sample_point.perform_step_scan_for_setup[exp_ind]:
-                    print("Performing step scan for {}, with setup {}".format(sample_point, experiment))
-                    number_of_steps = abs(experiment.omega_end - experiment.omega_start) / experiment.omega_step
-                    exposure_time = number_of_steps * (4.5 + experiment.time_per_step)
-                    total_time += exposure_time
-                    exp_collection = True
-                if exp_collection:
-                    det_x_move_time = abs(experiment.detector_pos_x - det_x_pos) / float(det_x_speed)
-                    det_y_move_time = abs(experiment.detector_pos_z - det_z_pos) / float(det_z_speed)
-                    total_time += det_x_move_time + det_y_move_time
-                    det_x_pos = experiment.detector_pos_x
-                    det_z_pos = experiment.detector_pos_z
-        return total_time
+    def estimate_collection_time(self):
+        """
+        Estimates the time of the collection in the order it will be collected, with the detector overheads fitted to
+        the timing of previous collections (see estimator).
+        :return: estimator.CollectionEstimate
+        """
+        start_positions = self.get_motor_positions()
+        velocities = self.get_motor_velocities()
+        acquisitions, _ = plan.create_plan(self.model, start_positions, velocities,
+                                           optimize=collection_config['OPTIMIZE COLLECTION ORDER'],
+                                           point_order=collection_config['SAMPLE POINT ORDER'])
+        return estimator.estimate_collection_time(acquisitions, start_positions, velocities,
+                                                  self.get_motor_acceleration_times(), self.overhead_model)
 
     def frame_counter(self):
         counter = 0
@@ -906,10 +955,10 @@ class MainController(object):
     @staticmethod
     def get_current_sample_position():
         try:
-            x = float("{:.4g}".format(caget(epics_config['sample_position_x'])))
-            y = float("{:.4g}".format(caget(epics_config['sample_position_y'])))
-            z = float("{:.4g}".format(caget(epics_config['sample_position_z'])))
-        except epics.ca.ChannelAccessException:
+            x = float("{:.4g}".format(pv_registry.get(epics_config['sample_position_x'])))
+            y = float("{:.4g}".format(pv_registry.get(epics_config['sample_position_y'])))
+            z = float("{:.4g}".format(pv_registry.get(epics_config['sample_position_z'])))
+        except ChannelAccessException:
             x = y = z = 0
         return x, y, z
 
@@ -921,11 +970,11 @@ class MainController(object):
         :return: float, float, float
         """
         try:
-            detector_pos_x = float("{:g}".format(caget(epics_config['detector_position_x'])))
-            detector_pos_z = float("{:g}".format(caget(epics_config['detector_position_z'])))
-            omega = float("{:g}".format(caget(epics_config['sample_position_omega'])))
-            exposure_time = float("{:g}".format(caget(epics_config['detector_control'] + ':AcquireTime')))
-        except epics.ca.ChannelAccessException:
+            detector_pos_x = float("{:g}".format(pv_registry.get(epics_config['detector_position_x'])))
+            detector_pos_z = float("{:g}".format(pv_registry.get(epics_config['detector_position_z'])))
+            omega = float("{:g}".format(pv_registry.get(epics_config['sample_position_omega'])))
+            exposure_time = float("{:g}".format(pv_registry.get(epics_config['detector_control'] + ':AcquireTime')))
+        except ChannelAccessException:
             detector_pos_x = 0
             detector_pos_z = 49
             omega = -90
@@ -933,10 +982,15 @@ class MainController(object):
         return detector_pos_x, detector_pos_z, omega, exposure_time
 
     @staticmethod
-    def get_filename_info():
-        path = caget(epics_config['detector_file'] + ':FilePath', as_string=True)
-        filename = caget(epics_config['detector_file'] + ':FileName', as_string=True)
-        file_number = caget(epics_config['detector_file'] + ':FileNumber')
+    def get_filename_info(use_cache=True):
+        """
+        :param use_cache: read the monitored values of the PV registry instead of the current values on the IOC, which
+                          may be a moment behind right after a frame has been written
+        """
+        get = pv_registry.get if use_cache else caget
+        path = get(epics_config['detector_file'] + ':FilePath', as_string=True)
+        filename = get(epics_config['detector_file'] + ':FileName', as_string=True)
+        file_number = get(epics_config['detector_file'] + ':FileNumber')
         if path is None:
             path = ''
             filename = 'test'
@@ -962,21 +1016,11 @@ class MainController(object):
 
     @staticmethod
     def check_conditions():
-        if int(caget('13IDD:m24.RBV')) > -105:
-            return False
-        elif int(caget('13IDD:m23.RBV')) > -105:
-            return False
-        elif int(caget('13IDD:m67.RBV')) > -65:
-            return False
-        return True
+        return measurement.check_conditions()
 
     @staticmethod
     def check_omega_in_limits(omega):
-        if int(caget('13IDD:m96.HLM')) < omega:
-            return False
-        if int(caget('13IDD:m96.LLM')) > omega:
-            return False
-        return True
+        return measurement.check_omega_in_limits(omega)
 
     def check_sample_point_distances(self):
         pos_x, pos_y, pos_z = self.get_current_sample_position()
@@ -1008,49 +1052,43 @@ class MainController(object):
         return msg_box.result()
 
 
-class InfoLoggingHandler(logging.Handler):
-    def __init__(self, return_function):
-        super(InfoLoggingHandler, self).__init__()
-        self.return_function = return_function
-
-    def emit(self, log_record):
-        message = str(log_record.getMessage())
-        self.return_function(time.strftime('%X') + ': ' + message)
+class BackgroundLoader(QtCore.QObject):
+    """
+    Runs fcn in a daemon thread and emits its result with the finished signal, which is delivered in the GUI thread.
+    None is emitted when fcn raised.
+    """
+    finished = QtCore.pyqtSignal(object)
 
+    def __init__(self, fcn):
+        super(BackgroundLoader, self).__init__()
+        self.fcn = fcn
 
-def test_dummy_function(iterations):
-    print "the dummy function"
-    for n in range(iterations):
-        time.sleep(0.5)
-        print("{} iterations".format(n + 1))
+    def start(self):
+        thread = Thread(target=self._run)
+        thread.daemon = True
+        thread.start()
 
+    def _run(self):
+        try:
+            result = self.fcn()
+        except Exception:
+            logger.exception('Loading in the background failed.')
+            result = None
+        self.finished.emit(result)
 
-class ThreadRunner():
-    def __init__(self, fcn, args):
-        self.worker_thread = WorkerThread(fcn, args)
-        self.worker_finished = False
-
-        self.worker_thread.finished.connect(self.update_status)
-        self.worker_thread.terminated.connect(self.update_status)
 
-    def run(self):
-        print "running something"
-        self.worker_finished = False
-        self.worker_thread.start()
+class LogMessageEmitter(QtCore.QObject):
+    message = QtCore.pyqtSignal(str)
 
-        while not self.worker_finished:
-            QtGui.QApplication.processEvents()
-            time.sleep(0.1)
 
-    def update_status(self):
-        print "updating status"
-        self.worker_finished = True
+class InfoLoggingHandler(logging.Handler):
+    """passes the log messages to return_function in the GUI thread, also when logged in the collection worker"""
 
-class WorkerThread(QtCore.QThread):
-    def __init__(self, func, args):
-        super(WorkerThread, self).__init__()
-        self.func = func
-        self.args = args
+    def __init__(self, return_function):
+        super(InfoLoggingHandler, self).__init__()
+        self.emitter = LogMessageEmitter()
+        self.emitter.message.connect(return_function)
 
-    def run(self):
-        self.func(*self.args)
\ No newline at end of file
+    def emit(self, log_record):
+        message = str(log_record.getMessage())
+        self.emitter.message.emit(time.strftime('%X') + ': ' + message)
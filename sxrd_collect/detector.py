@@ -0,0 +1,187 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+from functools import partial
+import time
+from threading import Lock, Event, Timer
+
+from pv import PV
+from timing import record
+
+# numeric values of the MarCCD task status PVs (MarReadoutStatus_RBV, MarCorrectStatus_RBV, MarWritingStatus_RBV)
+MAR_STATUS_IDLE = 0
+MAR_STATUS_QUEUED = 1
+MAR_STATUS_EXECUTING = 2
+MAR_STATUS_ERROR = 3
+MAR_STATUS_BUSY = 4
+
+READOUT = 0
+CORRECT = 1
+WRITING = 2
+
+SPAN_NAMES = ('detector readout', 'detector correction', 'detector writing')
+
+
+class DetectorTimeout(RuntimeError):
+    """the detector did not report the end of a frame in time, e.g. because the IOC is in an error state"""
+
+
+class DetectorError(RuntimeError):
+    """the detector did not accept a setting, e.g. a trigger mode which is not supported by the IOC"""
+
+
+class MarCCDState(object):
+    """
+    Keeps the readout, correction and writing status of the MarCCD monitored for the whole session and signals
+    waiting threads through events as soon as the status callbacks arrive.
+
+    Usage per frame: call start_frame() before the acquisition is started, then wait_for_readout() and/or
+    wait_until_finished(). A task counts as finished when its status changed to Idle after start_frame() and it is
+    still Idle. The time each task is executing and the acquisition time (Acquire_RBV) are recorded as timing spans.
+    """
+
+    STATUS_PVS = ('MarReadoutStatus_RBV', 'MarCorrectStatus_RBV', 'MarWritingStatus_RBV')
+
+    def __init__(self, pv_name):
+        self.pv_name = pv_name
+        self.status = [MAR_STATUS_IDLE] * len(self.STATUS_PVS)
+        self._idle_seen = [False] * len(self.STATUS_PVS)
+        self._executing_since = [None] * len(self.STATUS_PVS)
+        self._acquiring_since = None
+        self._acquisition_done = False
+
+        self._lock = Lock()
+        self.readout_finished = Event()
+        self.finished = Event()
+        self.acquisition_done = Event()
+
+        self._status_pvs = []
+        for ind, status_pv in enumerate(self.STATUS_PVS):
+            self._status_pvs.append(PV(pv_name + ':' + status_pv, auto_monitor=True,
+                                       callback=partial(self._status_changed, ind)))
+        self._acquire_pv = PV(pv_name + ':Acquire_RBV', auto_monitor=True, callback=self._acquire_changed)
+
+    def start_frame(self):
+        with self._lock:
+            self._idle_seen = [False] * len(self.STATUS_PVS)
+            self.readout_finished.clear()
+            self.finished.clear()
+            self._acquisition_done = False
+            self.acquisition_done.clear()
+
+    def wait_for_readout(self, timeout=None):
+        """
+        Blocks until the readout of the current frame is finished. Returns False if the timeout (in s) was reached.
+        """
+        return self._wait(self.readout_finished, timeout)
+
+    def wait_until_finished(self, timeout=None):
+        """
+        Blocks until readout, correction and writing of the current frame are finished. Returns False if the timeout
+        (in s) was reached.
+        """
+        return self._wait(self.finished, timeout)
+
+    def wait_for_acquisition_done(self, timeout=None):
+        """Blocks until the detector reports Acquire_RBV as done, i.e. all images of a sequence are taken."""
+        return self._wait(self.acquisition_done, timeout)
+
+    def is_finished(self):
+        return self.finished.is_set()
+
+    def read_out_is_finished(self):
+        return self.readout_finished.is_set()
+
+    def disconnect(self):
+        for pv in self._status_pvs + [self._acquire_pv]:
+            pv.clear_callbacks()
+            pv.disconnect()
+
+    def _wait(self, event, timeout):
+        # with timeout the python 2 Event.wait polls in up to 50 ms intervals, therefore the untimed wait, which blocks
+        # on a lock, is used and a watchdog timer wakes it up by setting the event when the timeout is reached
+        if timeout is None:
+            event.wait()
+            return True
+
+        timed_out = []
+
+        def watchdog():
+            with self._lock:
+                if not event.is_set():
+                    timed_out.append(True)
+                    event.set()
+
+        timer = Timer(timeout, watchdog)
+        timer.daemon = True
+        timer.start()
+        event.wait()
+        timer.cancel()
+        if not timed_out:
+            return True
+        with self._lock:
+            # the event was only set to wake this thread, a status callback may have arrived in between
+            self._update_event(event)
+            return event.is_set()
+
+    def _update_event(self, event):
+        if event is self.readout_finished:
+            done = self._task_finished(READOUT)
+        elif event is self.finished:
+            done = all(self._task_finished(task) for task in range(len(self.STATUS_PVS)))
+        else:
+            done = self._acquisition_done
+        if done:
+            event.set()
+        else:
+            event.clear()
+
+    def _status_changed(self, ind, value=None, **kwargs):
+        with self._lock:
+            self._record_status_span(ind, value)
+            self.status[ind] = value
+            if value == MAR_STATUS_IDLE:
+                self._idle_seen[ind] = True
+            else:
+                self._idle_seen[ind] = False
+
+            self._update_event(self.readout_finished)
+            self._update_event(self.finished)
+
+    def _record_status_span(self, ind, value):
+        if value == MAR_STATUS_EXECUTING:
+            if self._executing_since[ind] is None:
+                self._executing_since[ind] = time.time()
+        elif self._executing_since[ind] is not None:
+            record(SPAN_NAMES[ind], self._executing_since[ind], time.time())
+            self._executing_since[ind] = None
+
+    def _task_finished(self, task):
+        return self._idle_seen[task] and self.status[task] == MAR_STATUS_IDLE
+
+    def _acquire_changed(self, value=None, **kwargs):
+        with self._lock:
+            if value == 0:
+                if self._acquiring_since is not None:
+                    record('detector acquisition', self._acquiring_since, time.time())
+                    self._acquiring_since = None
+            elif self._acquiring_since is None:
+                self._acquiring_since = time.time()
+            self._acquisition_done = value == 0
+            self._update_event(self.acquisition_done)
@@ -0,0 +1,299 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Duty cycle and dead time analysis of collection sessions based on the timing files written by the timing module.
+The duty cycle is the exposure time divided by the wall time and is given per scan type, experiment setup and
+sample point. The worst offenders (slow readouts, long stage preparations after a detector move, revisited setups)
+are listed and the beamtime saved by the possible optimisations is projected.
+
+Usage (from the sxrd_collect folder): python -m duty_cycle timing/*.csv [--json report.json] [--top 5]
+"""
+__author__ = 'Clemens Prescher'
+
+import os
+import sys
+import json
+import argparse
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+
+from timing import read_spans
+
+MOTION_SPANS = ('stage preparation', 'ramp move', 'return move')
+SLOW_READOUT_FACTOR = 1.5
+
+
+class Acquisition(object):
+    """an "acquisition" span of a timing file"""
+
+    def __init__(self, row):
+        self.session = row['session']
+        self.start = row['start']
+        self.end = row['end']
+        self.scan_type = row.get('scan_type') or ''
+        self.point = row.get('point') or ''
+        self.setup = row.get('setup') or ''
+        self.exposure = float(row.get('exposure') or 0)
+        self.frames = int(float(row.get('frames') or 1))
+        if row.get('detector_x') not in (None, '') and row.get('detector_z') not in (None, ''):
+            self.detector_position = (float(row['detector_x']), float(row['detector_z']))
+        else:
+            self.detector_position = None  # timing files written before the detector position was recorded
+
+    @property
+    def wall_time(self):
+        return self.end - self.start
+
+
+def load_spans(filenames):
+    """reads the spans of all files, each file counts as one session"""
+    rows = []
+    for filename in filenames:
+        session = os.path.splitext(os.path.basename(filename))[0]
+        for row in read_spans(filename):
+            row['session'] = session
+            rows.append(row)
+    rows.sort(key=lambda row: row['start'])
+    return rows
+
+
+def get_duty_cycles(acquisitions, key):
+    """
+    :param key: function returning the group of an acquisition
+    :return: OrderedDict of group: (number of acquisitions, exposure time, wall time, duty cycle), worst first
+    """
+    groups = {}
+    for acquisition in acquisitions:
+        count, exposure, wall_time = groups.get(key(acquisition), (0, 0, 0))
+        groups[key(acquisition)] = (count + 1, exposure + acquisition.exposure, wall_time + acquisition.wall_time)
+    duty_cycles = [(group, (count, exposure, wall_time, exposure / wall_time if wall_time > 0 else 0))
+                   for group, (count, exposure, wall_time) in groups.items()]
+    return OrderedDict(sorted(duty_cycles, key=lambda item: item[1][3]))
+
+
+def get_union_time(intervals):
+    """total time covered by a list of (start, end) intervals"""
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def get_overlap_time(intervals, other_intervals):
+    """time in which intervals overlap with other_intervals"""
+    return get_union_time(intervals) + get_union_time(other_intervals) - \
+        get_union_time(list(intervals) + list(other_intervals))
+
+
+def find_slow_readouts(rows, top=5):
+    """readouts taking more than SLOW_READOUT_FACTOR times the median readout time, slowest first"""
+    readouts = [row for row in rows if row['name'] == 'detector readout']
+    if not readouts:
+        return [], 0
+    median = float(np.median([row['duration'] for row in readouts]))
+    slow = [row for row in readouts if row['duration'] > SLOW_READOUT_FACTOR * median]
+    slow.sort(key=lambda row: row['duration'], reverse=True)
+    return slow[:top], median
+
+
+def find_revisited_setups(acquisitions):
+    """
+    acquisitions which return to an experiment setup (i.e. detector position) that was already left earlier in the
+    same session
+    """
+    revisits = []
+    visited = set()
+    previous = None
+    for acquisition in acquisitions:
+        if previous is None or previous.session != acquisition.session:
+            visited = set()
+        elif acquisition.setup != previous.setup and acquisition.setup in visited:
+            revisits.append(acquisition)
+        visited.add(acquisition.setup)
+        previous = acquisition
+    return revisits
+
+
+def index_spans(rows, name):
+    """returns the start times and the spans with the given name, rows have to be sorted by start time"""
+    spans = [row for row in rows if row['name'] == name]
+    return [row['start'] for row in spans], spans
+
+
+def get_spans_within(span_index, acquisition):
+    """spans of an index_spans result starting during the acquisition"""
+    starts, spans = span_index
+    return spans[bisect_left(starts, acquisition.start):bisect_left(starts, acquisition.end)]
+
+
+def is_detector_move(previous, acquisition):
+    """
+    whether the detector x/z position differs between two acquisitions, a setup change is taken as detector move if
+    the positions were not recorded
+    """
+    if previous.detector_position is None or acquisition.detector_position is None:
+        return previous.setup != acquisition.setup
+    return previous.detector_position != acquisition.detector_position
+
+
+def find_detector_moves(rows, acquisitions, top=5):
+    """stage preparations at the start of acquisitions with another detector position than the previous one"""
+    stage_preparations = index_spans(rows, 'stage preparation')
+    moves = []
+    for previous, acquisition in zip(acquisitions[:-1], acquisitions[1:]):
+        if previous.session == acquisition.session and is_detector_move(previous, acquisition):
+            for row in get_spans_within(stage_preparations, acquisition):
+                moves.append((row['duration'], previous.setup, acquisition))
+    moves.sort(key=lambda move: move[0], reverse=True)
+    return moves[:top]
+
+
+def project_savings(rows, acquisitions, median_readout):
+    """
+    Beamtime (in s) saved by the possible optimisations:
+        batch setups                stage preparations of revisited setups take only as long as the median stage
+                                    preparation without a setup change (i.e. moving the sample only)
+        overlap correction/writing  detector correction and writing overlapping with no motion are hidden behind the
+                                    motion of the next acquisition
+        no gaps                     the time between the end and the start of consecutive acquisitions is removed
+        regular readouts            readouts slower than the median take the median time
+    """
+    stage_preparations = index_spans(rows, 'stage preparation')
+    sample_move_times = []
+    for previous, acquisition in zip(acquisitions[:-1], acquisitions[1:]):
+        if previous.setup == acquisition.setup:
+            sample_move_times.extend(row['duration'] for row in get_spans_within(stage_preparations, acquisition))
+    median_sample_move = float(np.median(sample_move_times)) if sample_move_times else 0
+
+    revisit_time = 0
+    for acquisition in find_revisited_setups(acquisitions):
+        revisit_time += sum(max(row['duration'] - median_sample_move, 0)
+                            for row in get_spans_within(stage_preparations, acquisition))
+
+    processing = [(row['start'], row['end']) for row in rows
+                  if row['name'] in ('detector correction', 'detector writing')]
+    motion = [(row['start'], row['end']) for row in rows if row['name'] in MOTION_SPANS]
+    processing_time = get_union_time(processing) - get_overlap_time(processing, motion)
+
+    gap_time = 0
+    for previous, acquisition in zip(acquisitions[:-1], acquisitions[1:]):
+        if previous.session == acquisition.session:
+            gap_time += max(acquisition.start - previous.end, 0)
+
+    readout_time = sum(row['duration'] - median_readout for row in rows
+                       if row['name'] == 'detector readout' and row['duration'] > median_readout)
+
+    return OrderedDict([('batch setups', revisit_time),
+                        ('overlap correction/writing', processing_time),
+                        ('no gaps', gap_time),
+                        ('regular readouts', readout_time)])
+
+
+def analyse(rows, top=5):
+    """
+    :param rows: spans as returned by load_spans
+    :return: dictionary with the report, see print_report
+    """
+    acquisitions = [Acquisition(row) for row in rows if row['name'] == 'acquisition']
+    sessions = OrderedDict()
+    for row in rows:
+        start, end = sessions.get(row['session'], (row['start'], row['end']))
+        sessions[row['session']] = (min(start, row['start']), max(end, row['end']))
+
+    phase_times = {}
+    for row in rows:
+        phase_times[row['name']] = phase_times.get(row['name'], 0) + row['duration']
+
+    slow_readouts, median_readout = find_slow_readouts(rows, top)
+    wall_time = sum(end - start for start, end in sessions.values())
+    exposure = sum(acquisition.exposure for acquisition in acquisitions)
+    return {
+        'sessions': len(sessions),
+        'acquisitions': len(acquisitions),
+        'wall_time': wall_time,
+        'exposure_time': exposure,
+        'duty_cycle': exposure / wall_time if wall_time > 0 else 0,
+        'phase_times': OrderedDict(sorted(phase_times.items(), key=lambda item: item[1], reverse=True)),
+        'scan_types': get_duty_cycles(acquisitions, lambda acquisition: acquisition.scan_type),
+        'setups': get_duty_cycles(acquisitions, lambda acquisition: acquisition.setup),
+        'points': get_duty_cycles(acquisitions, lambda acquisition: acquisition.point),
+        'median_readout': median_readout,
+        'slow_readouts': [(row['duration'], row.get('point', ''), row.get('setup', '')) for row in slow_readouts],
+        'detector_moves': [(duration, previous_setup, acquisition.setup, acquisition.point)
+                           for duration, previous_setup, acquisition in find_detector_moves(rows, acquisitions, top)],
+        'revisited_setups': len(find_revisited_setups(acquisitions)),
+        'savings': project_savings(rows, acquisitions, median_readout),
+    }
+
+
+def print_report(report, top=5):
+    print('{sessions} sessions, {acquisitions} acquisitions, wall time {wall_time:.0f} s, exposure '
+          '{exposure_time:.0f} s, duty cycle {duty_cycle:.1%}'.format(**report))
+
+    print('\nTime per phase (phases can overlap):')
+    for name, duration in report['phase_times'].items():
+        print('  {:28s} {:10.1f} s'.format(name, duration))
+
+    for title, key in (('scan type', 'scan_types'), ('setup', 'setups'), ('point', 'points')):
+        print('\nDuty cycle per {} (worst first):'.format(title))
+        for group, (count, exposure, wall_time, duty_cycle) in list(report[key].items())[:top]:
+            print('  {:28s} {:5d} x {:8.1f} s / {:8.1f} s = {:6.1%}'.format(group, count, exposure, wall_time,
+                                                                          duty_cycle))
+
+    print('\nSlow readouts (median {:.2f} s):'.format(report['median_readout']))
+    for duration, point, setup in report['slow_readouts']:
+        print('  {:8.2f} s  {} {}'.format(duration, point, setup))
+
+    print('\nLongest stage preparations after a detector move:')
+    for duration, previous_setup, setup, point in report['detector_moves']:
+        print('  {:8.2f} s  {} -> {} ({})'.format(duration, previous_setup, setup, point))
+    print('\n{} acquisitions returned to an already visited setup.'.format(report['revisited_setups']))
+
+    print('\nProjected savings:')
+    for name, saving in report['savings'].items():
+        print('  {:28s} {:10.1f} s ({:.1%} of the wall time)'.format(
+            name, saving, saving / report['wall_time'] if report['wall_time'] > 0 else 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Duty cycle analysis of collection timing files')
+    parser.add_argument('files', nargs='+', help='CSV or JSON timing files written by the collection')
+    parser.add_argument('--top', type=int, default=5, help='number of worst offenders to list')
+    parser.add_argument('--json', help='file for the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = analyse(load_spans(args.files), args.top)
+    print_report(report, args.top)
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
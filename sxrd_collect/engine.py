@@ -0,0 +1,99 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Small task engine for running independent parts of a collection (motor moves, detector and file PV setup, XPS
+commands, status updates) at the same time. Every Task runs in its own CA aware thread and its result is awaited
+with Task.result() or gather(), which also re-raise exceptions of the task in the waiting thread.
+"""
+__author__ = 'Clemens Prescher'
+
+import sys
+from threading import Event
+
+from pv import caput, caget, CAThread
+
+
+class Task(object):
+    def __init__(self, fcn, *args, **kwargs):
+        self.fcn = fcn
+        self._result = None
+        self._exc_info = None
+        self._done = Event()
+        self._thread = CAThread(target=self._run, args=args, kwargs=kwargs)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, *args, **kwargs):
+        try:
+            self._result = self.fcn(*args, **kwargs)
+        except Exception:
+            self._exc_info = sys.exc_info()
+        finally:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """waits for the task to finish without re-raising its exception, returns whether it finished"""
+        return self._done.wait(timeout)
+
+    def result(self, timeout=None):
+        """
+        Waits for the task to finish and returns its result. Exceptions raised in the task are re-raised here.
+        Raises a RuntimeError when the timeout (in s) is reached.
+        """
+        self._thread.join(timeout)
+        if not self._done.is_set():
+            raise RuntimeError('Task {} did not finish within {} s'.format(self.fcn.__name__, timeout))
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+
+def run_async(fcn, *args, **kwargs):
+    """starts fcn(*args, **kwargs) in the background and returns the Task"""
+    return Task(fcn, *args, **kwargs)
+
+
+def gather(*tasks):
+    """
+    waits for all tasks and returns their results in the given order. When tasks failed, the exception of the first
+    of them is re-raised after all tasks finished, so that no task is still running after gather returned.
+    """
+    for task in tasks:
+        task.wait()
+    return [task.result() for task in tasks]
+
+
+def async_caput(pvname, value, wait=True, timeout=60):
+    return run_async(caput, pvname, value, wait=wait, timeout=timeout)
+
+
+def async_caget(pvname, **kwargs):
+    return run_async(caget, pvname, **kwargs)
+
+
+def async_xps(method, *args, **kwargs):
+    """runs a method of XPS or XPSTrajectory in the background, e.g. async_xps(stage_xps.define_step_trajectory)"""
+    return run_async(method, *args, **kwargs)
+
+
+def async_wait(wait_fcn, *args, **kwargs):
+    """wraps a blocking wait, e.g. async_wait(detector_state.wait_until_finished)"""
+    return run_async(wait_fcn, *args, **kwargs)
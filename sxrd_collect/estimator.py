@@ -0,0 +1,175 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Estimation of the collection time of a plan. The time of every acquisition is the sum of
+
+    motion time     move from the end of the previous acquisition to its start positions, trapezoidal velocity
+                    profiles (VELO, ACCL) with all axes moving simultaneously
+    exposure time   requested exposure
+    overhead        detector readout, trajectory setup, step moves etc., a fixed part plus a part per frame, fitted per
+                    scan type to the timing files of past sessions (see timing) or the defaults of DEFAULT_OVERHEADS
+
+The uncertainty of the overhead model gives the confidence interval of the total time.
+"""
+__author__ = 'Clemens Prescher'
+
+import os
+import glob
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from plan import get_move_time, STILL, WIDE, STEP
+from duty_cycle import load_spans, Acquisition as TimedAcquisition, index_spans, get_spans_within
+
+logger = logging.getLogger(__name__)
+
+# scan type: (fixed overhead in s, overhead per frame in s, standard deviation per acquisition in s)
+DEFAULT_OVERHEADS = {STILL: (4.5, 0.0, 1.5),
+                     WIDE: (4.5, 0.0, 1.5),
+                     STEP: (0.0, 4.5, 3.0)}
+
+MIN_SAMPLES = 3
+MAX_SESSIONS = 20
+
+
+class OverheadModel(object):
+    """overhead per acquisition as fixed + per_frame * frames, with the standard deviation of the fit residuals"""
+
+    def __init__(self):
+        self.parameters = dict(DEFAULT_OVERHEADS)
+        self.num_samples = dict((scan_type, 0) for scan_type in DEFAULT_OVERHEADS)
+
+    def fit(self, rows):
+        """
+        Fits the overheads to the "acquisition" spans of timing files, the overhead of an acquisition is its wall time
+        minus its exposure time and the stage preparation. Scan types with less than MIN_SAMPLES acquisitions keep
+        their defaults.
+        :param rows: spans as returned by duty_cycle.load_spans
+        """
+        stage_preparations = index_spans(rows, 'stage preparation')
+        samples = {}
+        for row in rows:
+            if row['name'] != 'acquisition':
+                continue
+            acquisition = TimedAcquisition(row)
+            stage_time = sum(span['duration'] for span in get_spans_within(stage_preparations, acquisition))
+            overhead = acquisition.wall_time - acquisition.exposure - stage_time
+            samples.setdefault(acquisition.scan_type, []).append((acquisition.frames, overhead))
+
+        for scan_type, scan_samples in samples.items():
+            if scan_type not in self.parameters or len(scan_samples) < MIN_SAMPLES:
+                continue
+            frames, overheads = np.array(scan_samples, dtype=float).T
+            if scan_type != STEP:
+                fixed, per_frame = np.mean(overheads), 0.0
+            elif np.ptp(frames) > 0:
+                per_frame, fixed = np.polyfit(frames, overheads, 1)
+            else:
+                fixed, per_frame = 0.0, np.mean(overheads / frames)
+            residuals = overheads - (fixed + per_frame * frames)
+            self.parameters[scan_type] = (float(fixed), float(per_frame), float(np.std(residuals, ddof=1)))
+            self.num_samples[scan_type] = len(scan_samples)
+        return self
+
+    def predict(self, scan_type, frames):
+        """:return: overhead, standard deviation"""
+        fixed, per_frame, sigma = self.parameters[scan_type]
+        return fixed + per_frame * frames, sigma
+
+
+def load_overhead_model(folder, max_sessions=MAX_SESSIONS):
+    """fits an OverheadModel to the most recent timing files (JSON) in folder"""
+    model = OverheadModel()
+    filenames = sorted(glob.glob(os.path.join(folder, '*.json')), key=os.path.getmtime)[-max_sessions:]
+    if filenames:
+        try:
+            model.fit(load_spans(filenames))
+        except (IOError, ValueError, KeyError) as e:
+            logger.warning('Could not fit the overhead model to the timing files in {}: {}'.format(folder, e))
+    return model
+
+
+class AcquisitionEstimate(object):
+    def __init__(self, acquisition, motion_time, exposure_time, overhead, sigma):
+        self.acquisition = acquisition
+        self.motion_time = motion_time
+        self.exposure_time = exposure_time
+        self.overhead = overhead
+        self.sigma = sigma
+
+    @property
+    def total_time(self):
+        return self.motion_time + self.exposure_time + self.overhead
+
+
+class CollectionEstimate(object):
+    """
+    :param breakdown: list of AcquisitionEstimate
+    :param z: number of standard deviations of the confidence interval, 1.96 for 95 %
+    """
+
+    def __init__(self, breakdown, z=1.96):
+        self.breakdown = breakdown
+        self.z = z
+
+    @property
+    def total_time(self):
+        return sum(estimate.total_time for estimate in self.breakdown)
+
+    @property
+    def uncertainty(self):
+        """half width of the confidence interval, assuming independent acquisitions"""
+        return self.z * np.sqrt(sum(estimate.sigma ** 2 for estimate in self.breakdown))
+
+    @property
+    def interval(self):
+        return max(self.total_time - self.uncertainty, 0), self.total_time + self.uncertainty
+
+    def get_times_per_scan_type(self):
+        times = OrderedDict()
+        for estimate in self.breakdown:
+            times[estimate.acquisition.scan_type] = times.get(estimate.acquisition.scan_type, 0) + \
+                                                    estimate.total_time
+        return times
+
+    def __str__(self):
+        return '{:.0f} s +- {:.0f} s'.format(self.total_time, self.uncertainty)
+
+
+def estimate_collection_time(acquisitions, start_positions, velocities, acceleration_times, overhead_model=None,
+                             z=1.96):
+    """
+    :param acquisitions: plan.Acquisition list in collection order
+    :param start_positions: dictionary of current motor positions with the epics_config motor names as keys
+    :param velocities: dictionary of motor velocities (.VELO) with the epics_config motor names as keys
+    :param acceleration_times: dictionary of motor acceleration times (.ACCL) with the epics_config motor names as keys
+    :return: CollectionEstimate
+    """
+    if overhead_model is None:
+        overhead_model = OverheadModel()
+    breakdown = []
+    positions = dict(start_positions)
+    for acquisition in acquisitions:
+        motion_time = get_move_time(positions, acquisition.get_start_positions(), velocities,
+                                    acceleration_times=acceleration_times)
+        overhead, sigma = overhead_model.predict(acquisition.scan_type, acquisition.num_frames)
+        breakdown.append(AcquisitionEstimate(acquisition, motion_time, acquisition.exposure_time, overhead, sigma))
+        positions = acquisition.get_end_positions()
+    return CollectionEstimate(breakdown, z)
@@ -17,19 +17,26 @@
 #     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 __author__ = 'Clemens Prescher'
 
+import os
 import time
 import logging
 from functools import partial
 
-from epics import caput, caget, PV, camonitor, camonitor_clear
+from pv import caput, caget
+import pv_registry
 
 logging.basicConfig()
 logger = logging.getLogger()
 logger.setLevel(logging.DEBUG)
 
-from xps_trajectory.xps_trajectory import XPSTrajectory
+from xps_trajectory.xps_session import XPSSession
+from detector import MarCCDState, DetectorTimeout, DetectorError
+from motion import MotionCoordinator, MotionError
+from engine import run_async, async_caput, async_xps, gather
+from timing import span, timed
+from plan import STILL, WIDE
 
-from config import xps_config, epics_config
+from config import xps_config, epics_config, collection_config, FILEPATH
 
 HOST = xps_config['HOST']
 GROUP_NAME = xps_config['GROUP NAME']
@@ -38,14 +45,126 @@ DEFAULT_ACCEL = xps_config['DEFAULT ACCEL']
 
 GATHER_OUTPUTS = xps_config['GATHER OUTPUTS']
 
+# the XPS connection is shared by all scans and only (re)established when needed
+xps_session = XPSSession(host=HOST, group=GROUP_NAME, positioners=POSITIONERS)
+
+_detector_state = None
+
+
+def get_detector_state():
+    """returns the MarCCDState of the session, the status monitors are created on first use"""
+    global _detector_state
+    if _detector_state is None:
+        _detector_state = MarCCDState(epics_config['detector_control'])
+    return _detector_state
+
+
+def get_detector_timeout(exposure_time, num_frames=1):
+    """maximum time in s the detector may need for taking, reading out, correcting and writing num_frames frames"""
+    return num_frames * (exposure_time + collection_config['DETECTOR READOUT TIME']) + \
+           collection_config['DETECTOR TIMEOUT MARGIN']
+
+
+def wait_for_detector(wait_fcn, timeout):
+    """
+    Calls one of the waiting methods of MarCCDState and raises DetectorTimeout if it returns False.
+    :param timeout: maximum waiting time in s, see get_detector_timeout
+    """
+    if not wait_fcn(timeout):
+        raise DetectorTimeout('{} timed out after {:.1f} s.'.format(wait_fcn.__name__, timeout))
+
+
+def reset_detector_state():
+    """disconnects the status monitors, e.g. after changing the PV backend"""
+    global _detector_state
+    if _detector_state is not None:
+        _detector_state.disconnect()
+    _detector_state = None
+
 
 def get_sample_position():
-    x_pos = caget(epics_config['sample_position_x'])
-    y_pos = caget(epics_config['sample_position_y'])
-    z_pos = caget(epics_config['sample_position_z'])
+    x_pos = pv_registry.get(epics_config['sample_position_x'])
+    y_pos = pv_registry.get(epics_config['sample_position_y'])
+    z_pos = pv_registry.get(epics_config['sample_position_z'])
     return x_pos, y_pos, z_pos
 
 
+def check_conditions():
+    """checks that mirrors and microscope are moved out of the beam"""
+    if int(pv_registry.get('13IDD:m24.RBV')) > -105:
+        return False
+    elif int(pv_registry.get('13IDD:m23.RBV')) > -105:
+        return False
+    elif int(pv_registry.get('13IDD:m67.RBV')) > -65:
+        return False
+    return True
+
+
+def check_omega_in_limits(omega):
+    if int(pv_registry.get('13IDD:m96.HLM')) < omega:
+        return False
+    if int(pv_registry.get('13IDD:m96.LLM')) > omega:
+        return False
+    return True
+
+
+def get_local_path(file_path):
+    """
+    maps a FilePath of the detector IOC to the local file system in the same way as the GUI, i.e. FILEPATH replaces
+    the first 4 characters. Paths which exist locally, e.g. of the simulated detector, are returned unchanged.
+    """
+    if os.path.isdir(file_path):
+        return file_path
+    return FILEPATH + file_path[4:]
+
+
+def get_gather_filename():
+    """
+    returns the file for the gathering data of a scan, named after the next detector frame. A relative
+    xps_config "GATHER FOLDER" is taken relative to the local folder of the detector images (see get_local_path).
+    When the file PVs cannot be read, the file is named after the current time instead.
+    """
+    folder = xps_config['GATHER FOLDER']
+    if not os.path.isabs(folder):
+        file_path = caget(epics_config['detector_file'] + ':FilePath', as_string=True)
+        if file_path:
+            folder = os.path.join(get_local_path(file_path), folder)
+        else:
+            logger.warning('Detector FilePath is not available, gathering data is saved to {}.'.format(
+                os.path.abspath(folder)))
+
+    file_name = caget(epics_config['detector_file'] + ':FileName', as_string=True)
+    file_number = caget(epics_config['detector_file'] + ':FileNumber')
+    if file_name is None or file_number is None:
+        logger.warning('Detector FileName or FileNumber is not available, gathering data is named by time.')
+        return os.path.join(folder, 'gather_{}.npz'.format(time.strftime('%Y%m%d_%H%M%S')))
+    return os.path.join(folder, '{}_{:03d}.npz'.format(file_name, int(file_number)))
+
+
+def collect_acquisition(acquisition, callback_fcn=None, collect_bkg_flag=False):
+    """
+    Collects a plan.Acquisition with the measurement function of its scan type.
+    :param callback_fcn: see collect_step_data, only used for step scans
+    :param collect_bkg_flag: see collect_step_data, only used for step scans
+    """
+    experiment = acquisition.experiment_setup
+    point = acquisition.sample_point
+    if acquisition.scan_type == STILL:
+        collect_single_data(experiment.detector_pos_x, experiment.detector_pos_z, acquisition.exposure_time,
+                            point.x, point.y, point.z, acquisition.omega_start)
+    elif acquisition.scan_type == WIDE:
+        collect_wide_data(experiment.detector_pos_x, experiment.detector_pos_z, experiment.omega_start,
+                          experiment.omega_end, acquisition.exposure_time, point.x, point.y, point.z)
+    else:
+        if collection_config['CONTINUOUS STEP SCAN']:
+            collect_fcn = collect_continuous_step_data
+        else:
+            collect_fcn = collect_step_data
+        collect_fcn(experiment.detector_pos_x, experiment.detector_pos_z, experiment.omega_start,
+                    experiment.omega_end, experiment.omega_step, experiment.time_per_step, point.x, point.y, point.z,
+                    callback_fcn=callback_fcn, collect_bkg_flag=collect_bkg_flag)
+
+
 def collect_step_data(detector_position_x, detector_position_z, omega_start, omega_end, omega_step, exposure_time, x, y,
                       z, callback_fcn=None, collect_bkg_flag=False):
     """
@@ -80,68 +199,193 @@ def collect_step_data(detector_position_x, detector_position_z, omega_start, ome
         boolean flag which determines if a background collection should be done prior to the step collection
     """
     # performs the actual step measurement
-    # prepare the stage:
-    prepare_stage(detector_position_x, detector_position_z, omega_start, x, y, z)
-    # prepare the detector
-    previous_shutter_mode = prepare_detector()
+    # the stage, the detector (including the optional background) and the trajectory are prepared simultaneously
+    stage_task = run_async(prepare_stage, detector_position_x, detector_position_z, omega_start, x, y, z)
+    collect_bkg = collect_bkg_flag and (callback_fcn is None or callback_fcn())
+    detector_task = run_async(prepare_detector, collect_bkg)
 
     # perform measurements:
     num_steps = (omega_end - omega_start) / omega_step
 
-    stage_xps = XPSTrajectory(host=HOST, group=GROUP_NAME, positioners=POSITIONERS)
-    stage_xps.define_line_trajectories_general(stop_values=[[0, 0, 0, omega_step]], scan_time=exposure_time,
-                                               pulse_time=0.1, accel_values=DEFAULT_ACCEL)
+    try:
+        with xps_session.borrow() as stage_xps:
+            t1 = time.time()
+            trajectory_task = async_xps(timed('trajectory definition', stage_xps.define_line_trajectories_general),
+                                        stop_values=[[0, 0, 0, omega_step]], scan_time=exposure_time,
+                                        pulse_time=0.1, accel_values=DEFAULT_ACCEL)
+            gather(detector_task, stage_task, trajectory_task)
+            logger.info('Stage, detector and trajectory prepared in {:.3f} s.'.format(time.time() - t1))
+
+            if callback_fcn is None or (callback_fcn is not None and callback_fcn()):
+                try:
+                    collect_steps(num_steps, omega_start, omega_step, exposure_time, stage_xps, callback_fcn)
+                except Exception:
+                    caput(epics_config['detector_control'] + ':Acquire', 0, wait=True)
+                    raise
+            else:
+                logger.info('Data collection was aborted!')
+    finally:
+        restore_shutter_mode(detector_task)
 
-    if collect_bkg_flag:
-        if callback_fcn is None or (callback_fcn is not None and callback_fcn()):
-            collect_background()
-        else:
-            logger.info('Data collection was aborted!')
+    logger.info('Data collection finished.\n')
+    caput('13MARCCD2:AcquireSequence.STRA', 'Step scan finished', wait=True)
 
-    if callback_fcn is None or (callback_fcn is not None and callback_fcn()):
-        for step in range(int(num_steps)):
+
+def collect_continuous_step_data(detector_position_x, detector_position_z, omega_start, omega_end, omega_step,
+                                 exposure_time, x, y, z, callback_fcn=None, collect_bkg_flag=False):
+    """
+    Performs a single crystal step collection like collect_step_data, but the whole omega range is run as one XPS
+    trajectory. The trajectory pulse at the beginning of each step triggers one detector frame, between the steps the
+    stage waits for the detector readout (collection_config "DETECTOR READOUT TIME"). The parameters are the same as
+    for collect_step_data, whereby callback_fcn can only abort the collection before the trajectory is started.
+    """
+    stage_task = run_async(prepare_stage, detector_position_x, detector_position_z, omega_start, x, y, z)
+    collect_bkg = collect_bkg_flag and (callback_fcn is None or callback_fcn())
+    detector_task = run_async(prepare_detector, collect_bkg)
+
+    num_steps = int(round((omega_end - omega_start) / omega_step))
+
+    try:
+        with xps_session.borrow() as stage_xps:
             t1 = time.time()
-            longstring = 'Running Omega-Trajectory from {} deg by {} deg {} s'.format(omega_start + step * omega_step,
-                                                                                     omega_step,
-                                                                                     exposure_time)
-            shortstring = 'start {} step {} time {} s'.format(omega_start + step * omega_step,
-                                                 omega_step,          exposure_time)
-
-            caput('13MARCCD2:AcquireSequence.STRA', shortstring, wait=True)
-            logging.info(longstring)
-            collect_step(exposure_time, stage_xps)
-            logger.info('Time needed for one single step collection {}.\n'.format(time.time() - t1))
-
-            if callback_fcn is not None:
-                if callback_fcn() is False:
-                    logger.info('Data collection was aborted!')
-                    break
-    else:
-        logger.info('Data collection was aborted!')
+            trajectory_task = async_xps(timed('trajectory definition', stage_xps.define_step_trajectory),
+                                        step_values=[0, 0, 0, omega_step],
+                                        num_steps=num_steps, exposure_time=exposure_time,
+                                        dwell_time=collection_config['DETECTOR READOUT TIME'],
+                                        accel_values=DEFAULT_ACCEL)
+            gather(detector_task, stage_task, trajectory_task)
+            logger.info('Stage, detector and trajectory prepared in {:.3f} s.'.format(time.time() - t1))
+
+            if callback_fcn is not None and not callback_fcn():
+                logger.info('Data collection was aborted!')
+            else:
+                previous_trigger_settings = prepare_detector_triggering(num_steps, exposure_time)
+                try:
+                    run_continuous_step_trajectory(stage_xps, num_steps, omega_start, omega_step, exposure_time)
+                except Exception:
+                    # the detector would otherwise stay armed and wait for trigger pulses
+                    caput(epics_config['detector_control'] + ':Acquire', 0, wait=True)
+                    raise
+                finally:
+                    restore_detector_triggering(previous_trigger_settings)
+    finally:
+        restore_shutter_mode(detector_task)
 
-    caput(epics_config['detector_control'] + ':ShutterMode', previous_shutter_mode, wait=True)
     logger.info('Data collection finished.\n')
     caput('13MARCCD2:AcquireSequence.STRA', 'Step scan finished', wait=True)
-    del stage_xps
+
+
+def run_continuous_step_trajectory(stage_xps, num_steps, omega_start, omega_step, exposure_time):
+    """runs the trajectory of collect_continuous_step_data and waits until all frames are written"""
+    detector_state = get_detector_state()
+    detector_state.start_frame()
+
+    shortstring = 'start {} step {} time {} s'.format(omega_start, omega_step, exposure_time)
+    caput('13MARCCD2:AcquireSequence.STRA', shortstring, wait=True)
+    logger.info('Running continuous Omega-Trajectory from {} deg with {} steps of {} deg {} s'.format(
+        omega_start, num_steps, omega_step, exposure_time))
+
+    gather_filename = get_gather_filename()
+    t1 = time.time()
+    caput(epics_config['detector_control'] + ':Acquire', 1)
+    time.sleep(0.25)
+    stage_xps.run_line_trajectory_general(outfile=gather_filename)
+
+    timeout = get_detector_timeout(exposure_time, num_steps)
+    wait_for_detector(detector_state.wait_for_acquisition_done, timeout)
+    wait_for_detector(detector_state.wait_until_finished, timeout)
+    logger.info('Time needed for {} steps {:.3f} s ({:.3f} s exposure).'.format(
+        num_steps, time.time() - t1, num_steps * exposure_time))
+
+
+def collect_steps(num_steps, omega_start, omega_step, exposure_time, stage_xps, callback_fcn=None):
+    num_steps = int(num_steps)
+    pipelined = collection_config['PIPELINED STEP SCAN']
+    for step in range(num_steps):
+        t1 = time.time()
+        longstring = 'Running Omega-Trajectory from {} deg by {} deg {} s'.format(omega_start + step * omega_step,
+                                                                                 omega_step,
+                                                                                 exposure_time)
+        shortstring = 'start {} step {} time {} s'.format(omega_start + step * omega_step,
+                                                         omega_step, exposure_time)
+
+        caput('13MARCCD2:AcquireSequence.STRA', shortstring, wait=True)
+        logging.info(longstring)
+
+        with span('step', step=step):
+            if pipelined:
+                continue_fcn = partial(continue_step_collection, step, num_steps, callback_fcn)
+                continue_collection = collect_pipelined_step(exposure_time, stage_xps, step == 0, continue_fcn)
+            else:
+                collect_step(exposure_time, stage_xps)
+                continue_collection = callback_fcn is None or callback_fcn() is not False
+        logger.info('Time needed for one single step collection {}.\n'.format(time.time() - t1))
+
+        if not continue_collection:
+            if step < num_steps - 1:
+                logger.info('Data collection was aborted!')
+            break
+
+
+def continue_step_collection(step, num_steps, callback_fcn=None):
+    """calls callback_fcn after every step like the sequential collection and returns whether another step follows"""
+    continue_collection = callback_fcn is None or callback_fcn() is not False
+    return continue_collection and step < num_steps - 1
 
 
 def collect_step(exposure_time, stage_xps):
-    detector_checker = MarCCDChecker(epics_config['detector_control'])
+    detector_state = get_detector_state()
+    detector_state.start_frame()
+    gather_filename = get_gather_filename()
 
     # start data collection
     collect_data(exposure_time + 50)
     time.sleep(0.25)
-    stage_xps.run_line_trajectory_general()
+    stage_xps.run_line_trajectory_general(outfile=gather_filename)
     # stop detector
     caput('13MARCCD2:cam1:Acquire', 0, wait=True)
     # wait for readout
-    while not detector_checker.is_finished():
-        time.sleep(0.01)
-    del detector_checker
+    wait_for_detector(detector_state.wait_until_finished, get_detector_timeout(exposure_time))
     logger.info("Data collection finished.")
     time.sleep(0.25)
 
 
+def collect_pipelined_step(exposure_time, stage_xps, first_step, continue_fcn):
+    """
+    Collects a single step like collect_step, but the stage is moved on as soon as the detector has read out the
+    frame, while the correction and writing of the frame still continue. The return move of this step and the ramp
+    move of the next step are done as a single move.
+    :param first_step:
+        whether this is the first step of the scan, i.e. the stage is still at the nominal start position
+    :param continue_fcn:
+        function called after the readout, returning whether another step will follow
+    :return:
+        whether another step will follow
+    """
+    detector_state = get_detector_state()
+    detector_state.start_frame()
+    gather_filename = get_gather_filename()
+
+    # start data collection
+    collect_data(exposure_time + 50)
+    time.sleep(0.25)
+    stage_xps.run_line_trajectory_general(outfile=gather_filename, move_to_start=first_step, move_back=False)
+    # stop detector
+    caput('13MARCCD2:cam1:Acquire', 0, wait=True)
+    # wait for readout only, correction and writing are overlapped with the next motion
+    wait_for_detector(detector_state.wait_for_readout, get_detector_timeout(exposure_time))
+
+    continue_collection = continue_fcn()
+    if continue_collection:
+        stage_xps.move_to_next_start()
+    else:
+        stage_xps.move_to_stop()
+
+    wait_for_detector(detector_state.wait_until_finished, get_detector_timeout(exposure_time))
+    logger.info("Data collection finished.")
+    return continue_collection
+
+
 def collect_background():
     logger.info("Acquiring Detector Background.")
     caput('13MARCCD2:AcquireSequence.STRA', 'Acquiring Detector Background', wait=True)
@@ -154,125 +398,171 @@ def collect_background():
 
 
 def prepare_stage(detector_position_x, detector_pos_z, omega_start, x, y, z):
-    move_to_sample_pos(x, y, z)
-    move_to_omega_position(omega_start)
-    move_to_detector_position(detector_position_x, detector_pos_z)
-
-
-def prepare_detector():
-    previous_shutter_mode = caget(epics_config['detector_control'] + ':ShutterMode')
-    caput(epics_config['detector_control'] + ':ShutterMode', 0, wait=True)
+    t1 = time.time()
+    logger.info('Moving Sample to x: {}, y: {}, z: {}, omega: {} and Detector to x: {}, z: {}'.format(
+        x, y, z, omega_start, detector_position_x, detector_pos_z))
+    with span('stage preparation'):
+        move_axes([('sample_position_x', x),
+                   ('sample_position_y', y),
+                   ('sample_position_z', z),
+                   ('sample_position_omega', omega_start),
+                   ('detector_position_x', detector_position_x),
+                   ('detector_position_z', detector_pos_z)])
+    logger.info('Moving Sample and Detector finished after {:.2f} s.\n'.format(time.time() - t1))
+
+
+def move_axes(targets):
+    """
+    Moves the axes to their targets concurrently and waits until they are settled.
+    :param targets: list of (epics_config motor name, target position) tuples
+    :raises MotionError: naming the axes which did not reach their targets
+    """
+    coordinator = MotionCoordinator()
+    if not coordinator.move(targets):
+        raise MotionError('Axes did not reach their targets: {}'.format(', '.join(
+            '{} ({})'.format(axis, dict(targets)[axis]) for axis in coordinator.get_failed_axes())))
+
+
+def prepare_detector(collect_bkg=False):
+    """opens the shutter control of the detector and returns the previous ShutterMode for restore_shutter_mode"""
+    with span('detector preparation'):
+        previous_shutter_mode = caget(epics_config['detector_control'] + ':ShutterMode')
+        caput(epics_config['detector_control'] + ':ShutterMode', 0, wait=True)
+    if collect_bkg:
+        try:
+            with span('background collection'):
+                collect_background()
+        except Exception:
+            caput(epics_config['detector_control'] + ':ShutterMode', previous_shutter_mode, wait=True)
+            raise
     return previous_shutter_mode
 
 
-def collect_wide_data(detector_position_x, detector_position_z, omega_start, omega_end, exposure_time, x, y, z):
-    # performs the actual wide measurement
+def restore_shutter_mode(detector_task):
+    """
+    Restores the ShutterMode changed by the prepare_detector task. Nothing is restored when the task failed, since it
+    restores the ShutterMode itself after it was changed.
+    """
+    try:
+        previous_shutter_mode = detector_task.result()
+    except Exception:
+        return
+    caput(epics_config['detector_control'] + ':ShutterMode', previous_shutter_mode, wait=True)
 
-    # prepare the stage:
-    prepare_stage(detector_position_x, detector_position_z, omega_start, x, y, z)
 
-    # prepare the detector
-    previous_shutter_mode = prepare_detector()
-    detector_checker = MarCCDChecker(epics_config['detector_control'])
+def prepare_detector_triggering(num_images, exposure_time):
+    """
+    Sets the detector up for taking num_images frames, each started by an external trigger. Returns the previous
+    settings for restore_detector_triggering.
+    """
+    previous_settings = []
+    for setting in ['TriggerMode', 'ImageMode', 'NumImages', 'AcquireTime']:
+        previous_settings.append((setting, caget(epics_config['detector_control'] + ':' + setting)))
+
+    try:
+        caput(epics_config['detector_control'] + ':TriggerMode', collection_config['DETECTOR TRIGGER MODE'],
+              wait=True)
+        caput(epics_config['detector_control'] + ':ImageMode', 1, wait=True)  # Multiple
+        caput(epics_config['detector_control'] + ':NumImages', num_images, wait=True)
+        caput(epics_config['detector_control'] + ':AcquireTime', exposure_time, wait=True, timeout=60)
+        trigger_mode = caget(epics_config['detector_control'] + ':TriggerMode_RBV', as_string=True)
+        if trigger_mode != str(collection_config['DETECTOR TRIGGER MODE']):
+            raise DetectorError('Detector trigger mode is {} instead of {}.'.format(
+                trigger_mode, collection_config['DETECTOR TRIGGER MODE']))
+    except Exception:
+        restore_detector_triggering(previous_settings)
+        raise
+    return previous_settings
+
+
+def restore_detector_triggering(previous_settings):
+    for setting, value in previous_settings:
+        caput(epics_config['detector_control'] + ':' + setting, value, wait=True)
 
-    # start data collection
-    # perform_background_collection()
-    collect_data(exposure_time + 50)
 
-    # start trajectory scan
+def collect_wide_data(detector_position_x, detector_position_z, omega_start, omega_end, exposure_time, x, y, z):
+    # performs the actual wide measurement
     omega_range = omega_end - omega_start
-
     wstring = 'start {} range {} time {} s'.format(omega_start,
                                                  omega_range,          exposure_time)
 
-    caput('13MARCCD2:AcquireSequence.STRA', wstring, wait=True)
-    print omega_range
-    run_omega_trajectory(omega_range, exposure_time)
+    # prepare stage, detector and trajectory simultaneously
+    stage_task = run_async(prepare_stage, detector_position_x, detector_position_z, omega_start, x, y, z)
+    detector_task = run_async(prepare_detector)
+    status_task = async_caput('13MARCCD2:AcquireSequence.STRA', wstring)
 
-    # stop detector and wait for the detector readout
-    time.sleep(0.1)
-    caput(epics_config['detector_control'] + ':Acquire', 0)
-    caput(epics_config['detector_control'] + ':ShutterMode', previous_shutter_mode, wait=True)
-    while not detector_checker.is_finished():
+    try:
+        with xps_session.borrow() as stage_xps:
+            t1 = time.time()
+            trajectory_task = async_xps(define_omega_trajectory, stage_xps, omega_range, exposure_time)
+            gather(detector_task, stage_task, trajectory_task, status_task)
+            logger.info('Stage, detector and trajectory prepared in {:.3f} s.'.format(time.time() - t1))
+
+            detector_state = get_detector_state()
+            detector_state.start_frame()
+            gather_filename = get_gather_filename()
+
+            # start data collection
+            collect_data(exposure_time + 50)
+            time.sleep(0.25)
+
+            # start trajectory scan
+            execute_omega_trajectory(stage_xps, omega_range, exposure_time, gather_filename)
+    finally:
+        # stop detector, also when the trajectory failed
         time.sleep(0.1)
+        caput(epics_config['detector_control'] + ':Acquire', 0)
+        restore_shutter_mode(detector_task)
+
+    # wait for the detector readout
+    wait_for_detector(detector_state.wait_until_finished, get_detector_timeout(exposure_time))
     logger.info('Wide data collection finished.\n')
     #caput('13MARCCD2:AcquireSequence.STRA', 'Wide scan finished', wait=True)
     return
 
 
-class MarCCDChecker(object):
-    def __init__(self, pv_name):
-        self.detector_status = self.StatusChecker(3)
-        self.pv_name = pv_name
-        camonitor(pv_name + ':MarReadoutStatus_RBV',
-                  writer=partial(self.detector_status.set_status, 0, 'Idle', True))
-        camonitor(pv_name + ':MarCorrectStatus_RBV',
-                  writer=partial(self.detector_status.set_status, 1, 'Idle', True))
-        camonitor(pv_name + ':MarWritingStatus_RBV',
-                  writer=partial(self.detector_status.set_status, 2, 'Idle', True))
-
-    def is_finished(self):
-        if self.detector_status.is_true():
-            camonitor_clear(self.pv_name + ':MarReadoutStatus_RBV')
-            camonitor_clear(self.pv_name + ':MarCorrectStatus_RBV')
-            camonitor_clear(self.pv_name + ':MarWritingStatus_RBV')
-            return True
-        else:
-            return False
-
-    def read_out_is_finished(self):
-        if self.detector_status.status[0]:
-            return True
-        else:
-            False
-
-    class StatusChecker(object):
-        def __init__(self, num_status):
-            self.status = []
-            for ind in range(num_status):
-                self.status.append(False)
-
-        def set_status(self, ind, check_str, value, status_str):
-            if status_str.split()[-1] == check_str:
-                self.status[ind] = value
+def run_omega_trajectory(omega, running_time):
+    with xps_session.borrow() as stage_xps:
+        define_omega_trajectory(stage_xps, omega, running_time)
+        execute_omega_trajectory(stage_xps, omega, running_time)
 
-        def is_true(self):
-            for status in self.status:
-                if status is False:
-                    return False
-            return True
 
+def define_omega_trajectory(stage_xps, omega, running_time):
+    t1 = time.time()
+    with span('trajectory definition'):
+        stage_xps.define_line_trajectories_general(stop_values=[[0, 0, 0, omega]], scan_time=running_time,
+                                                   pulse_time=0.1)
+    logger.info('Trajectory defined in {:.3f} s.'.format(time.time() - t1))
 
-def run_omega_trajectory(omega, running_time):
-    stage_xps = XPSTrajectory(host=HOST, group=GROUP_NAME, positioners=POSITIONERS)
-    stage_xps.define_line_trajectories_general(stop_values=[[0, 0, 0, omega]], scan_time=running_time, pulse_time=0.1)
 
+def execute_omega_trajectory(stage_xps, omega, running_time, gather_filename='Gather.npz'):
     logger.info("Running Omega-Trajectory: {}d {}s".format(omega, running_time))
-    stage_xps.run_line_trajectory_general()
-    del stage_xps
+    t1 = time.time()
+    stage_xps.run_line_trajectory_general(outfile=gather_filename)
+    logger.info('Omega-Trajectory finished in {:.3f} s (scan time {} s).'.format(time.time() - t1, running_time))
 
 
 def collect_single_data(detector_position_x, detector_position_z, exposure_time, x, y, z, omega):
     #new commands
     #previous_shutter_mode = prepare_detector()
-    detector_checker = MarCCDChecker(epics_config['detector_control'])
+    detector_state = get_detector_state()
 
     # performs an actual single angle measurement:
-    move_to_sample_pos(x, y, z)
-    move_to_omega_position(omega)
-    move_to_detector_position(detector_position_x, detector_position_z)
+    stage_task = run_async(prepare_stage, detector_position_x, detector_position_z, omega, x, y, z)
 
     #more new commands
 
-    caput(epics_config['detector_control']+':AcquireTime', exposure_time)
+    exposure_task = run_async(timed('detector preparation', caput),
+                              epics_config['detector_control'] + ':AcquireTime', exposure_time, wait=True, timeout=60)
+    gather(stage_task, exposure_task)
+    detector_state.start_frame()
     caput(epics_config['detector_control'] + ':Acquire', 1, wait=True)
     time.sleep(1)
     caput(epics_config['detector_control'] + ':Acquire', 0, wait=True)
 
     #caput(epics_config['detector_control'] + ':ShutterMode', previous_shutter_mode, wait=True)
 
-    while not detector_checker.is_finished():
-        time.sleep(0.1)
+    wait_for_detector(detector_state.wait_until_finished, get_detector_timeout(exposure_time))
     logger.info('Still data collection finished.\n')
 
     return
@@ -280,43 +570,22 @@ def collect_single_data(detector_position_x, detector_position_z, exposure_time,
 
 def move_to_sample_pos(x, y, z, wait=True, callbacks=[]):
     logger.info('Moving Sample to x: {}, y: {}, z: {}'.format(x, y, z))
-    motor_x = PV(epics_config['sample_position_x'])
-    motor_y = PV(epics_config['sample_position_y'])
-    motor_z = PV(epics_config['sample_position_z'])
-    motor_x.put(x, use_complete=True)
-    motor_y.put(y, use_complete=True)
-    motor_z.put(z, use_complete=True)
-
+    targets = [('sample_position_x', x),
+               ('sample_position_y', y),
+               ('sample_position_z', z)]
     if wait:
-        while not motor_x.put_complete and \
-                not motor_y.put_complete and \
-                not motor_z.put_complete:
-            time.sleep(0.1)
+        move_axes(targets)
         for callback in callbacks:
             callback()
-    time.sleep(0.5)
-    logger.info('Moving Sample to x: {}, y: {}, z: {} finished.\n'.format(x, y, z))
+        logger.info('Moving Sample to x: {}, y: {}, z: {} finished.\n'.format(x, y, z))
+    else:
+        MotionCoordinator().move(targets, wait=False)
     caput('13MARCCD2:AcquireSequence.STRA', 'Scan finished', wait=True)
     return
 
 
-def move_to_omega_position(omega, wait=True):
-    logger.info('Moving Sample Omega to {}'.format(omega))
-    caput(epics_config['sample_position_omega'], omega, wait=wait)
-    if wait:
-        logger.info('Moving Sample Omega to {} finished.\n'.format(omega))
-
-
-def move_to_detector_position(detector_position_x, detector_position_z):
-    logger.info('Moving Detector X to {}'.format(detector_position_x))
-    caput(epics_config['detector_position_x'], detector_position_x, wait=True, timeout=300)
-    logger.info('Moving Detector Z to {}'.format(detector_position_z))
-    caput(epics_config['detector_position_z'], detector_position_z, wait=True, timeout=300)
-    logger.info('Moving Detector finished. \n')
-
-
 def collect_data(exposure_time, wait=False):
-    caput(epics_config['detector_control'] + ':AcquireTime', exposure_time, wait=True)
+    caput(epics_config['detector_control'] + ':AcquireTime', exposure_time, wait=True, timeout=60)
     logger.info('Starting data collection.')
     caput(epics_config['detector_control'] + ':Acquire', 1, wait=wait, timeout=exposure_time + 20)
     if wait:
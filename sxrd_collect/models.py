@@ -17,9 +17,13 @@
 #     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 __author__ = 'Clemens Prescher'
 
-import numpy as np
 from collections import OrderedDict
 
+from startup import lazy_import
+
+# numpy is only needed for creating maps, it is imported on first use to keep the startup of the GUI fast
+np = lazy_import('numpy')
+
 
 class SxrdModel(object):
     def __init__(self):
@@ -123,6 +127,49 @@ class SxrdModel(object):
                     largest_distance = point_distance
         return largest_distance
 
+    def to_dict(self):
+        """
+        Returns setups, points and their collection states as dictionary (e.g. for a JSON plan file), the states of a
+        point are given as {setup name: ["still", "wide", "step"]}.
+        """
+        setups = []
+        for setup in self.experiment_setups:
+            setups.append({'name': setup.name,
+                           'detector_pos_x': setup.detector_pos_x,
+                           'detector_pos_z': setup.detector_pos_z,
+                           'omega_start': setup.omega_start,
+                           'omega_end': setup.omega_end,
+                           'omega_step': setup.omega_step,
+                           'time_per_step': setup.time_per_step})
+        points = []
+        for point in self.sample_points:
+            states = {}
+            for ind, setup in enumerate(self.experiment_setups):
+                states[setup.name] = [scan_type for scan_type, state in
+                                      (('still', point.perform_still_for_setup[ind]),
+                                       ('wide', point.perform_wide_scan_for_setup[ind]),
+                                       ('step', point.perform_step_scan_for_setup[ind])) if state]
+            points.append({'name': point.name, 'x': point.x, 'y': point.y, 'z': point.z, 'states': states})
+        return {'setups': setups, 'points': points}
+
+    @staticmethod
+    def from_dict(data):
+        """creates an SxrdModel from a dictionary as returned by to_dict"""
+        model = SxrdModel()
+        for setup in data['setups']:
+            model.add_experiment_setup(setup['name'], float(setup['detector_pos_x']), float(setup['detector_pos_z']),
+                                       float(setup['omega_start']), float(setup['omega_end']),
+                                       float(setup['omega_step']), float(setup['time_per_step']))
+        for point in data['points']:
+            model.add_sample_point(point['name'], float(point['x']), float(point['y']), float(point['z']))
+            sample_point = model.sample_points[-1]
+            for ind, setup in enumerate(model.experiment_setups):
+                scan_types = point.get('states', {}).get(setup.name, [])
+                sample_point.set_perform_still_setup(ind, 'still' in scan_types)
+                sample_point.set_perform_wide_scan_setup(ind, 'wide' in scan_types)
+                sample_point.set_perform_step_scan_setup(ind, 'step' in scan_types)
+        return model
+
 
 class ExperimentSetup(object):
     def __init__(self, name, detector_pos_x=0, detector_pos_z=49, omega_start=0, omega_end=0, omega_step=0,
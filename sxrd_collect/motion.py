@@ -0,0 +1,243 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import time
+import logging
+from threading import Lock, Event
+
+from pv import PV, CAThread
+from config import epics_config, collection_config
+
+logger = logging.getLogger(__name__)
+
+_motors = {}
+
+
+def get_motor(axis):
+    """returns the session wide Motor for an epics_config motor name, the monitors are created on first use"""
+    if axis not in _motors:
+        _motors[axis] = Motor(epics_config[axis],
+                              timeout=get_axis_setting(collection_config['MOTION TIMEOUT'], axis),
+                              settle_readbacks=get_axis_setting(collection_config['MOTION SETTLE READBACKS'], axis))
+    return _motors[axis]
+
+
+def reset_motors():
+    """forgets the session wide motors, e.g. after changing the PV backend"""
+    _motors.clear()
+
+
+def get_axis_setting(settings, axis):
+    return settings.get(axis, settings['default'])
+
+
+class MotionError(RuntimeError):
+    """motors did not reach their targets within their timeouts"""
+
+
+class Motor(object):
+    """
+    Motor record with monitored done moving flag (.DMOV) and readback (.RBV). A move is in position when DMOV is set
+    and the readback is within the retry deadband (.RDBD) of the target. It is settled once the readback came to rest,
+    i.e. did not change by more than a tenth of the deadband for settle_readbacks times the longest interval between
+    two readback updates seen while the motor was moving. A move fails when the motor record finished it (DMOV set
+    again after the move started, i.e. after all retries) with the readback outside the deadband.
+    """
+
+    def __init__(self, pv_name, tolerance=None, timeout=60, settle_readbacks=2):
+        self.pv_name = pv_name
+        self.timeout = timeout
+        self.settle_readbacks = settle_readbacks
+
+        self._lock = Lock()
+        self._finished = Event()  # in position or stopped outside the deadband
+        self._target = None
+        self._moving = False
+        self._in_position = False
+        self._last_rbv = None
+        self._last_change = None
+        self._update_interval = None
+
+        self._val_pv = PV(pv_name)
+        if tolerance is None:
+            tolerance = PV(pv_name + '.RDBD').get()
+        self.tolerance = tolerance if tolerance else 0.001
+
+        self._dmov_pv = PV(pv_name + '.DMOV', auto_monitor=True, callback=self._update)
+        self._rbv_pv = PV(pv_name + '.RBV', auto_monitor=True, callback=self._update)
+
+    def move(self, position):
+        with self._lock:
+            self._target = position
+            self._moving = False
+            self._update_interval = None
+            self._finished.clear()
+        self._val_pv.put(position)
+        self._update()
+
+    def wait(self, timeout=None):
+        """
+        Waits until the motor is in position and settled.
+        :param timeout: maximum time in s, defaults to the timeout of the motor
+        :return: True if in position within the timeout, False if the timeout was reached
+        :raises MotionError: when the motor stopped outside the deadband of the target
+        """
+        if timeout is None:
+            timeout = self.timeout
+        t_end = time.time() + timeout
+        while True:
+            if not self._finished.wait(max(t_end - time.time(), 0)):
+                return False
+            with self._lock:
+                if not self._finished.is_set():
+                    continue
+                if not self._in_position:
+                    raise MotionError('{} stopped at {} outside the deadband of the target {}'.format(
+                        self.pv_name, self._last_rbv, self._target))
+                remaining_settle_time = self._last_change + self.get_settle_time() - time.time()
+            if remaining_settle_time <= 0:
+                return True
+            if time.time() + remaining_settle_time > t_end:
+                return False
+            time.sleep(remaining_settle_time)
+
+    def get_settle_time(self):
+        """time in s the readback has to stay at rest, 0 if no readback updates were seen during the move"""
+        if self._update_interval is None:
+            return 0
+        return self.settle_readbacks * self._update_interval
+
+    def is_in_position(self):
+        return self._finished.is_set() and self._in_position
+
+    def _update(self, **kwargs):
+        with self._lock:
+            # read within the lock, otherwise a stale read could clear the state set by a later callback
+            dmov = self._dmov_pv.value
+            rbv = self._rbv_pv.value
+            if dmov is None or rbv is None:
+                return
+
+            now = time.time()
+            if self._last_rbv is None or abs(rbv - self._last_rbv) > 0.1 * self.tolerance:
+                if self._moving and self._last_change is not None:
+                    self._update_interval = max(now - self._last_change, self._update_interval or 0)
+                self._last_rbv = rbv
+                self._last_change = now
+
+            if self._target is None:
+                return
+            if dmov == 0:
+                self._moving = True
+            self._in_position = dmov == 1 and abs(rbv - self._target) <= self.tolerance
+            if self._in_position or (dmov == 1 and self._moving):
+                self._finished.set()
+            else:
+                self._finished.clear()
+
+
+class MotionCoordinator(object):
+    """
+    Moves several motors at once and waits until all of them are finished, so that the time needed is given by the
+    slowest axis instead of the sum of all axes.
+
+    Axes are given by their epics_config names (e.g. "detector_position_x"). Axes listed together in one of the
+    serialized groups (collection_config "SERIALIZED AXES") are moved one after another in the order of the group,
+    all other axes are started immediately.
+    """
+
+    def __init__(self, serialized_groups=None):
+        if serialized_groups is None:
+            serialized_groups = collection_config['SERIALIZED AXES']
+        self.serialized_groups = [tuple(group) for group in serialized_groups]
+        self._targets = []
+        self._results = {}
+
+    def move(self, targets, wait=True):
+        """
+        Moves all axes to their targets. Every chain of serialized moves is performed in its own thread.
+        :param targets:
+            list of (axis name, target position) tuples
+        :param wait:
+            whether to wait until all moves are finished and settled
+        :return:
+            True if all moves finished within their timeouts, or the started threads if wait is False
+        """
+        self._targets = list(targets)
+        self._results = {}
+        threads = []
+        for chain in self.create_chains(targets):
+            thread = CAThread(target=self._run_chain, args=(chain,))
+            thread.start()
+            threads.append(thread)
+
+        if not wait:
+            return threads
+        for thread in threads:
+            thread.join()
+        return not self.get_failed_axes()
+
+    def get_failed_axes(self):
+        """axes of the last move which did not reach their target, including axes not started after a failure"""
+        return [axis for axis, _ in self._targets if not self._results.get(axis)]
+
+    def _run_chain(self, chain):
+        for axis, position in chain:
+            t1 = time.time()
+            motor = get_motor(axis)
+            logger.info('Moving {} to {}'.format(axis, position))
+            motor.move(position)
+            try:
+                self._results[axis] = motor.wait()
+            except MotionError as e:
+                self._results[axis] = False
+                logger.warning(str(e))
+                return
+            if self._results[axis]:
+                logger.debug('Moving {} finished after {:.2f} s.'.format(axis, time.time() - t1))
+            else:
+                logger.warning('Moving {} to {} timed out after {} s.'.format(axis, position, motor.timeout))
+                return
+
+    def create_chains(self, targets):
+        """
+        Splits the targets into chains of moves which have to be performed one after another. Independent axes form
+        a chain of their own.
+        """
+        chains = []
+        grouped = {}
+        for axis, position in targets:
+            group = self._get_group(axis)
+            if group is None:
+                chains.append([(axis, position)])
+            elif group in grouped:
+                grouped[group].append((axis, position))
+            else:
+                grouped[group] = [(axis, position)]
+                chains.append(grouped[group])
+
+        for group, chain in grouped.items():
+            chain.sort(key=lambda move: group.index(move[0]))
+        return chains
+
+    def _get_group(self, axis):
+        for group in self.serialized_groups:
+            if axis in group:
+                return group
+        return None
@@ -0,0 +1,237 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import math
+from collections import OrderedDict
+
+from point_order import order_sample_points, AUTO_ORDER, SAMPLE_AXES
+
+STILL = 'still'
+WIDE = 'wide'
+STEP = 'step'
+
+SCAN_DESCRIPTIONS = {STILL: 'still image', WIDE: 'wide scan', STEP: 'step scan'}
+FILENAME_SUFFICES = {STILL: '', WIDE: '_w', STEP: '_s'}
+
+STILL_OMEGA = -90.0
+
+AXES = ('sample_position_x', 'sample_position_y', 'sample_position_z', 'sample_position_omega',
+        'detector_position_x', 'detector_position_z')
+
+
+class Acquisition(object):
+    """A single still image, wide scan or step scan of one sample point with one experiment setup."""
+
+    def __init__(self, scan_type, sample_point, experiment_setup, setup_index):
+        self.scan_type = scan_type
+        self.sample_point = sample_point
+        self.experiment_setup = experiment_setup
+        self.setup_index = setup_index
+
+    @property
+    def omega_start(self):
+        if self.scan_type == STILL:
+            return STILL_OMEGA
+        return self.experiment_setup.omega_start
+
+    @property
+    def omega_end(self):
+        if self.scan_type == STILL:
+            return STILL_OMEGA
+        return self.experiment_setup.omega_end
+
+    @property
+    def num_frames(self):
+        if self.scan_type == STEP:
+            setup = self.experiment_setup
+            return int(round(abs(setup.omega_end - setup.omega_start) / setup.omega_step))
+        return 1
+
+    @property
+    def exposure_time(self):
+        """total exposure time, still images are exposed as long as the wide scan of the setup"""
+        return abs(self.experiment_setup.get_total_exposure_time())
+
+    @property
+    def detector_position(self):
+        return self.experiment_setup.detector_pos_x, self.experiment_setup.detector_pos_z
+
+    def get_start_positions(self):
+        return {'sample_position_x': self.sample_point.x,
+                'sample_position_y': self.sample_point.y,
+                'sample_position_z': self.sample_point.z,
+                'sample_position_omega': self.omega_start,
+                'detector_position_x': self.experiment_setup.detector_pos_x,
+                'detector_position_z': self.experiment_setup.detector_pos_z}
+
+    def get_end_positions(self):
+        positions = self.get_start_positions()
+        positions['sample_position_omega'] = self.omega_end
+        return positions
+
+    def __str__(self):
+        return "{} - {} - {}".format(self.scan_type, self.sample_point.name, self.experiment_setup.name)
+
+
+class PlanReport(object):
+    def __init__(self, num_acquisitions, naive_motion_time, optimized_motion_time):
+        self.num_acquisitions = num_acquisitions
+        self.naive_motion_time = naive_motion_time
+        self.optimized_motion_time = optimized_motion_time
+
+    @property
+    def saving(self):
+        return self.naive_motion_time - self.optimized_motion_time
+
+    def __str__(self):
+        return "{} acquisitions, predicted motion time {:.0f} s instead of {:.0f} s in table order " \
+               "(saving {:.0f} s)".format(self.num_acquisitions, self.optimized_motion_time,
+                                          self.naive_motion_time, self.saving)
+
+
+def compile_plan(model, skip_setups=(), sample_points=None):
+    """
+    Creates the flat list of acquisitions of an SxrdModel in table order: for every experiment setup all sample points
+    and for each point the still, wide and step scan.
+    :param skip_setups: indices of experiment setups which should not be collected
+    :param sample_points: sample points in the order they should be visited, defaults to the table order
+    """
+    if sample_points is None:
+        sample_points = model.sample_points
+    acquisitions = []
+    for setup_index, experiment_setup in enumerate(model.experiment_setups):
+        if setup_index in skip_setups:
+            continue
+        for sample_point in sample_points:
+            if sample_point.perform_still_for_setup[setup_index]:
+                acquisitions.append(Acquisition(STILL, sample_point, experiment_setup, setup_index))
+            if sample_point.perform_wide_scan_for_setup[setup_index]:
+                acquisitions.append(Acquisition(WIDE, sample_point, experiment_setup, setup_index))
+            if sample_point.perform_step_scan_for_setup[setup_index]:
+                acquisitions.append(Acquisition(STEP, sample_point, experiment_setup, setup_index))
+    return acquisitions
+
+
+def optimize_plan(acquisitions, start_positions, velocities):
+    """
+    Reorders the acquisitions to reduce the motion time. The acquisitions of each experiment setup stay together and
+    keep their order, but setups with the same detector position are batched and the detector positions are visited
+    nearest first. Within a detector position the setups are chained so that each one starts at the omega angle
+    closest to where the previous one ended. A setup visits the sample points in reverse order when this starts it
+    closer to the last sample point of the previous setup.
+    :param start_positions: dictionary of current motor positions with the epics_config motor names as keys
+    :param velocities: dictionary of motor velocities with the epics_config motor names as keys
+    """
+    setup_blocks = OrderedDict()
+    for acquisition in acquisitions:
+        setup_blocks.setdefault(acquisition.setup_index, []).append(acquisition)
+
+    detector_groups = OrderedDict()
+    for block in setup_blocks.values():
+        detector_groups.setdefault(block[0].detector_position, []).append(block)
+
+    ordered = []
+    positions = dict(start_positions)
+    groups = list(detector_groups.values())
+    while groups:
+        group = min(groups, key=lambda g: get_move_time(positions, g[0][0].get_start_positions(), velocities,
+                                                        ('detector_position_x', 'detector_position_z')))
+        groups.remove(group)
+        while group:
+            block = min(group, key=lambda b: get_move_time(positions, b[0].get_start_positions(), velocities,
+                                                           ('sample_position_omega',)))
+            group.remove(block)
+            block = min((block, reverse_sample_points(block)),
+                        key=lambda b: get_move_time(positions, b[0].get_start_positions(), velocities, SAMPLE_AXES))
+            ordered.extend(block)
+            positions = block[-1].get_end_positions()
+    return ordered
+
+
+def reverse_sample_points(acquisitions):
+    """reverses the order of the sample points, the acquisitions of each sample point keep their order"""
+    point_runs = []
+    for acquisition in acquisitions:
+        if point_runs and point_runs[-1][0].sample_point is acquisition.sample_point:
+            point_runs[-1].append(acquisition)
+        else:
+            point_runs.append([acquisition])
+    return [acquisition for run in reversed(point_runs) for acquisition in run]
+
+
+def estimate_motion_time(acquisitions, start_positions, velocities):
+    """
+    Estimates the time needed for moving between the acquisitions (not including the motion during the scans).
+    """
+    total_time = 0
+    positions = dict(start_positions)
+    for acquisition in acquisitions:
+        total_time += get_move_time(positions, acquisition.get_start_positions(), velocities)
+        positions = acquisition.get_end_positions()
+    return total_time
+
+
+def get_move_time(start_positions, end_positions, velocities, axes=AXES, acceleration_times=None):
+    """
+    all axes are moving simultaneously, therefore the slowest axis determines the time
+    :param acceleration_times: dictionary of motor acceleration times (.ACCL), the moves are assumed to have a
+        constant velocity if not given
+    """
+    move_time = 0
+    for axis in axes:
+        if start_positions.get(axis) is None:
+            continue
+        distance = abs(end_positions[axis] - start_positions[axis])
+        if acceleration_times is None:
+            axis_time = distance / float(velocities[axis])
+        else:
+            axis_time = get_trapezoidal_move_time(distance, velocities[axis], acceleration_times[axis])
+        move_time = max(move_time, axis_time)
+    return move_time
+
+
+def get_trapezoidal_move_time(distance, velocity, acceleration_time):
+    """time for a move starting and ending at rest, the motor reaches velocity after acceleration_time"""
+    if distance == 0:
+        return 0.0
+    if acceleration_time <= 0:
+        return distance / float(velocity)
+    if distance >= velocity * acceleration_time:
+        return distance / float(velocity) + acceleration_time
+    return 2 * math.sqrt(distance * acceleration_time / float(velocity))
+
+
+def create_plan(model, start_positions, velocities, skip_setups=(), optimize=True, point_order=AUTO_ORDER):
+    """
+    Compiles the acquisitions of the model and optionally reorders them.
+    :param point_order: method used for ordering the sample points when optimizing (see order_sample_points)
+    :return: list of acquisitions, PlanReport
+    """
+    acquisitions = compile_plan(model, skip_setups)
+    naive_time = estimate_motion_time(acquisitions, start_positions, velocities)
+    if optimize:
+        start_position = [start_positions.get(axis) for axis in SAMPLE_AXES]
+        if None in start_position:
+            start_position = None
+        sample_points = order_sample_points([point for point in model.sample_points if point.is_collecting()],
+                                            velocities, start_position, point_order)
+        acquisitions = compile_plan(model, skip_setups, sample_points)
+        acquisitions = optimize_plan(acquisitions, start_positions, velocities)
+    optimized_time = estimate_motion_time(acquisitions, start_positions, velocities)
+    return acquisitions, PlanReport(len(acquisitions), naive_time, optimized_time)
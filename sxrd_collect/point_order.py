@@ -0,0 +1,174 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TABLE_ORDER = 'table'
+SERPENTINE_ORDER = 'serpentine'
+SHORTEST_PATH_ORDER = 'shortest path'
+AUTO_ORDER = 'auto'
+
+SAMPLE_AXES = ('sample_position_x', 'sample_position_y', 'sample_position_z')
+
+
+def order_sample_points(sample_points, velocities, start_position=None, method=AUTO_ORDER, time_limit=0.3):
+    """
+    Sorts sample points into a visiting order with a short total stage travel time.
+    :param sample_points: list of SamplePoints
+    :param velocities: dictionary of motor velocities with the epics_config motor names as keys
+    :param start_position: (x, y, z) of the stage before the first point is visited
+    :param method: "table" keeps the given order, "serpentine" walks a grid row by row in alternating direction,
+                   "shortest path" uses nearest neighbour followed by 2-opt, "auto" uses serpentine for grids and the
+                   shortest path otherwise
+    :param time_limit: maximum time in s spent on the 2-opt improvement
+    :return: list of SamplePoints in visiting order
+    """
+    if method == TABLE_ORDER or len(sample_points) < 3:
+        return list(sample_points)
+
+    t1 = time.time()
+    positions = np.array([[point.x, point.y, point.z] for point in sample_points], dtype=float)
+    speeds = np.array([velocities[axis] for axis in SAMPLE_AXES], dtype=float)
+    if start_position is None:
+        start_position = positions[0]
+
+    if method == AUTO_ORDER:
+        method = SERPENTINE_ORDER if is_grid(positions) else SHORTEST_PATH_ORDER
+
+    if method == SERPENTINE_ORDER:
+        order = serpentine_order(positions, speeds, start_position)
+    elif method == SHORTEST_PATH_ORDER:
+        order = shortest_path_order(positions, speeds, start_position, time_limit)
+    else:
+        raise ValueError('Unknown sample point order: {}'.format(method))
+
+    logger.debug('Ordered {} sample points ({}) in {:.3f} s.'.format(len(sample_points), method, time.time() - t1))
+    return [sample_points[ind] for ind in order]
+
+
+def get_travel_times(start, end, speeds):
+    """stage axes move simultaneously, so the travel time is given by the slowest axis"""
+    return np.max(np.abs(np.asarray(end) - np.asarray(start)) / speeds, axis=-1)
+
+
+def get_path_time(positions, order, speeds, start_position):
+    path = np.vstack((start_position, positions[order]))
+    return np.sum(get_travel_times(path[:-1], path[1:], speeds))
+
+
+def is_grid(positions, decimals=6):
+    xs = np.unique(np.round(positions[:, 0], decimals))
+    ys = np.unique(np.round(positions[:, 1], decimals))
+    if len(xs) < 2 or len(ys) < 2 or len(xs) * len(ys) != len(positions):
+        return False
+    rounded = np.round(positions[:, :2], decimals)
+    return len(set(map(tuple, rounded))) == len(positions)
+
+
+def serpentine_order(positions, speeds, start_position, decimals=6):
+    """
+    Groups the points into rows of equal x and walks through y in alternating direction. All four corners are
+    tried as starting point and the fastest variant is returned.
+    """
+    row_keys = np.round(positions[:, 0], decimals)
+    rows = [np.flatnonzero(row_keys == key) for key in np.unique(row_keys)]
+    rows = [row[np.argsort(positions[row, 1], kind='mergesort')] for row in rows]
+
+    best_order, best_time = None, None
+    for rows_reversed in (False, True):
+        for first_reversed in (False, True):
+            cur_rows = rows[::-1] if rows_reversed else rows
+            order = []
+            for ind, row in enumerate(cur_rows):
+                reverse = (ind % 2 == 1) != first_reversed
+                order.extend(row[::-1] if reverse else row)
+            path_time = get_path_time(positions, order, speeds, start_position)
+            if best_time is None or path_time < best_time:
+                best_order, best_time = order, path_time
+    return list(best_order)
+
+
+def shortest_path_order(positions, speeds, start_position, time_limit=0.3):
+    order = nearest_neighbour_order(positions, speeds, start_position)
+    return two_opt(order, positions, speeds, start_position, time_limit)
+
+
+def nearest_neighbour_order(positions, speeds, start_position):
+    # in time units (position / speed) the travel time is the Chebyshev distance, the not yet visited points are kept
+    # at the front of the coordinate arrays so that every search only looks at the remaining points
+    scaled = (positions / speeds).T.copy()
+    indices = np.arange(len(positions))
+    current = np.asarray(start_position, dtype=float) / speeds
+    buf = np.empty(len(positions))
+    tmp = np.empty(len(positions))
+    order = []
+    for remaining in range(len(positions), 0, -1):
+        dist, cur_tmp = buf[:remaining], tmp[:remaining]
+        np.abs(np.subtract(scaled[0, :remaining], current[0], out=dist), out=dist)
+        for axis in (1, 2):
+            np.abs(np.subtract(scaled[axis, :remaining], current[axis], out=cur_tmp), out=cur_tmp)
+            np.maximum(dist, cur_tmp, out=dist)
+        ind = int(np.argmin(dist))
+        order.append(indices[ind])
+        current = scaled[:, ind].copy()
+        last = remaining - 1
+        scaled[:, ind] = scaled[:, last]
+        indices[ind] = indices[last]
+    return order
+
+
+def two_opt(order, positions, speeds, start_position, time_limit=0.3):
+    """
+    Improves an open path starting at start_position by reversing segments as long as this shortens the travel time.
+    For each edge all possible second edges are evaluated at once.
+    """
+    t_end = time.time() + time_limit
+    # the start position is the fixed first element of the path
+    path_positions = np.vstack((start_position, positions))
+    path = np.concatenate(([0], np.asarray(order) + 1))
+    num = len(path)
+
+    improved = True
+    while improved and time.time() < t_end:
+        improved = False
+        points = path_positions[path]
+        edges = get_travel_times(points[:-1], points[1:], speeds)
+        for i in range(num - 2):
+            # replace edges (i, i+1) and (j, j+1) by (i, j) and (i+1, j+1), for the last j there is no second edge
+            candidates = points[i + 2:]
+            removed = edges[i] + np.append(edges[i + 2:], 0)
+            added = get_travel_times(points[i], candidates, speeds)
+            added[:-1] += get_travel_times(points[i + 1], candidates[1:], speeds)
+            gains = removed - added
+            best = int(np.argmax(gains))
+            if gains[best] > 1e-9:
+                j = i + 2 + best
+                path[i + 1:j + 1] = path[i + 1:j + 1][::-1]
+                points = path_positions[path]
+                edges = get_travel_times(points[:-1], points[1:], speeds)
+                improved = True
+            if time.time() > t_end:
+                break
+    return list(path[1:] - 1)
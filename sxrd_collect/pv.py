@@ -0,0 +1,97 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Process variable access used by the whole program. caget, caput, camonitor, PV and CAThread are taken from here
+instead of pyepics directly, so that collections can also run against the in-process simulator
+(simulation.epics_simulator). The backend is selected by collection_config "PV BACKEND" or set_backend(), which has
+to be called before the first PV is used. pyepics is only imported when the first PV is used.
+"""
+__author__ = 'Clemens Prescher'
+
+from config import collection_config
+
+_backend = None
+
+
+class ChannelAccessException(Exception):
+    """raised by caget and caput for channel access errors of the backend"""
+
+
+class EpicsBackend(object):
+    """channel access through pyepics"""
+
+    def __init__(self):
+        import epics
+        from epics.ca import CAThread, ChannelAccessException as EpicsChannelAccessException
+        self._epics = epics
+        self._exception = EpicsChannelAccessException
+        self.camonitor = epics.camonitor
+        self.PV = epics.PV
+        self.CAThread = CAThread
+
+    def caget(self, pvname, **kwargs):
+        try:
+            return self._epics.caget(pvname, **kwargs)
+        except self._exception as e:
+            raise ChannelAccessException(str(e))
+
+    def caput(self, pvname, value, **kwargs):
+        try:
+            return self._epics.caput(pvname, value, **kwargs)
+        except self._exception as e:
+            raise ChannelAccessException(str(e))
+
+
+def set_backend(backend):
+    """
+    :param backend: "epics", "simulation" or a backend object providing caget, caput, camonitor, PV and CAThread
+    """
+    global _backend
+    if backend == 'epics':
+        backend = EpicsBackend()
+    elif backend == 'simulation':
+        from simulation.epics_simulator import EpicsSimulator
+        backend = EpicsSimulator()
+    _backend = backend
+    return _backend
+
+
+def get_backend():
+    if _backend is None:
+        set_backend(collection_config['PV BACKEND'])
+    return _backend
+
+
+def caget(pvname, **kwargs):
+    return get_backend().caget(pvname, **kwargs)
+
+
+def caput(pvname, value, **kwargs):
+    return get_backend().caput(pvname, value, **kwargs)
+
+
+def camonitor(pvname, **kwargs):
+    return get_backend().camonitor(pvname, **kwargs)
+
+
+def PV(pvname, **kwargs):
+    return get_backend().PV(pvname, **kwargs)
+
+
+def CAThread(*args, **kwargs):
+    return get_backend().CAThread(*args, **kwargs)
@@ -0,0 +1,128 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Registry of monitored PV objects for the values read repeatedly by the GUI and the measurement functions (motor
+positions, velocities and limits, file plugin settings, interlock motors). connect() creates all of them at once and
+waits for the connections concurrently, afterwards get() returns the last monitored value from memory:
+
+    pv_registry.connect()
+    omega = pv_registry.get(epics_config['sample_position_omega'])
+
+Names which are not registered or not connected are read with caget, so get() can be used before connect() has
+finished. The registry is emptied when another PV backend is set with pv.set_backend.
+"""
+__author__ = 'Clemens Prescher'
+
+import time
+import logging
+from threading import Lock
+
+import pv
+from config import epics_config
+
+logger = logging.getLogger(__name__)
+
+MOTOR_FIELDS = ['', '.RBV', '.VELO', '.ACCL', '.HLM', '.LLM']
+DETECTOR_CONTROL_FIELDS = [':AcquireTime', ':ShutterMode']
+DETECTOR_FILE_FIELDS = [':FilePath', ':FileName', ':FileNumber']
+# mirrors and microscope, which have to be out of the beam for a collection (see measurement.check_conditions)
+INTERLOCK_PVS = ['13IDD:m24.RBV', '13IDD:m23.RBV', '13IDD:m67.RBV']
+
+
+def get_default_pv_names():
+    """all PVs of the motors, the detector and the interlocks in epics_config and INTERLOCK_PVS"""
+    names = []
+    for key, pv_name in sorted(epics_config.items()):
+        if key == 'detector_control':
+            names.extend(pv_name + field for field in DETECTOR_CONTROL_FIELDS)
+        elif key == 'detector_file':
+            names.extend(pv_name + field for field in DETECTOR_FILE_FIELDS)
+        else:
+            names.extend(pv_name + field for field in MOTOR_FIELDS)
+    names.extend(INTERLOCK_PVS)
+    return names
+
+
+class PVRegistry(object):
+    def __init__(self):
+        self._pvs = {}
+        self._backend = None
+        self._lock = Lock()
+
+    def _check_backend(self):
+        backend = pv.get_backend()
+        if backend is not self._backend:
+            self.clear()
+            self._backend = backend
+
+    def register(self, names):
+        """creates monitored PV objects for names which are not registered yet, does not wait for the connection"""
+        with self._lock:
+            self._check_backend()
+            for name in names:
+                if name not in self._pvs:
+                    self._pvs[name] = pv.PV(name, auto_monitor=True)
+            return [self._pvs[name] for name in names]
+
+    def connect(self, names=None, timeout=5.0):
+        """
+        Registers the PVs and waits until they are connected, all connections are made concurrently.
+        :param names: PV names, defaults to get_default_pv_names()
+        :param timeout: maximum time in s to wait for all connections
+        :return: names of the PVs which could not be connected
+        """
+        if names is None:
+            names = get_default_pv_names()
+        t1 = time.time()
+        pvs = self.register(names)
+        t_end = t1 + timeout
+        unconnected = [name for name, process_variable in zip(names, pvs)
+                       if not process_variable.wait_for_connection(timeout=max(t_end - time.time(), 0))]
+        logger.info('Connected {} of {} PVs in {:.2f} s.'.format(len(names) - len(unconnected), len(names),
+                                                                   time.time() - t1))
+        if unconnected:
+            logger.warning('Could not connect to: {}'.format(', '.join(unconnected)))
+        return unconnected
+
+    def get(self, name, as_string=False):
+        """monitored value of a registered and connected PV, otherwise the value read by caget"""
+        with self._lock:
+            self._check_backend()
+            process_variable = self._pvs.get(name)
+        if process_variable is None or not process_variable.connected:
+            return pv.caget(name, as_string=as_string)
+        return process_variable.get(as_string=as_string)
+
+    def is_registered(self, name):
+        return name in self._pvs
+
+    def clear(self):
+        for process_variable in self._pvs.values():
+            process_variable.disconnect()
+        self._pvs = {}
+
+
+registry = PVRegistry()
+
+
+def connect(names=None, timeout=5.0):
+    return registry.connect(names, timeout)
+
+
+def get(name, as_string=False):
+    return registry.get(name, as_string)
@@ -0,0 +1,86 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Simulated beamline for running collections without hardware: the XPS simulator and the PV simulator are started and
+the program (pv backend, xps_config and the XPS session of measurement) is pointed at them until stop() is called.
+
+    with SimulatedBeamline(time_scale=0.1, data_folder='/tmp/sxrd') as beamline:
+        measurement.collect_single_data(...)
+"""
+__author__ = 'Clemens Prescher'
+
+import logging
+
+import pv
+import motion
+import measurement
+from config import xps_config, epics_config
+from simulation.xps_simulator import XPSSimulator
+from simulation.epics_simulator import EpicsSimulator
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedBeamline(object):
+    """
+    :param time_scale: factor applied to all motion and detector durations, 0 makes them instantaneous
+    :param data_folder: folder into which the simulated detector writes its frames and the gathering files are saved
+    """
+
+    def __init__(self, time_scale=1.0, data_folder=None):
+        self.time_scale = time_scale
+        self.data_folder = data_folder
+        self.xps = None
+        self.epics = None
+        self._previous_config = {}
+
+    def start(self):
+        self.xps = XPSSimulator(time_scale=self.time_scale).start()
+        self.epics = EpicsSimulator(time_scale=self.time_scale)
+        # the trajectory pulse output of the XPS is wired to the trigger input of the detector
+        self.xps.state.pulse_callbacks.append(self.epics.detector.trigger)
+
+        self._previous_config = dict((key, xps_config[key]) for key in ('HOST', 'PORT', 'FTP PORT'))
+        xps_config.update({'HOST': self.xps.host, 'PORT': self.xps.port, 'FTP PORT': self.xps.ftp_port})
+        if self.data_folder is not None:
+            self.epics.caput(epics_config['detector_file'] + ':FilePath', self.data_folder)
+        self._connect_program()
+        logger.info('Simulated beamline started (time scale {}).'.format(self.time_scale))
+        return self
+
+    def stop(self):
+        xps_config.update(self._previous_config)
+        self.epics = None
+        self._connect_program()
+        self.xps.stop()
+        self.xps = None
+
+    def _connect_program(self):
+        measurement.xps_session.close()
+        measurement.xps_session.host = xps_config['HOST']
+        measurement.xps_session.port = xps_config['PORT']
+        measurement.xps_session.ftp_port = xps_config['FTP PORT']
+        measurement.reset_detector_state()
+        motion.reset_motors()
+        pv.set_backend(self.epics)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,446 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+In-process stand-in for the channel access PVs of the beamline. EpicsSimulator provides caget, caput, camonitor, PV
+and CAThread like pyepics and is selected with pv.set_backend("simulation") or collection_config "PV BACKEND".
+
+Simulated are the motor records of epics_config (moving with velocity VELO and acceleration time ACCL, DMOV and RBV
+updates), the MarCCD camera (exposure, readout, correction and writing with their status PVs) and the TIFF1 file
+plugin writing one file per frame. All other PVs are created on their first caput. Durations are multiplied by
+time_scale, 0 makes them instantaneous.
+"""
+__author__ = 'Clemens Prescher'
+
+import os
+import math
+import time
+import logging
+from threading import Thread, Lock, Event
+from Queue import Queue, Empty
+
+from config import epics_config
+from plan import get_trapezoidal_move_time
+
+logger = logging.getLogger(__name__)
+
+# epics_config motor name: (position, velocity, acceleration time, low limit, high limit)
+DEFAULT_MOTORS = {
+    'sample_position_x': (0.0, 1.0, 0.2, -25.0, 25.0),
+    'sample_position_y': (0.0, 1.0, 0.2, -25.0, 25.0),
+    'sample_position_z': (0.0, 1.0, 0.2, -25.0, 25.0),
+    'sample_position_omega': (-90.0, 10.0, 0.5, -180.0, 180.0),
+    'detector_position_x': (0.0, 2.0, 0.5, -200.0, 200.0),
+    'detector_position_z': (0.0, 2.0, 0.5, -200.0, 200.0),
+}
+
+# motors checked by MainController.check_conditions, placed where the collection is allowed
+CONDITION_MOTORS = {'13IDD:m24': -110.0, '13IDD:m23': -110.0, '13IDD:m67': -70.0}
+
+MAR_STATUS_IDLE = 0
+MAR_STATUS_QUEUED = 1
+MAR_STATUS_EXECUTING = 2
+
+# MarCCD TriggerMode choices, frames are started by an external trigger pulse in Frame and Bulb mode
+MAR_TRIGGER_MODES = ('Internal', 'Frame', 'Bulb', 'Timed')
+MAR_EXTERNAL_TRIGGER_MODES = ('Frame', 'Bulb')
+
+
+class Field(object):
+    """
+    A single simulated PV. Puts are either stored directly or handed to on_put, which can return an Event signalling
+    the completion of the put.
+    """
+
+    def __init__(self, name, value=None, on_put=None):
+        self.name = name
+        self.value = value
+        self.on_put = on_put
+        self.callbacks = []
+
+    def get(self):
+        return self.value
+
+    def post(self, value):
+        """sets the value and informs the monitors, like an update coming from the IOC"""
+        self.value = value
+        for callback in list(self.callbacks):
+            callback(pvname=self.name, value=value, char_value=str(value))
+
+    def put(self, value, wait=False, timeout=300):
+        if self.on_put is None:
+            self.post(value)
+            return 1
+        done = self.on_put(value)
+        if wait and done is not None and not done.wait(timeout):
+            return -1
+        return 1
+
+
+class SimulatedPV(object):
+    """the parts of epics.PV used by the program"""
+
+    def __init__(self, simulator, pvname, callback=None, **kwargs):
+        self.pvname = pvname
+        self._field = simulator.get_field(pvname)
+        self._callbacks = []
+        if callback is not None:
+            self.add_callback(callback)
+
+    @property
+    def connected(self):
+        return self._field.value is not None
+
+    @property
+    def value(self):
+        return self._field.value
+
+    def wait_for_connection(self, timeout=None):
+        return self.connected
+
+    def get(self, as_string=False, **kwargs):
+        value = self._field.get()
+        if as_string and value is not None:
+            return str(value)
+        return value
+
+    def put(self, value, wait=False, timeout=300, **kwargs):
+        return self._field.put(value, wait, timeout)
+
+    def add_callback(self, callback, **kwargs):
+        self._callbacks.append(callback)
+        self._field.callbacks.append(callback)
+
+    def clear_callbacks(self):
+        for callback in self._callbacks:
+            self._field.callbacks.remove(callback)
+        self._callbacks = []
+
+    def disconnect(self):
+        self.clear_callbacks()
+
+
+class SimulatedMotor(object):
+    """
+    Motor record with trapezoidal velocity profile. A new target given while moving replaces the current move,
+    targets outside of the soft limits (HLM, LLM) are rejected. The (start, end) times of all moves are kept in
+    moves.
+    """
+
+    def __init__(self, simulator, name, position=0.0, velocity=1.0, acceleration_time=0.2, low_limit=-1000.0,
+                 high_limit=1000.0, resolution=0.001):
+        self.simulator = simulator
+        self.name = name
+        self._lock = Lock()
+        self._move_id = 0
+        self._done = Event()
+        self._done.set()
+        self.moves = []
+
+        self.val = simulator.add_field(name, position, on_put=self._start_move)
+        simulator.fields[name + '.VAL'] = self.val
+        self.rbv = simulator.add_field(name + '.RBV', position)
+        self.dmov = simulator.add_field(name + '.DMOV', 1)
+        self.movn = simulator.add_field(name + '.MOVN', 0)
+        self.velo = simulator.add_field(name + '.VELO', velocity)
+        self.accl = simulator.add_field(name + '.ACCL', acceleration_time)
+        self.rdbd = simulator.add_field(name + '.RDBD', resolution)
+        self.llm = simulator.add_field(name + '.LLM', low_limit)
+        self.hlm = simulator.add_field(name + '.HLM', high_limit)
+
+    def _start_move(self, target):
+        target = float(target)
+        if not self.llm.value <= target <= self.hlm.value:
+            logger.warning('{}: target {} is outside of the limits'.format(self.name, target))
+            return None
+        with self._lock:
+            self._move_id += 1
+            move_id = self._move_id
+            self._done.clear()
+            done = self._done
+        self.val.post(target)
+        thread = Thread(target=self._move, args=(move_id, self.rbv.value, target))
+        thread.daemon = True
+        thread.start()
+        return done
+
+    def _move(self, move_id, start, target):
+        self.dmov.post(0)
+        self.movn.post(1)
+        duration = get_trapezoidal_move_time(abs(target - start), self.velo.value, self.accl.value)
+        t_start = time.time()
+        while self.simulator.time_scale > 0:
+            elapsed = (time.time() - t_start) / self.simulator.time_scale
+            if elapsed >= duration or self._move_id != move_id:
+                break
+            self.rbv.post(start + math.copysign(
+                get_trapezoidal_distance(elapsed, duration, self.velo.value, self.accl.value), target - start))
+            self.simulator.sleep(0.05)
+
+        with self._lock:
+            if self._move_id != move_id:
+                return
+            self.rbv.post(target)
+            self.movn.post(0)
+            self.dmov.post(1)
+            self._done.set()
+            self.moves.append((t_start, time.time()))
+
+
+def get_trapezoidal_distance(elapsed, duration, velocity, acceleration_time):
+    """distance travelled after elapsed seconds of a move lasting duration seconds"""
+    if acceleration_time <= 0:
+        return velocity * elapsed
+    acceleration = velocity / float(acceleration_time)
+    ramp_time = min(acceleration_time, duration / 2.0)
+    peak_velocity = acceleration * ramp_time
+    if elapsed <= ramp_time:
+        return 0.5 * acceleration * elapsed ** 2
+    ramp_distance = 0.5 * acceleration * ramp_time ** 2
+    if elapsed <= duration - ramp_time:
+        return ramp_distance + peak_velocity * (elapsed - ramp_time)
+    remaining = duration - elapsed
+    return 2 * ramp_distance + peak_velocity * (duration - 2 * ramp_time) - 0.5 * acceleration * remaining ** 2
+
+
+class SimulatedMarCCD(object):
+    """
+    MarCCD camera (cam1) with its TIFF file plugin. Acquire=1 exposes AcquireTime seconds or until Acquire=0 is
+    put, then the frame is read out and queued for correction and writing, which run in a separate thread so that the
+    next frame can already be exposed. The put of Acquire=1 completes after the readout of the last frame, NumImages
+    frames are taken when ImageMode is 1 (Multiple). In an external TriggerMode (Frame, Bulb) every frame waits for a
+    trigger() call, e.g. a trajectory pulse of the simulated XPS. The (start, end) times of all exposures are kept in
+    exposures.
+    """
+
+    def __init__(self, simulator, prefix, file_prefix, readout_time=2.5, correct_time=1.0, writing_time=0.5):
+        self.simulator = simulator
+        self.prefix = prefix
+        self.file_prefix = file_prefix
+        self.readout_time = readout_time
+        self.correct_time = correct_time
+        self.writing_time = writing_time
+        self.written_files = []
+        self.exposures = []
+
+        add = lambda name, value, on_put=None: simulator.add_field(prefix + ':' + name, value, on_put)
+        self.acquire = add('Acquire', 0, self._put_acquire)
+        self.acquire_rbv = add('Acquire_RBV', 0)
+        self.acquire_time = add('AcquireTime', 1.0)
+        for name in ('ShutterMode', 'FrameType', 'ImageMode'):
+            add(name, 0)
+        self.trigger_mode = add('TriggerMode', 0, self._put_trigger_mode)
+        self.trigger_mode_rbv = add('TriggerMode_RBV', MAR_TRIGGER_MODES[0])
+        self.num_images = add('NumImages', 1)
+        self.image_mode = simulator.fields[prefix + ':ImageMode']
+        self.readout_status = add('MarReadoutStatus_RBV', MAR_STATUS_IDLE)
+        self.correct_status = add('MarCorrectStatus_RBV', MAR_STATUS_IDLE)
+        self.writing_status = add('MarWritingStatus_RBV', MAR_STATUS_IDLE)
+
+        add = lambda name, value, on_put=None: simulator.add_field(file_prefix + ':' + name, value, on_put)
+        self.file_path = add('FilePath', '', self._put_file_path)
+        self.file_path_exists = add('FilePathExists_RBV', 0)
+        self.file_name = add('FileName', 'image')
+        self.file_number = add('FileNumber', 1)
+        self.auto_increment = add('AutoIncrement', 1)
+        self.full_file_name = add('FullFileName_RBV', '')
+
+        self._acquisition_done = Event()
+        self._acquisition_done.set()
+        self._stop = Event()
+        self._triggers = Queue()
+        self._queue_lock = Lock()
+        self._queue = Queue()
+        processing_thread = Thread(target=self._process_frames)
+        processing_thread.daemon = True
+        processing_thread.start()
+
+    def _put_acquire(self, value):
+        if int(value) == 0:
+            self._stop.set()
+            return None
+        if not self._acquisition_done.is_set():
+            return self._acquisition_done
+        self._acquisition_done = Event()
+        self._stop.clear()
+        thread = Thread(target=self._acquire, args=(self._acquisition_done,))
+        thread.daemon = True
+        thread.start()
+        return self._acquisition_done
+
+    def trigger(self):
+        """external trigger pulse, starts the next frame in an external TriggerMode"""
+        self._triggers.put(time.time())
+
+    def is_externally_triggered(self):
+        return self.trigger_mode_rbv.value in MAR_EXTERNAL_TRIGGER_MODES
+
+    def _put_trigger_mode(self, value):
+        """accepts the choice names and indices of MAR_TRIGGER_MODES, other values are ignored like by the IOC"""
+        if value in MAR_TRIGGER_MODES:
+            name = value
+        elif isinstance(value, (int, long)) and 0 <= value < len(MAR_TRIGGER_MODES):
+            name = MAR_TRIGGER_MODES[value]
+        else:
+            logger.warning('Simulated MarCCD: invalid TriggerMode {}'.format(value))
+            return None
+        self.trigger_mode.post(value)
+        self.trigger_mode_rbv.post(name)
+        return None
+
+    def _wait_for_trigger(self):
+        """returns False if the acquisition was stopped before a trigger arrived"""
+        while not self._stop.is_set():
+            try:
+                self._triggers.get(timeout=0.01)
+                return True
+            except Empty:
+                pass
+        return False
+
+    def _put_file_path(self, value):
+        self.file_path.post(value)
+        self.file_path_exists.post(int(os.path.isdir(value)))
+
+    def _acquire(self, done):
+        self.acquire.post(1)
+        self.acquire_rbv.post(1)
+        num_images = int(self.num_images.value) if int(self.image_mode.value) == 1 else 1
+        externally_triggered = self.is_externally_triggered()
+        # pulses which arrived before the acquisition was started are ignored
+        while not self._triggers.empty():
+            self._triggers.get()
+        for _ in range(num_images):
+            if self._stop.is_set():
+                break
+            if externally_triggered and not self._wait_for_trigger():
+                break
+            t_start = time.time()
+            self._stop.wait(self.acquire_time.value * self.simulator.time_scale)
+            self.exposures.append((t_start, time.time()))
+
+            self.readout_status.post(MAR_STATUS_EXECUTING)
+            self.simulator.sleep(self.readout_time)
+            with self._queue_lock:
+                self._queue.put(self._get_next_filename())
+                self.correct_status.post(MAR_STATUS_QUEUED)
+                self.writing_status.post(MAR_STATUS_QUEUED)
+            self.readout_status.post(MAR_STATUS_IDLE)
+
+        self.acquire.post(0)
+        self.acquire_rbv.post(0)
+        done.set()
+
+    def _get_next_filename(self):
+        filename = os.path.join(str(self.file_path.value),
+                                '{}_{:03d}.tif'.format(self.file_name.value, int(self.file_number.value)))
+        if self.auto_increment.value:
+            self.file_number.post(int(self.file_number.value) + 1)
+        return filename
+
+    def _process_frames(self):
+        while True:
+            filename = self._queue.get()
+            self.correct_status.post(MAR_STATUS_EXECUTING)
+            self.simulator.sleep(self.correct_time)
+            self.correct_status.post(MAR_STATUS_IDLE)
+
+            self.writing_status.post(MAR_STATUS_EXECUTING)
+            self.simulator.sleep(self.writing_time)
+            self._write(filename)
+            with self._queue_lock:
+                status = MAR_STATUS_QUEUED if self._queue.qsize() else MAR_STATUS_IDLE
+                self.correct_status.post(status)
+                self.writing_status.post(status)
+
+    def _write(self, filename):
+        if os.path.isdir(os.path.dirname(filename)):
+            with open(filename, 'wb') as fp:
+                fp.write('II*\x00')
+        else:
+            logger.warning('Simulated MarCCD: folder of {} does not exist, frame is not written.'.format(filename))
+        self.full_file_name.post(filename)
+        self.written_files.append(filename)
+
+
+class EpicsSimulator(object):
+    """
+    PV database with the pyepics style functions used by the program.
+    :param time_scale: factor applied to all motion and detector durations, 0 makes them instantaneous
+    :param beamline: whether to create the motors and the detector of epics_config
+    """
+
+    def __init__(self, time_scale=1.0, beamline=True):
+        self.time_scale = time_scale
+        self.fields = {}
+        self.motors = {}
+        self.detector = None
+        self._lock = Lock()
+        if beamline:
+            self.create_beamline()
+
+    def create_beamline(self):
+        for axis, settings in DEFAULT_MOTORS.items():
+            self.add_motor(epics_config[axis], *settings)
+        for name, position in CONDITION_MOTORS.items():
+            self.add_motor(name, position)
+        self.detector = SimulatedMarCCD(self, epics_config['detector_control'], epics_config['detector_file'])
+        self.add_field(epics_config['detector_control'].split(':')[0] + ':AcquireSequence.STRA', '')
+
+    def add_motor(self, name, *args, **kwargs):
+        self.motors[name] = SimulatedMotor(self, name, *args, **kwargs)
+        return self.motors[name]
+
+    def add_field(self, name, value=None, on_put=None):
+        self.fields[name] = Field(name, value, on_put)
+        return self.fields[name]
+
+    def get_field(self, name):
+        with self._lock:
+            if name not in self.fields:
+                self.fields[name] = Field(name)
+            return self.fields[name]
+
+    def sleep(self, duration):
+        if duration > 0 and self.time_scale > 0:
+            time.sleep(duration * self.time_scale)
+
+    def caget(self, pvname, as_string=False, **kwargs):
+        if pvname not in self.fields:
+            logger.warning('Simulated PV {} does not exist.'.format(pvname))
+            return None
+        value = self.fields[pvname].get()
+        if as_string and value is not None:
+            return str(value)
+        return value
+
+    def caput(self, pvname, value, wait=False, timeout=300, **kwargs):
+        return self.get_field(pvname).put(value, wait, timeout)
+
+    def camonitor(self, pvname, writer=None, callback=None):
+        if callback is None:
+            if writer is None:
+                writer = logger.info
+
+            def callback(pvname=None, char_value=None, **kwargs):
+                writer('{} {} {}'.format(pvname, time.strftime('%H:%M:%S'), char_value))
+        self.get_field(pvname).callbacks.append(callback)
+
+    def PV(self, pvname, **kwargs):
+        return SimulatedPV(self, pvname, **kwargs)
+
+    CAThread = Thread
@@ -0,0 +1,499 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Local stand-in for the Newport XPS-C8 controller. XPSSimulator speaks the ASCII protocol of XPS_C8_drivers on a TCP
+port and serves the trajectory folder through a minimal FTP server, so that XPSTrajectory and the measurement
+functions can run without the real controller.
+
+Supported are login, group enable/disable, relative and absolute group moves, PVT pulse output, verification and
+execution, gathering and extended events. Motions take their real duration multiplied by time_scale.
+
+Standalone usage (from the sxrd_collect folder): python -m simulation.xps_simulator [port] [ftp port]
+"""
+__author__ = 'Clemens Prescher'
+
+import re
+import sys
+import time
+import socket
+import logging
+import SocketServer
+from threading import Thread, RLock
+
+import numpy as np
+
+from config import xps_config
+from plan import get_trapezoidal_move_time
+
+logger = logging.getLogger(__name__)
+
+# error codes returned by the simulator
+ERR_OK = 0
+ERR_GENERIC = -1
+ERR_REPLY_TOO_LONG = -3
+ERR_UNKNOWN_COMMAND = -7
+ERR_FILE_NOT_FOUND = -61
+ERR_GROUP_DISABLED = -22
+
+GROUP_STATUS_READY = 12
+GROUP_STATUS_DISABLED = 20
+
+COMMAND_PATTERN = re.compile(r'\s*(\w+)\((.*)\)\s*$', re.DOTALL)
+
+
+class PositionerState(object):
+    def __init__(self, max_velocity=20.0, max_acceleration=80.0):
+        self.position = 0.0
+        self.max_velocity = max_velocity
+        self.max_acceleration = max_acceleration
+
+
+class XPSSimulatorState(object):
+    """controller state shared by all connections"""
+
+    def __init__(self, group_name, positioners, time_scale=1.0, reply_limit=65536):
+        self.group_name = group_name
+        self.positioners = [positioner for positioner in positioners]
+        self.positioner_states = dict((positioner, PositionerState()) for positioner in self.positioners)
+        self.time_scale = time_scale
+        self.reply_limit = reply_limit
+        self.enabled = True
+
+        self.files = {}  # FTP store: path -> content
+        self.gathering_outputs = []
+        self.gathering_data = np.zeros((0, 0))
+        self.events = {}
+        self.next_event_id = 1
+        self.pulse_settings = None  # (start element, end element, interval)
+        self.pulse_callbacks = []  # called at every trajectory pulse, e.g. to trigger a simulated detector
+        self.pulse_log = []  # times of the emitted trajectory pulses
+        self.num_commands = 0
+
+        self.lock = RLock()
+        self.motion_lock = RLock()
+
+    def get_file(self, name):
+        for path, content in self.files.items():
+            if path == name or path.endswith('/' + name):
+                return content
+        return None
+
+    def get_positions(self):
+        return np.array([self.positioner_states[positioner].position for positioner in self.positioners])
+
+    def sleep(self, duration):
+        if duration > 0 and self.time_scale > 0:
+            time.sleep(duration * self.time_scale)
+
+    def move_time(self, displacements):
+        """duration of a simultaneous trapezoidal move of all positioners"""
+        move_time = 0
+        for positioner, displacement in zip(self.positioners, displacements):
+            state = self.positioner_states[positioner]
+            acceleration_time = state.max_velocity / float(state.max_acceleration)
+            move_time = max(move_time, get_trapezoidal_move_time(abs(displacement), state.max_velocity,
+                                                                 acceleration_time))
+        return move_time
+
+
+def parse_trajectory(content):
+    """returns element durations (n) and displacements (n x positioners) of a PVT trajectory file"""
+    rows = [[float(value) for value in line.split(',')] for line in content.splitlines() if line.strip()]
+    data = np.array(rows)
+    return data[:, 0], data[:, 1::2]
+
+
+class XPSCommandHandler(object):
+    """executes commands on an XPSSimulatorState and returns the reply strings"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def execute(self, command):
+        with self.state.lock:
+            self.state.num_commands += 1
+        match = COMMAND_PATTERN.match(command)
+        if match is None:
+            return self.reply(ERR_UNKNOWN_COMMAND)
+        name, arguments = match.group(1), match.group(2)
+        arguments = [argument.strip() for argument in arguments.split(',')] if arguments.strip() else []
+        method = getattr(self, 'cmd_' + name, None)
+        if method is None:
+            logger.debug('Unknown command {}'.format(command))
+            return self.reply(ERR_UNKNOWN_COMMAND)
+        inputs = [argument for argument in arguments if not argument.endswith('*')]
+        try:
+            return method(*inputs)
+        except Exception as e:
+            logger.exception('Simulated command {} failed: {}'.format(command, e))
+            return self.reply(ERR_GENERIC)
+
+    @staticmethod
+    def reply(error, *values):
+        return '{},{},EndOfAPI'.format(error, ','.join(str(value) for value in values))
+
+    def cmd_Login(self, user, password):
+        return self.reply(ERR_OK)
+
+    def cmd_FirmwareVersionGet(self):
+        return self.reply(ERR_OK, 'XPS-C8 Simulator')
+
+    def cmd_GroupMotionDisable(self, group):
+        self.state.enabled = False
+        return self.reply(ERR_OK)
+
+    def cmd_GroupMotionEnable(self, group):
+        self.state.enabled = True
+        return self.reply(ERR_OK)
+
+    def cmd_GroupStatusGet(self, group):
+        return self.reply(ERR_OK, GROUP_STATUS_READY if self.state.enabled else GROUP_STATUS_DISABLED)
+
+    def cmd_PositionerMaximumVelocityAndAccelerationGet(self, positioner):
+        state = self.state.positioner_states[positioner.split('.')[-1]]
+        return self.reply(ERR_OK, state.max_velocity, state.max_acceleration)
+
+    def cmd_GroupPositionCurrentGet(self, group):
+        return self.reply(ERR_OK, *self.state.get_positions())
+
+    def cmd_GroupMoveRelative(self, group, *displacements):
+        return self._move(np.array([float(value) for value in displacements]))
+
+    def cmd_GroupMoveAbsolute(self, group, *positions):
+        return self._move(np.array([float(value) for value in positions]) - self.state.get_positions())
+
+    def _move(self, displacements):
+        if not self.state.enabled:
+            return self.reply(ERR_GROUP_DISABLED)
+        with self.state.motion_lock:
+            self.state.sleep(self.state.move_time(displacements))
+            for positioner, displacement in zip(self.state.positioners, displacements):
+                self.state.positioner_states[positioner].position += displacement
+        return self.reply(ERR_OK)
+
+    def cmd_EventExtendedRemove(self, event_id):
+        with self.state.lock:
+            self.state.events.pop(int(event_id), None)
+        return self.reply(ERR_OK)
+
+    def cmd_EventExtendedConfigurationTriggerSet(self, *arguments):
+        self.pending_trigger = arguments[::5]
+        return self.reply(ERR_OK)
+
+    def cmd_EventExtendedConfigurationActionSet(self, *arguments):
+        self.pending_action = arguments[::5]
+        return self.reply(ERR_OK)
+
+    def cmd_EventExtendedStart(self):
+        with self.state.lock:
+            event_id = self.state.next_event_id
+            self.state.next_event_id += 1
+            self.state.events[event_id] = (getattr(self, 'pending_trigger', ()), getattr(self, 'pending_action', ()))
+        return self.reply(ERR_OK, event_id)
+
+    def cmd_GatheringReset(self):
+        with self.state.lock:
+            self.state.gathering_data = np.zeros((0, len(self.state.gathering_outputs)))
+        return self.reply(ERR_OK)
+
+    def cmd_GatheringConfigurationSet(self, *outputs):
+        with self.state.lock:
+            self.state.gathering_outputs = list(outputs)
+            self.state.gathering_data = np.zeros((0, len(outputs)))
+        return self.reply(ERR_OK)
+
+    def cmd_GatheringStop(self):
+        return self.reply(ERR_OK)
+
+    def cmd_GatheringCurrentNumberGet(self):
+        return self.reply(ERR_OK, len(self.state.gathering_data), 1000000)
+
+    def cmd_GatheringDataMultipleLinesGet(self, start, num_lines):
+        start, num_lines = int(start), int(num_lines)
+        data = self.state.gathering_data[start:start + num_lines]
+        if start < 0 or num_lines < 1 or len(data) < num_lines:
+            return self.reply(ERR_GENERIC)
+        lines = '\n'.join(';'.join(repr(value) for value in row) for row in data) + '\n'
+        if len(lines) > self.state.reply_limit:
+            return self.reply(ERR_REPLY_TOO_LONG)
+        return self.reply(ERR_OK, lines)
+
+    def cmd_MultipleAxesPVTPulseOutputSet(self, group, start_element, end_element, interval):
+        self.state.pulse_settings = (int(start_element), int(end_element), float(interval))
+        return self.reply(ERR_OK)
+
+    def cmd_MultipleAxesPVTVerification(self, group, file_name):
+        if self.state.get_file(file_name) is None:
+            return self.reply(ERR_FILE_NOT_FOUND)
+        return self.reply(ERR_OK)
+
+    def cmd_MultipleAxesPVTExecution(self, group, file_name, num_executions=1):
+        content = self.state.get_file(file_name)
+        if content is None:
+            return self.reply(ERR_FILE_NOT_FOUND)
+        if not self.state.enabled:
+            return self.reply(ERR_GROUP_DISABLED)
+        durations, displacements = parse_trajectory(content)
+
+        with self.state.motion_lock:
+            start_positions = self.state.get_positions()
+            self._emit_pulses(durations)
+            self._gather(durations, displacements, start_positions)
+            end_positions = start_positions + np.sum(displacements, axis=0)
+            for positioner, position in zip(self.state.positioners, end_positions):
+                self.state.positioner_states[positioner].position = position
+        return self.reply(ERR_OK)
+
+    def _pulse_times(self, durations):
+        """times of the trajectory pulses relative to the start of the trajectory"""
+        if self.state.pulse_settings is None:
+            return np.zeros(0)
+        start_element, end_element, interval = self.state.pulse_settings
+        element_ends = np.cumsum(durations)
+        element_starts = element_ends - durations
+        pulse_start = element_starts[start_element - 1]
+        pulse_end = element_ends[min(end_element, len(durations)) - 1]
+        return pulse_start + interval * np.arange(int(np.floor((pulse_end - pulse_start) / interval + 1e-9)) + 1)
+
+    def _emit_pulses(self, durations):
+        """runs the trajectory in (scaled) real time and calls the pulse callbacks at the trajectory pulses"""
+        elapsed = 0.0
+        for pulse_time in self._pulse_times(durations):
+            self.state.sleep(pulse_time - elapsed)
+            elapsed = pulse_time
+            self.state.pulse_log.append(time.time())
+            for callback in list(self.state.pulse_callbacks):
+                callback()
+        self.state.sleep(np.sum(durations) - elapsed)
+
+    def _gather(self, durations, displacements, start_positions):
+        """adds one gathering line per trajectory pulse if a gathering event on the trajectory pulse is active"""
+        with self.state.lock:
+            gathering_active = any('GatheringOneData' in action for _, action in self.state.events.values())
+        if not gathering_active or self.state.pulse_settings is None:
+            return
+        pulse_times = self._pulse_times(durations)
+        element_ends = np.cumsum(durations)
+
+        # positions are interpolated linearly within the elements
+        element_positions = start_positions + np.vstack((np.zeros(len(start_positions)),
+                                                         np.cumsum(displacements, axis=0)))
+        times = np.concatenate(([0], element_ends))
+        positions = np.array([np.interp(pulse_times, times, element_positions[:, ind])
+                              for ind in range(len(start_positions))]).T
+        velocities = np.array([np.interp(pulse_times, times[1:], displacements[:, ind] / durations)
+                               for ind in range(len(start_positions))]).T
+
+        columns = []
+        for output in self.state.gathering_outputs:
+            group, positioner, quantity = output.split('.')
+            ind = self.state.positioners.index(positioner)
+            if quantity in ('CurrentPosition', 'SetpointPosition'):
+                columns.append(positions[:, ind])
+            elif quantity == 'CurrentVelocity':
+                columns.append(velocities[:, ind])
+            else:
+                columns.append(np.zeros(len(pulse_times)))
+        with self.state.lock:
+            self.state.gathering_data = np.vstack((self.state.gathering_data, np.array(columns).T))
+
+
+class XPSRequestHandler(SocketServer.BaseRequestHandler):
+    def handle(self):
+        handler = XPSCommandHandler(self.server.state)
+        data = ''
+        while True:
+            try:
+                received = self.request.recv(65536)
+            except socket.error:
+                return
+            if not received:
+                return
+            data += received
+            while ')' in data:
+                command, data = data.split(')', 1)
+                self.request.sendall(handler.execute(command + ')'))
+
+
+class FTPRequestHandler(SocketServer.StreamRequestHandler):
+    """just enough of the FTP protocol for ftplib: login, CWD, TYPE, PASV, STOR, RETR, SIZE, NLST, DELE and QUIT"""
+
+    def handle(self):
+        self.cwd = ''
+        self.passive_socket = None
+        self.send_response('220 XPS simulator FTP server')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.strip().partition(' ')
+            method = getattr(self, 'ftp_' + command.upper(), None)
+            if method is None:
+                self.send_response('502 Command not implemented')
+            elif method(argument) is False:
+                return
+
+    def send_response(self, response):
+        self.wfile.write(response + '\r\n')
+        self.wfile.flush()
+
+    def get_path(self, name):
+        return '/'.join(part for part in (self.cwd, name) if part)
+
+    def accept_data_connection(self):
+        connection, _ = self.passive_socket.accept()
+        self.passive_socket.close()
+        self.passive_socket = None
+        return connection
+
+    def ftp_USER(self, argument):
+        self.send_response('331 Password required')
+
+    def ftp_PASS(self, argument):
+        self.send_response('230 Logged in')
+
+    def ftp_CWD(self, argument):
+        self.cwd = argument.strip('/')
+        self.send_response('250 Directory changed')
+
+    def ftp_TYPE(self, argument):
+        self.send_response('200 Type set')
+
+    def ftp_PASV(self, argument):
+        self.passive_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.passive_socket.bind((self.server.server_address[0], 0))
+        self.passive_socket.listen(1)
+        host, port = self.passive_socket.getsockname()
+        self.send_response('227 Entering Passive Mode ({},{},{}).'.format(host.replace('.', ','), port >> 8,
+                                                                          port & 0xFF))
+
+    def ftp_STOR(self, argument):
+        self.send_response('150 Opening data connection')
+        connection = self.accept_data_connection()
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        connection.close()
+        with self.server.state.lock:
+            self.server.state.files[self.get_path(argument)] = ''.join(chunks)
+        self.send_response('226 Transfer complete')
+
+    def ftp_RETR(self, argument):
+        content = self.server.state.files.get(self.get_path(argument))
+        if content is None:
+            self.send_response('550 File not found')
+            return
+        self.send_response('150 Opening data connection')
+        connection = self.accept_data_connection()
+        connection.sendall(content)
+        connection.close()
+        self.send_response('226 Transfer complete')
+
+    def ftp_SIZE(self, argument):
+        content = self.server.state.files.get(self.get_path(argument))
+        if content is None:
+            self.send_response('550 File not found')
+        else:
+            self.send_response('213 {}'.format(len(content)))
+
+    def ftp_NLST(self, argument):
+        prefix = self.get_path('')
+        names = [path[len(prefix):].lstrip('/') for path in self.server.state.files.keys()
+                 if path.rpartition('/')[0] == prefix]
+        self.send_response('150 Opening data connection')
+        connection = self.accept_data_connection()
+        connection.sendall(''.join(name + '\r\n' for name in names))
+        connection.close()
+        self.send_response('226 Transfer complete')
+
+    def ftp_DELE(self, argument):
+        with self.server.state.lock:
+            content = self.server.state.files.pop(self.get_path(argument), None)
+        self.send_response('550 File not found' if content is None else '250 File deleted')
+
+    def ftp_QUIT(self, argument):
+        self.send_response('221 Bye')
+        return False
+
+
+class ThreadingServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class XPSSimulator(object):
+    """
+    Runs the simulated XPS command and FTP servers in background threads.
+    :param port: TCP port of the command server, 0 selects a free port
+    :param ftp_port: port of the FTP server, 0 selects a free port
+    :param time_scale: factor applied to all motion and trajectory durations, 0 makes them instantaneous
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, ftp_port=0, group_name=None, positioners=None, time_scale=1.0,
+                 reply_limit=None):
+        group_name = group_name or xps_config['GROUP NAME']
+        positioners = (positioners or xps_config['POSITIONERS']).replace(',', ' ').split()
+        self.state = XPSSimulatorState(group_name, positioners, time_scale,
+                                       reply_limit or xps_config['GATHER REPLY LIMIT'])
+
+        self.command_server = ThreadingServer((host, port), XPSRequestHandler)
+        self.ftp_server = ThreadingServer((host, ftp_port), FTPRequestHandler)
+        for server in (self.command_server, self.ftp_server):
+            server.state = self.state
+        self.host = host
+        self.port = self.command_server.server_address[1]
+        self.ftp_port = self.ftp_server.server_address[1]
+        self._threads = []
+
+    def start(self):
+        for server in (self.command_server, self.ftp_server):
+            thread = Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05})
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        logger.info('XPS simulator listening on {}:{} (FTP {})'.format(self.host, self.port, self.ftp_port))
+        return self
+
+    def stop(self):
+        for server in (self.command_server, self.ftp_server):
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else xps_config['PORT']
+    ftp_port = int(sys.argv[2]) if len(sys.argv) > 2 else xps_config['FTP PORT']
+    simulator = XPSSimulator(port=port, ftp_port=ftp_port).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
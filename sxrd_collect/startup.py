@@ -0,0 +1,128 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Tools for a fast start of the GUI: lazily imported modules, a timer checking the startup against its budget and an
+import profiler (start the program with --profile-imports) listing the modules which take the most time to import.
+"""
+__author__ = 'Clemens Prescher'
+
+import sys
+import time
+import logging
+import importlib
+import __builtin__
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule(object):
+    """module proxy importing the module on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+class StartupTimer(object):
+    """
+    Records the time of the startup milestones relative to the creation of the timer.
+    :param start: time.time() value the startup started, defaults to now
+    """
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.time()
+        self.marks = []
+
+    def mark(self, name):
+        elapsed = time.time() - self.start
+        self.marks.append((name, elapsed))
+        logger.info('Startup: {} after {:.3f} s.'.format(name, elapsed))
+        return elapsed
+
+    def get(self, name):
+        for mark_name, elapsed in self.marks:
+            if mark_name == name:
+                return elapsed
+        return None
+
+    def check(self, name, budget):
+        """logs a warning if the milestone was reached after more than budget s, returns whether it is in budget"""
+        elapsed = self.get(name)
+        if elapsed is not None and elapsed > budget:
+            logger.warning('Startup: {} after {:.3f} s exceeds the budget of {:.3f} s.'.format(name, elapsed, budget))
+            return False
+        return True
+
+    def report(self):
+        return '\n'.join('{:8.3f} s  {}'.format(elapsed, name) for name, elapsed in self.marks)
+
+
+class ImportProfiler(object):
+    """
+    Measures the import time of every newly imported module by wrapping the import function, the times of nested
+    imports are included in the cumulative time and excluded from the self time.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._original_import = None
+        self._stack = []
+
+    def start(self):
+        self._original_import = __builtin__.__import__
+        __builtin__.__import__ = self._import
+        return self
+
+    def stop(self):
+        if self._original_import is not None:
+            __builtin__.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, *args, **kwargs):
+        num_modules = len(sys.modules)
+        self._stack.append(0.0)
+        t1 = time.time()
+        try:
+            return self._original_import(name, *args, **kwargs)
+        finally:
+            duration = time.time() - t1
+            child_time = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += duration
+            if len(sys.modules) > num_modules:
+                self.records.append((name, duration, duration - child_time, len(self._stack)))
+
+    def report(self, top=25):
+        """the imports with the largest cumulative time"""
+        lines = ['{:>10s} {:>10s}  module'.format('cumulative', 'self')]
+        for name, duration, self_time, depth in sorted(self.records, key=lambda record: record[1],
+                                                       reverse=True)[:top]:
+            lines.append('{:8.1f}ms {:8.1f}ms  {}{}'.format(duration * 1000, self_time * 1000, '  ' * depth, name))
+        return '\n'.join(lines)
@@ -19,11 +19,38 @@ __author__ = 'Clemens Prescher'
 
 import sys
 
+from startup import StartupTimer, ImportProfiler
+
+startup_timer = StartupTimer()
+import_profiler = ImportProfiler()
+if '--profile-imports' in sys.argv:
+    sys.argv.remove('--profile-imports')
+    import_profiler.start()
+
 from PyQt4 import QtGui
 
+startup_timer.mark('Qt imported')
+
+from config import collection_config
 from controller.MainController import MainController
 
+startup_timer.mark('controller imported')
+
+
+def background_loading_finished(_):
+    startup_timer.mark('PVs connected')
+    import_profiler.stop()
+    if import_profiler.records:
+        print(import_profiler.report())
+    print(startup_timer.report())
+
+
 if __name__ == '__main__':
     app = QtGui.QApplication(sys.argv)
     controller = MainController()
+    # the background loading starts with the event loop, so this is connected in time
+    controller.background_loader.finished.connect(background_loading_finished)
+    app.processEvents()
+    startup_timer.mark('window shown')
+    startup_timer.check('window shown', collection_config['STARTUP BUDGET'])
     app.exec_()
@@ -0,0 +1,116 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import os
+import sys
+import json
+import shutil
+import signal
+import tempfile
+import unittest
+import subprocess
+from StringIO import StringIO
+
+import batch
+from batch import BatchRunner
+from pv import caput, caget
+from config import collection_config, epics_config
+from simulation.beamline import SimulatedBeamline
+
+PLAN = {'basename': 'sample',
+        'setups': [{'name': 'E1', 'detector_pos_x': 0, 'detector_pos_z': 0, 'omega_start': -100, 'omega_end': -98,
+                    'omega_step': 1, 'time_per_step': 0.5}],
+        'points': [{'name': 'P1', 'x': 0.1, 'y': 0, 'z': 0, 'states': {'E1': ['still', 'step']}}]}
+
+
+class BatchRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.timing_folder = collection_config['TIMING FOLDER']
+        collection_config['TIMING FOLDER'] = os.path.join(self.folder, 'timing')
+
+    def tearDown(self):
+        collection_config['TIMING FOLDER'] = self.timing_folder
+        shutil.rmtree(self.folder)
+
+    def test_run_plan(self):
+        output = StringIO()
+        plan = dict(PLAN, filepath=self.folder)
+        with SimulatedBeamline(time_scale=0, data_folder=self.folder):
+            collected = BatchRunner(plan, output=output, json_output=True).run()
+
+        self.assertEqual(collected, 2)
+        events = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([event['event'] for event in events], ['plan', 'start', 'done', 'start', 'done', 'finished'])
+        self.assertTrue(os.path.isfile(os.path.join(self.folder, 'sample_P1_P1_E1_001.tif')))
+        self.assertTrue(os.path.isfile(os.path.join(self.folder, 'sample_P1_P1_E1_s_002.tif')))
+        self.assertEqual(len(os.listdir(collection_config['TIMING FOLDER'])), 2)
+
+    def test_error(self):
+        output = StringIO()
+        collect_acquisition = batch.collect_acquisition
+
+        def raise_error(acquisition, **kwargs):
+            caput(epics_config['detector_control'] + ':ShutterMode', 0)
+            raise RuntimeError('detector failed')
+
+        batch.collect_acquisition = raise_error
+        try:
+            with SimulatedBeamline(time_scale=0, data_folder=self.folder):
+                caput(epics_config['detector_control'] + ':ShutterMode', 1)
+                self.assertEqual(BatchRunner(PLAN, output=output, json_output=True).run(), 0)
+                self.assertEqual(caget(epics_config['detector_control'] + ':ShutterMode'), 1)
+        finally:
+            batch.collect_acquisition = collect_acquisition
+
+        events = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([event['event'] for event in events], ['plan', 'start', 'error', 'finished'])
+        self.assertEqual(events[2]['message'], 'detector failed')
+        self.assertEqual(len(os.listdir(collection_config['TIMING FOLDER'])), 2)
+
+    def test_exit_status_of_failed_acquisition(self):
+        plan_file = os.path.join(self.folder, 'plan.json')
+        with open(plan_file, 'w') as fp:
+            json.dump(PLAN, fp)
+        collect_acquisition = batch.collect_acquisition
+
+        def raise_error(acquisition, **kwargs):
+            raise RuntimeError('detector failed')
+
+        batch.collect_acquisition = raise_error
+        sigint_handler = signal.getsignal(signal.SIGINT)
+        try:
+            with self.assertRaises(SystemExit) as context:
+                batch.main([plan_file, '--simulate', '0'])
+        finally:
+            signal.signal(signal.SIGINT, sigint_handler)
+            batch.collect_acquisition = collect_acquisition
+        self.assertEqual(context.exception.code, 1)
+
+    def test_abort(self):
+        output = StringIO()
+        with SimulatedBeamline(time_scale=0, data_folder=self.folder):
+            runner = BatchRunner(PLAN, output=output, json_output=True)
+            runner.abort()
+            self.assertEqual(runner.run(), 0)
+
+    def test_no_qt_import(self):
+        folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, batch; sys.exit('PyQt4' in sys.modules)"
+        self.assertEqual(subprocess.call([sys.executable, '-c', code], cwd=folder), 0)
@@ -0,0 +1,92 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import unittest
+from threading import Event
+
+from PyQt4 import QtCore
+
+from controller.CollectionWorker import CollectionWorker
+
+
+def return_value(value):
+    return value
+
+
+def raise_value_error():
+    raise ValueError('failed')
+
+
+class CollectionWorkerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+    def setUp(self):
+        self.worker = CollectionWorker()
+        self.events = []
+        # direct connections, the test has no running event loop which would deliver queued signals
+        self.worker.job_started.connect(lambda name: self.events.append(('started', str(name))),
+                                        QtCore.Qt.DirectConnection)
+        self.worker.job_finished.connect(lambda name, result: self.events.append(('finished', str(name), result)),
+                                         QtCore.Qt.DirectConnection)
+        self.worker.job_failed.connect(lambda name, message: self.events.append(('failed', str(name), str(message))),
+                                       QtCore.Qt.DirectConnection)
+        self.started = Event()
+        self.release = Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.worker.stop(5)
+
+    def block(self):
+        self.started.set()
+        self.release.wait(5)
+
+    def test_jobs_run_in_order(self):
+        self.worker.submit('first', return_value, 1)
+        self.worker.submit('second', return_value, 2)
+        self.assertTrue(self.worker.stop(5))
+        self.assertEqual(self.events, [('started', 'first'), ('finished', 'first', 1),
+                                       ('started', 'second'), ('finished', 'second', 2)])
+
+    def test_failed_job(self):
+        self.worker.submit('failing', raise_value_error)
+        self.worker.submit('next', return_value, 1)
+        self.assertTrue(self.worker.stop(5))
+        self.assertEqual(self.events, [('started', 'failing'), ('failed', 'failing', 'failed'),
+                                       ('started', 'next'), ('finished', 'next', 1)])
+
+    def test_cancel_pending_by_name(self):
+        self.worker.submit('acquisition', self.block)
+        self.worker.submit('acquisition', return_value, 1)
+        self.worker.submit('collection end', return_value, 2)
+        self.worker.submit('acquisition', return_value, 3)
+        self.assertTrue(self.started.wait(5))
+        self.assertEqual(self.worker.cancel_pending(['acquisition']), 2)
+        self.release.set()
+        self.assertTrue(self.worker.stop(5))
+        self.assertEqual([event[1] for event in self.events if event[0] == 'finished'],
+                         ['acquisition', 'collection end'])
+
+    def test_stop_timeout(self):
+        self.worker.submit('acquisition', self.block)
+        self.assertFalse(self.worker.stop(0.05))
+        self.release.set()
+        self.assertTrue(self.worker.wait(5000))
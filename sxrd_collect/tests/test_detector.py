@@ -0,0 +1,105 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import time
+import unittest
+from threading import Thread
+
+import pv
+import measurement
+from detector import MarCCDState, DetectorTimeout, MAR_STATUS_IDLE, MAR_STATUS_EXECUTING
+from simulation.epics_simulator import EpicsSimulator
+
+
+class MarCCDStateTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_backend = pv._backend
+        self.simulator = pv.set_backend(EpicsSimulator(time_scale=0, beamline=False))
+        self.state = MarCCDState('13MARCCD2:cam1')
+
+    def tearDown(self):
+        self.state.disconnect()
+        pv._backend = self.previous_backend
+
+    def set_status(self, status_pv, value):
+        self.simulator.get_field('13MARCCD2:cam1:' + status_pv).post(value)
+
+    def run_task(self, status_pv):
+        self.set_status(status_pv, MAR_STATUS_EXECUTING)
+        self.set_status(status_pv, MAR_STATUS_IDLE)
+
+    def test_idle_executing_idle(self):
+        self.state.start_frame()
+        self.assertFalse(self.state.wait_for_readout(0))
+
+        self.set_status('MarReadoutStatus_RBV', MAR_STATUS_EXECUTING)
+        self.assertFalse(self.state.read_out_is_finished())
+        self.set_status('MarReadoutStatus_RBV', MAR_STATUS_IDLE)
+        self.assertTrue(self.state.wait_for_readout(0))
+        self.assertFalse(self.state.is_finished())
+
+        self.run_task('MarCorrectStatus_RBV')
+        self.assertFalse(self.state.is_finished())
+        self.run_task('MarWritingStatus_RBV')
+        self.assertTrue(self.state.wait_until_finished(0))
+
+    def test_start_frame_resets_events(self):
+        self.state.start_frame()
+        for status_pv in MarCCDState.STATUS_PVS:
+            self.run_task(status_pv)
+        self.assertTrue(self.state.is_finished())
+
+        # the idle status of the previous frame does not count for the next one
+        self.state.start_frame()
+        self.assertFalse(self.state.is_finished())
+        self.assertFalse(self.state.read_out_is_finished())
+        self.run_task('MarReadoutStatus_RBV')
+        self.assertTrue(self.state.read_out_is_finished())
+
+    def test_timeout(self):
+        self.state.start_frame()
+        self.set_status('MarReadoutStatus_RBV', MAR_STATUS_EXECUTING)
+        self.assertFalse(self.state.wait_until_finished(0.05))
+        with self.assertRaises(DetectorTimeout):
+            measurement.wait_for_detector(self.state.wait_until_finished, 0.05)
+        # the woken up wait must not leave the event set
+        self.assertFalse(self.state.is_finished())
+
+    def test_wake_up_latency(self):
+        self.state.start_frame()
+        self.set_status('MarReadoutStatus_RBV', MAR_STATUS_EXECUTING)
+        woken_up = []
+
+        def wait():
+            self.assertTrue(self.state.wait_for_readout(5))
+            woken_up.append(time.time())
+
+        latencies = []
+        for _ in range(10):
+            thread = Thread(target=wait)
+            thread.start()
+            time.sleep(0.02)
+            t_set = time.time()
+            self.set_status('MarReadoutStatus_RBV', MAR_STATUS_IDLE)
+            thread.join(5)
+            latencies.append(woken_up.pop() - t_set)
+            self.state.start_frame()
+            self.set_status('MarReadoutStatus_RBV', MAR_STATUS_EXECUTING)
+        # a polling wait would wake up on average 25 ms after the status change
+        self.assertLess(max(latencies), 0.01)
@@ -0,0 +1,78 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import unittest
+
+from duty_cycle import analyse, get_union_time
+
+
+DETECTOR_POSITIONS = {'S1': (0, 0), 'S2': (100, 50), 'S3': (100, 50)}
+
+
+def create_acquisition(rows, start, setup, point, stage_time, readout_time=2.0, exposure=5.0):
+    context = {'session': 's1', 'scan_type': 'still', 'setup': setup, 'point': point}
+    spans = [('stage preparation', start, start + stage_time),
+             ('detector readout', start + stage_time + exposure, start + stage_time + exposure + readout_time)]
+    end = spans[-1][2]
+    spans.insert(0, ('acquisition', start, end))
+    for name, span_start, span_end in spans:
+        row = {'name': name, 'start': span_start, 'end': span_end, 'duration': span_end - span_start}
+        row.update(context)
+        if name == 'acquisition':
+            row['exposure'] = exposure
+            row['detector_x'], row['detector_z'] = DETECTOR_POSITIONS[setup]
+        rows.append(row)
+    return end
+
+
+class DutyCycleTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = []
+        t = create_acquisition(self.rows, 0, 'S1', 'P1', stage_time=1)
+        t = create_acquisition(self.rows, t + 1, 'S2', 'P1', stage_time=11)
+        t = create_acquisition(self.rows, t, 'S2', 'P2', stage_time=1)
+        create_acquisition(self.rows, t, 'S1', 'P2', stage_time=11, readout_time=6)
+        self.rows.sort(key=lambda row: row['start'])
+
+    def test_union_time(self):
+        self.assertEqual(get_union_time([(0, 2), (1, 3), (5, 6)]), 4)
+
+    def test_analyse(self):
+        report = analyse(self.rows)
+        self.assertEqual(report['acquisitions'], 4)
+        self.assertEqual(report['exposure_time'], 20)
+        self.assertAlmostEqual(report['duty_cycle'], 20. / report['wall_time'])
+        self.assertEqual(report['setups'].keys()[0], 'S1')  # worst duty cycle first
+
+        self.assertEqual(report['revisited_setups'], 1)
+        self.assertEqual(report['slow_readouts'][0][0], 6)
+        self.assertEqual(report['detector_moves'][0][0], 11)
+
+        savings = report['savings']
+        self.assertEqual(savings['batch setups'], 10)
+        self.assertEqual(savings['no gaps'], 1)
+        self.assertEqual(savings['regular readouts'], 4)
+
+    def test_setup_change_without_detector_move(self):
+        # S3 has the same detector position as S2
+        rows = []
+        t = create_acquisition(rows, 0, 'S2', 'P1', stage_time=1)
+        create_acquisition(rows, t, 'S3', 'P1', stage_time=11)
+        rows.sort(key=lambda row: row['start'])
+        self.assertEqual(analyse(rows)['detector_moves'], [])
@@ -0,0 +1,65 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import time
+import unittest
+
+import pv
+from engine import run_async, gather
+from simulation.epics_simulator import EpicsSimulator
+
+
+def sleep_and_return(sleep_time, value):
+    time.sleep(sleep_time)
+    return value
+
+
+def raise_value_error():
+    raise ValueError('failed')
+
+
+class EngineTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_backend = pv._backend
+        pv.set_backend(EpicsSimulator(time_scale=0, beamline=False))
+
+    def tearDown(self):
+        pv._backend = self.previous_backend
+
+    def test_tasks_run_concurrently(self):
+        t1 = time.time()
+        results = gather(run_async(sleep_and_return, 0.2, 1),
+                         run_async(sleep_and_return, 0.2, 2),
+                         run_async(sleep_and_return, 0.2, 3))
+        self.assertEqual(results, [1, 2, 3])
+        self.assertLess(time.time() - t1, 0.5)
+
+    def test_exception_is_raised_in_waiting_thread(self):
+        task = run_async(raise_value_error)
+        self.assertRaises(ValueError, task.result)
+
+    def test_timeout(self):
+        task = run_async(sleep_and_return, 0.5, 1)
+        self.assertRaises(RuntimeError, task.result, 0.05)
+        self.assertEqual(task.result(), 1)
+
+    def test_gather_waits_for_all_tasks_on_error(self):
+        slow_task = run_async(sleep_and_return, 0.2, 1)
+        self.assertRaises(ValueError, gather, run_async(raise_value_error), slow_task)
+        self.assertTrue(slow_task.done())
@@ -0,0 +1,76 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import unittest
+
+from models import SxrdModel
+from plan import compile_plan, get_trapezoidal_move_time, STILL, STEP
+from estimator import OverheadModel, estimate_collection_time, DEFAULT_OVERHEADS
+
+VELOCITIES = dict((axis, 1.0) for axis in ('sample_position_x', 'sample_position_y', 'sample_position_z',
+                                           'sample_position_omega', 'detector_position_x', 'detector_position_z'))
+ACCELERATION_TIMES = dict((axis, 0.5) for axis in VELOCITIES)
+
+
+def create_acquisition_rows(scan_type, frames, overheads, exposure=2.0, stage_time=1.0, start=0):
+    rows = []
+    for overhead in overheads:
+        end = start + exposure + stage_time + overhead
+        rows.append({'name': 'acquisition', 'start': start, 'end': end, 'duration': end - start, 'session': 's',
+                     'scan_type': scan_type, 'exposure': exposure, 'frames': frames})
+        rows.append({'name': 'stage preparation', 'start': start, 'end': start + stage_time,
+                     'duration': stage_time, 'session': 's'})
+        start = end + 1
+    return rows
+
+
+class EstimatorTest(unittest.TestCase):
+    def test_trapezoidal_move_time(self):
+        self.assertEqual(get_trapezoidal_move_time(0, 1.0, 0.5), 0)
+        self.assertAlmostEqual(get_trapezoidal_move_time(10, 2.0, 0.5), 5.5)
+        self.assertAlmostEqual(get_trapezoidal_move_time(0.25, 1.0, 1.0), 1.0)
+
+    def test_fit_overheads(self):
+        rows = create_acquisition_rows(STILL, 1, [3.0, 3.5, 4.0]) + \
+               create_acquisition_rows(STEP, 10, [20.0, 21.0], start=1000)
+        model = OverheadModel().fit(sorted(rows, key=lambda row: row['start']))
+        overhead, sigma = model.predict(STILL, 1)
+        self.assertAlmostEqual(overhead, 3.5)
+        self.assertAlmostEqual(sigma, 0.5)
+        # too few step scans, the defaults are kept
+        self.assertEqual(model.parameters[STEP], DEFAULT_OVERHEADS[STEP])
+
+    def test_estimate(self):
+        model = SxrdModel()
+        model.add_experiment_setup('A', 0, 0, -100, -80, 1, 0.5)
+        model.add_sample_point('P1', 1, 0, 0, step_state=True, still_state=True)
+
+        acquisitions = compile_plan(model)
+        start_positions = dict((axis, 0) for axis in VELOCITIES)
+        estimate = estimate_collection_time(acquisitions, start_positions, VELOCITIES, ACCELERATION_TIMES)
+
+        self.assertEqual(len(estimate.breakdown), 2)
+        still, step = estimate.breakdown
+        self.assertAlmostEqual(still.motion_time, 90.5)  # omega -90 deg at 1 deg/s
+        self.assertEqual(still.exposure_time, 10)
+        self.assertEqual(step.overhead, 20 * DEFAULT_OVERHEADS[STEP][1])
+        self.assertAlmostEqual(estimate.total_time, sum(item.total_time for item in estimate.breakdown))
+        lower, upper = estimate.interval
+        self.assertLess(lower, estimate.total_time)
+        self.assertGreater(upper, estimate.total_time)
@@ -0,0 +1,83 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from xps_trajectory.xps_trajectory import XPSTrajectory, parse_gathering_data, save_gathering_data, \
+    get_gathering_chunk_size
+from config import xps_config
+
+
+class GatheringBuffer(object):
+    """answers GatheringDataMultipleLinesGet like the XPS, including the error for too long replies"""
+
+    def __init__(self, data):
+        self.lines = [';'.join(repr(value) for value in row) for row in data]
+        self.requests = []
+
+    def GatheringDataMultipleLinesGet(self, socket_id, index, num_lines):
+        self.requests.append((index, num_lines))
+        buff = '\n'.join(self.lines[index:index + num_lines]) + '\n'
+        if len(buff) > xps_config['GATHER REPLY LIMIT']:
+            return [-3, '']
+        return [0, buff]
+
+
+class GatheringDataTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_parse_and_save(self):
+        buff = '1.5;2;-3e-4;4\r\n5;6;7;8\n9;10;11;12\n'
+        data = parse_gathering_data(buff, 4)
+        self.assertEqual(data.shape, (3, 4))
+        self.assertEqual(data[0, 2], -3e-4)
+        self.assertEqual(data[2, 3], 12)
+
+        filename = os.path.join(self.folder, 'gather', 'sample_001.npz')
+        columns = ['STX.CurrentPosition', 'STX.FollowingError', 'STX.SetpointPosition', 'STX.CurrentVelocity']
+        self.assertTrue(save_gathering_data(filename, data, columns))
+        saved = np.load(filename)
+        np.testing.assert_array_equal(saved['data'], data)
+        self.assertEqual(list(saved['columns'])[1], 'STX.FollowingError')
+
+        # a file instead of the folder makes the save fail, which is only logged
+        self.assertFalse(save_gathering_data(os.path.join(filename, 'sample_002.npz'), data, columns))
+
+    def test_chunked_read(self):
+        data = np.random.uniform(-100, 100, (5000, 16))
+        trajectory = XPSTrajectory.__new__(XPSTrajectory)
+        trajectory.xps = GatheringBuffer(data)
+        trajectory.ssid = 0
+        trajectory.gather_outputs = ['output'] * 16
+
+        read_data = trajectory.read_gathering_data(len(data))
+        np.testing.assert_array_equal(read_data, data)
+
+        chunk_size = get_gathering_chunk_size(16)
+        self.assertEqual(len(trajectory.xps.requests), -(-len(data) // chunk_size))
+        self.assertTrue(all(num_lines <= chunk_size for _, num_lines in trajectory.xps.requests))
@@ -0,0 +1,111 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import time
+import unittest
+
+import pv
+import motion
+import measurement
+from motion import Motor, MotionCoordinator, MotionError
+from simulation.epics_simulator import EpicsSimulator
+
+
+class MotionCoordinatorTest(unittest.TestCase):
+    def setUp(self):
+        self.targets = [('sample_position_x', 1),
+                        ('sample_position_omega', -90),
+                        ('detector_position_z', 49),
+                        ('detector_position_x', 0)]
+
+    def test_independent_axes(self):
+        coordinator = MotionCoordinator(serialized_groups=[])
+        chains = coordinator.create_chains(self.targets)
+        self.assertEqual(len(chains), 4)
+        for chain in chains:
+            self.assertEqual(len(chain), 1)
+
+    def test_serialized_axes(self):
+        coordinator = MotionCoordinator(serialized_groups=[('detector_position_x', 'detector_position_z')])
+        chains = coordinator.create_chains(self.targets)
+        self.assertEqual(len(chains), 3)
+        self.assertEqual(chains[2], [('detector_position_x', 0), ('detector_position_z', 49)])
+
+
+class MotorTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_backend = pv._backend
+        self.simulator = pv.set_backend(EpicsSimulator(time_scale=0, beamline=False))
+        self.simulator.add_field('test:m1', 0.0)
+        self.simulator.add_field('test:m1.RDBD', 0.01)
+        self.dmov = self.simulator.add_field('test:m1.DMOV', 1)
+        self.rbv = self.simulator.add_field('test:m1.RBV', 0.0)
+
+    def tearDown(self):
+        pv._backend = self.previous_backend
+
+    def start_move(self, motor, target):
+        motor.move(target)
+        self.dmov.post(0)
+
+    def test_in_position_needs_dmov_and_readback_within_rdbd(self):
+        motor = Motor('test:m1', timeout=1, settle_readbacks=0)
+        self.assertEqual(motor.tolerance, 0.01)
+        self.start_move(motor, 1.0)
+        self.rbv.post(0.995)
+        self.assertFalse(motor.is_in_position())
+        self.dmov.post(1)
+        self.assertTrue(motor.is_in_position())
+        self.rbv.post(0.98)
+        self.assertFalse(motor.is_in_position())
+
+    def test_settle_time_from_readback_updates(self):
+        motor = Motor('test:m1', timeout=2, settle_readbacks=2)
+        self.start_move(motor, 1.0)
+        for position in (0.3, 0.6, 1.0):
+            time.sleep(0.1)
+            self.rbv.post(position)
+        self.dmov.post(1)
+        self.assertAlmostEqual(motor.get_settle_time(), 0.2, delta=0.05)
+        t1 = time.time()
+        self.assertTrue(motor.wait())
+        self.assertGreaterEqual(time.time() - t1, 0.15)
+
+    def test_stopped_outside_deadband(self):
+        motor = Motor('test:m1', timeout=5, settle_readbacks=0)
+        self.start_move(motor, 1.0)
+        self.rbv.post(0.5)
+        self.dmov.post(1)
+        # raised right away instead of returning False after the timeout
+        self.assertRaises(MotionError, motor.wait)
+
+    def test_timeout(self):
+        motor = Motor('test:m1', timeout=0.1, settle_readbacks=0)
+        self.start_move(motor, 1.0)
+        self.rbv.post(0.5)
+        self.assertFalse(motor.wait())
+
+    def test_failed_axes_are_reported(self):
+        motion._motors['sample_position_x'] = Motor('test:m1', timeout=0.1, settle_readbacks=0)
+        try:
+            with self.assertRaises(MotionError) as context:
+                measurement.move_axes([('sample_position_x', 1.0)])
+            self.assertIn('sample_position_x', str(context.exception))
+        finally:
+            motion.reset_motors()
@@ -0,0 +1,89 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import unittest
+
+from models import SxrdModel
+from plan import create_plan, compile_plan, STILL, WIDE, STEP, AXES
+
+
+class PlanTest(unittest.TestCase):
+    def setUp(self):
+        self.model = SxrdModel()
+        self.model.add_experiment_setup('A', 100, 49, -110, -70, 1, 1)
+        self.model.add_experiment_setup('B', 0, 49, -110, -70, 1, 1)
+        self.model.add_experiment_setup('C', 100, 49, -70, -30, 1, 1)
+        self.model.add_sample_point('S1', 0, 0, 0, step_state=True, wide_state=True, still_state=True)
+        self.model.add_sample_point('S2', 0.01, 0, 0, wide_state=True)
+
+        self.start_positions = {'sample_position_x': 0, 'sample_position_y': 0, 'sample_position_z': 0,
+                                'sample_position_omega': -90, 'detector_position_x': 0, 'detector_position_z': 49}
+        self.velocities = dict((axis, 1.0) for axis in AXES)
+        self.velocities['sample_position_omega'] = 10.0
+
+    def test_compile_plan(self):
+        acquisitions = compile_plan(self.model)
+        self.assertEqual(len(acquisitions), 12)
+        self.assertEqual([acq.scan_type for acq in acquisitions[:4]], [STILL, WIDE, STEP, WIDE])
+        self.assertEqual(acquisitions[0].omega_start, -90)
+
+        acquisitions = compile_plan(self.model, skip_setups=[1])
+        self.assertEqual(len(acquisitions), 8)
+
+    def test_batches_detector_positions(self):
+        acquisitions, report = create_plan(self.model, self.start_positions, self.velocities)
+        setup_names = []
+        for acquisition in acquisitions:
+            if not setup_names or setup_names[-1] != acquisition.experiment_setup.name:
+                setup_names.append(acquisition.experiment_setup.name)
+        self.assertEqual(setup_names, ['B', 'A', 'C'])
+        self.assertEqual(len(acquisitions), 12)
+        self.assertLess(report.optimized_motion_time, report.naive_motion_time)
+        self.assertGreater(report.saving, 0)
+
+    def test_chains_omega_ranges(self):
+        self.model.experiment_setups[2].detector_pos_x = 0
+        self.model.experiment_setups[0].detector_pos_x = 0
+        for point in self.model.sample_points:
+            point.perform_still_for_setup = [False] * 3
+            point.perform_step_scan_for_setup = [False] * 3
+            point.perform_wide_scan_for_setup = [True] * 3
+        self.start_positions['sample_position_omega'] = -70
+
+        acquisitions, _ = create_plan(self.model, self.start_positions, self.velocities)
+        self.assertEqual(acquisitions[0].experiment_setup.name, 'C')
+
+    def test_keeps_order_without_optimization(self):
+        acquisitions, report = create_plan(self.model, self.start_positions, self.velocities, optimize=False)
+        self.assertEqual(acquisitions[0].experiment_setup.name, 'A')
+        self.assertEqual(report.saving, 0)
+
+    def test_alternates_sample_point_order(self):
+        for point in self.model.sample_points:
+            point.perform_still_for_setup = [False] * 3
+            point.perform_step_scan_for_setup = [False] * 3
+            point.perform_wide_scan_for_setup = [True] * 3
+        self.model.add_sample_point('S3', 0.02, 0, 0, wide_state=True)
+        for setup in self.model.experiment_setups:
+            setup.detector_pos_x = 0
+
+        acquisitions, _ = create_plan(self.model, self.start_positions, self.velocities)
+        point_names = [acquisition.sample_point.name for acquisition in acquisitions]
+        # every setup starts at the sample point where the previous one ended
+        self.assertEqual(point_names, ['S1', 'S2', 'S3', 'S3', 'S2', 'S1', 'S1', 'S2', 'S3'])
@@ -0,0 +1,60 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import unittest
+
+import numpy as np
+
+from models import SxrdModel, SamplePoint
+from point_order import order_sample_points, nearest_neighbour_order, get_path_time, is_grid, \
+    SERPENTINE_ORDER, SHORTEST_PATH_ORDER
+
+VELOCITIES = {'sample_position_x': 1.0, 'sample_position_y': 1.0, 'sample_position_z': 1.0}
+
+
+class PointOrderTest(unittest.TestCase):
+    def test_serpentine_map(self):
+        model = SxrdModel()
+        model.add_sample_point('S1', 0, 0, 0)
+        model.create_map(0, -0.02, 0.02, 0.01, -0.02, 0.02, 0.01)
+        points = model.sample_points[1:]
+
+        positions = np.array([[p.x, p.y, p.z] for p in points])
+        self.assertTrue(is_grid(positions))
+
+        ordered = order_sample_points(points, VELOCITIES, (-0.02, -0.02, 0), SERPENTINE_ORDER)
+        self.assertEqual(sorted(p.name for p in ordered), sorted(p.name for p in points))
+        for point1, point2 in zip(ordered[:-1], ordered[1:]):
+            self.assertAlmostEqual(max(abs(point1.x - point2.x), abs(point1.y - point2.y)), 0.01)
+
+    def test_shortest_path_many_points(self):
+        np.random.seed(0)
+        positions = np.random.uniform(-0.5, 0.5, (2000, 3))
+        points = [SamplePoint('P{}'.format(ind), *pos) for ind, pos in enumerate(positions)]
+        speeds = np.ones(3)
+
+        ordered = order_sample_points(points, VELOCITIES, (0, 0, 0), SHORTEST_PATH_ORDER)
+
+        self.assertEqual(len(set(p.name for p in ordered)), len(points))
+        order = [int(p.name[1:]) for p in ordered]
+        nn_order = nearest_neighbour_order(positions, speeds, (0, 0, 0))
+        self.assertLess(get_path_time(positions, order, speeds, (0, 0, 0)),
+                        get_path_time(positions, nn_order, speeds, (0, 0, 0)))
+        self.assertLess(get_path_time(positions, order, speeds, (0, 0, 0)),
+                        get_path_time(positions, range(len(points)), speeds, (0, 0, 0)))
@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import unittest
+
+import pv
+from config import epics_config
+from pv_registry import PVRegistry, get_default_pv_names
+from simulation.epics_simulator import EpicsSimulator
+
+
+class PVRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_backend = pv._backend
+        self.simulator = pv.set_backend(EpicsSimulator(time_scale=0))
+        self.registry = PVRegistry()
+
+    def tearDown(self):
+        self.registry.clear()
+        pv._backend = self.previous_backend
+
+    def test_connect_default_pvs(self):
+        names = get_default_pv_names()
+        self.assertIn(epics_config['sample_position_omega'] + '.HLM', names)
+        self.assertIn('13IDD:m67.RBV', names)
+        self.assertEqual(self.registry.connect(), [])
+        self.assertTrue(all(self.registry.is_registered(name) for name in names))
+
+    def test_get_returns_monitored_value(self):
+        omega = epics_config['sample_position_omega']
+        self.registry.connect([omega + '.HLM'])
+        self.simulator.caput(omega + '.HLM', 42.0)
+        self.assertEqual(self.registry.get(omega + '.HLM'), 42.0)
+
+    def test_unregistered_and_unconnected_pvs_are_read_with_caget(self):
+        self.assertEqual(self.registry.connect(['does:not:exist'], timeout=0.1), ['does:not:exist'])
+        self.assertIsNone(self.registry.get('does:not:exist'))
+        file_name = epics_config['detector_file'] + ':FileName'
+        self.simulator.caput(file_name, 'sample')
+        self.assertEqual(self.registry.get(file_name, as_string=True), 'sample')
+
+    def test_backend_change_clears_registry(self):
+        self.registry.connect()
+        pv.set_backend(EpicsSimulator(time_scale=0))
+        self.registry.get(epics_config['sample_position_x'])
+        self.assertFalse(self.registry.is_registered(epics_config['sample_position_x']))
@@ -0,0 +1,203 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import os
+import glob
+import shutil
+import tempfile
+import unittest
+
+import timing
+import measurement
+from pv import caget, caput
+from motion import get_motor
+from detector import DetectorTimeout, DetectorError
+from xps_trajectory.xps_trajectory import XPSTrajectory
+from xps_trajectory.XPS_C8_drivers import XPSException
+from config import epics_config, collection_config
+from simulation.beamline import SimulatedBeamline
+
+
+class SimulatedBeamlineTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.beamline = SimulatedBeamline(time_scale=0, data_folder=self.folder).start()
+        caput(epics_config['detector_file'] + ':FileName', 'test')
+        caput(epics_config['detector_file'] + ':FileNumber', 1)
+
+    def tearDown(self):
+        self.beamline.stop()
+        shutil.rmtree(self.folder)
+
+    def test_motor_move(self):
+        motor = get_motor('sample_position_x')
+        motor.move(1.5)
+        self.assertTrue(motor.wait(5))
+        self.assertEqual(caget(epics_config['sample_position_x'] + '.RBV'), 1.5)
+
+    def test_move_to_sample_pos_without_waiting(self):
+        caput('13MARCCD2:AcquireSequence.STRA', '')
+        measurement.move_to_sample_pos(0.1, 0.2, 0.3, wait=False)
+        self.assertEqual(caget('13MARCCD2:AcquireSequence.STRA'), 'Scan finished')
+        self.assertTrue(get_motor('sample_position_z').wait(5))
+
+    def test_still_collection(self):
+        measurement.collect_single_data(10, 20, 1.0, 0.1, 0.2, 0.3, -90)
+        self.assertEqual(caget(epics_config['detector_position_z'] + '.RBV'), 20)
+        self.assertTrue(os.path.isfile(os.path.join(self.folder, 'test_001.tif')))
+        self.assertEqual(caget(epics_config['detector_file'] + ':FileNumber'), 2)
+
+    def test_step_collection(self):
+        measurement.collect_step_data(0, 0, -95, -92, 1, 0.5, 0, 0, 0)
+        self.assertEqual(len(glob.glob(os.path.join(self.folder, 'test_*.tif'))), 3)
+        self.assertEqual(len(glob.glob(os.path.join(self.folder, 'gather', 'test_*.npz'))), 3)
+
+    def test_step_collection_calls_callback_after_every_step(self):
+        pipelined = collection_config['PIPELINED STEP SCAN']
+        calls = []
+
+        def callback():
+            calls.append(1)
+            return True
+
+        try:
+            for pipelined_step_scan in (True, False):
+                collection_config['PIPELINED STEP SCAN'] = pipelined_step_scan
+                del calls[:]
+                measurement.collect_step_data(0, 0, -95, -92, 1, 0.5, 0, 0, 0, callback_fcn=callback)
+                # once before the collection is started and once after each of the 3 steps
+                self.assertEqual(len(calls), 4)
+        finally:
+            collection_config['PIPELINED STEP SCAN'] = pipelined
+
+    def test_gather_filename(self):
+        self.assertEqual(measurement.get_gather_filename(), os.path.join(self.folder, 'gather', 'test_001.npz'))
+        caput(epics_config['detector_file'] + ':FileNumber', None)
+        filename = measurement.get_gather_filename()
+        self.assertEqual(os.path.dirname(filename), os.path.join(self.folder, 'gather'))
+        self.assertTrue(os.path.basename(filename).startswith('gather_'))
+
+    def test_gather_filename_of_ioc_path(self):
+        file_path = measurement.FILEPATH
+        measurement.FILEPATH = self.folder
+        try:
+            caput(epics_config['detector_file'] + ':FilePath', '/ioc/data')
+            self.assertEqual(measurement.get_gather_filename(),
+                             os.path.join(self.folder + '/data', 'gather', 'test_001.npz'))
+        finally:
+            measurement.FILEPATH = file_path
+
+    def test_step_collection_with_unwritable_gather_folder(self):
+        blocking_file = os.path.join(self.folder, 'data')
+        open(blocking_file, 'w').close()
+        file_path = measurement.FILEPATH
+        measurement.FILEPATH = blocking_file
+        try:
+            caput(epics_config['detector_file'] + ':FilePath', '/ioc')
+            measurement.collect_step_data(0, 0, -95, -92, 1, 0.5, 0, 0, 0)
+        finally:
+            measurement.FILEPATH = file_path
+        self.assertEqual(len(self.beamline.epics.detector.exposures), 3)
+        # the return move after each trajectory ends every step without the ramp distance
+        self.assertAlmostEqual(self.beamline.xps.state.get_positions()[3], 3)
+
+    def test_step_collection_timing(self):
+        timing.recorder.clear()
+        measurement.collect_step_data(0, 0, -95, -93, 1, 0.5, 0, 0, 0)
+        names = set(span[0] for span in timing.recorder.spans)
+        for name in ('stage preparation', 'detector preparation', 'trajectory definition', 'trajectory upload',
+                     'ramp move', 'PVT execution', 'gather save', 'detector readout', 'detector writing', 'step'):
+            self.assertIn(name, names)
+
+    def test_continuous_step_collection_restores_detector_on_error(self):
+        detector_control = epics_config['detector_control']
+        caput(detector_control + ':ShutterMode', 1)
+        wait_for_detector = measurement.wait_for_detector
+
+        def raise_timeout(wait_fcn, timeout):
+            raise DetectorTimeout('{} timed out'.format(wait_fcn.__name__))
+
+        measurement.wait_for_detector = raise_timeout
+        try:
+            self.assertRaises(DetectorTimeout, measurement.collect_continuous_step_data, 0, 0, -95, -92, 1, 0.5,
+                              0, 0, 0)
+        finally:
+            measurement.wait_for_detector = wait_for_detector
+        self.assertEqual(caget(detector_control + ':Acquire'), 0)
+        self.assertEqual(caget(detector_control + ':ShutterMode'), 1)
+        self.assertEqual(caget(detector_control + ':TriggerMode'), 0)
+        self.assertEqual(caget(detector_control + ':ImageMode'), 0)
+        self.assertEqual(caget(detector_control + ':NumImages'), 1)
+
+    def test_rejected_trigger_mode(self):
+        detector_control = epics_config['detector_control']
+        trigger_mode = collection_config['DETECTOR TRIGGER MODE']
+        collection_config['DETECTOR TRIGGER MODE'] = 'External'
+        try:
+            self.assertRaises(DetectorError, measurement.prepare_detector_triggering, 3, 0.5)
+        finally:
+            collection_config['DETECTOR TRIGGER MODE'] = trigger_mode
+        self.assertEqual(caget(detector_control + ':TriggerMode_RBV'), 'Internal')
+        self.assertEqual(caget(detector_control + ':ImageMode'), 0)
+        self.assertEqual(caget(detector_control + ':NumImages'), 1)
+
+    def check_shutter_mode_restored_on_error(self, collect_fcn, *args):
+        caput(epics_config['detector_control'] + ':ShutterMode', 1)
+        run_line_trajectory_general = XPSTrajectory.run_line_trajectory_general
+
+        def raise_xps_error(*args, **kwargs):
+            raise XPSException('trajectory failed')
+
+        XPSTrajectory.run_line_trajectory_general = raise_xps_error
+        try:
+            self.assertRaises(XPSException, collect_fcn, *args)
+        finally:
+            XPSTrajectory.run_line_trajectory_general = run_line_trajectory_general
+        self.assertEqual(caget(epics_config['detector_control'] + ':ShutterMode'), 1)
+
+    def test_step_collection_restores_shutter_mode_on_error(self):
+        self.check_shutter_mode_restored_on_error(measurement.collect_step_data, 0, 0, -95, -93, 1, 0.5, 0, 0, 0)
+
+    def test_wide_collection_restores_shutter_mode_on_error(self):
+        self.check_shutter_mode_restored_on_error(measurement.collect_wide_data, 0, 0, -95, -85, 0.5, 0, 0, 0)
+
+
+class ContinuousStepCollectionTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.beamline = SimulatedBeamline(time_scale=0.05, data_folder=self.folder).start()
+        caput(epics_config['detector_file'] + ':FileName', 'test')
+        caput(epics_config['detector_file'] + ':FileNumber', 1)
+
+    def tearDown(self):
+        self.beamline.stop()
+        shutil.rmtree(self.folder)
+
+    def test_frames_follow_trajectory_pulses(self):
+        measurement.collect_continuous_step_data(0, 0, -95, -92, 1, 0.5, 0, 0, 0)
+        exposures = self.beamline.epics.detector.exposures
+        pulses = self.beamline.xps.state.pulse_log
+        self.assertEqual(len(pulses), 3)
+        self.assertEqual(len(exposures), 3)
+        step_ends = pulses[1:] + [pulses[-1] + (pulses[1] - pulses[0])]
+        for (exposure_start, exposure_end), step_start, step_end in zip(exposures, pulses, step_ends):
+            self.assertGreaterEqual(exposure_start, step_start)
+            self.assertLess(exposure_end, step_end)
+        self.assertEqual(len(glob.glob(os.path.join(self.folder, 'test_*.tif'))), 3)
+        self.assertEqual(caget(epics_config['detector_control'] + ':TriggerMode_RBV'), 'Internal')
@@ -0,0 +1,58 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import os
+import sys
+import subprocess
+import unittest
+
+from startup import lazy_import, ImportProfiler, StartupTimer
+
+package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTest(unittest.TestCase):
+    def test_lazy_import_is_deferred(self):
+        sys.modules.pop('colorsys', None)
+        colorsys = lazy_import('colorsys')
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(colorsys.rgb_to_hsv(0, 0, 0), (0, 0, 0))
+        self.assertIn('colorsys', sys.modules)
+
+    def test_import_profiler_records_new_modules(self):
+        sys.modules.pop('wave', None)
+        profiler = ImportProfiler().start()
+        try:
+            import wave
+        finally:
+            profiler.stop()
+        self.assertIn('wave', [record[0] for record in profiler.records])
+        self.assertIn('wave', profiler.report())
+
+    def test_startup_timer_budget(self):
+        timer = StartupTimer(start=0)
+        timer.mark('window shown')
+        self.assertFalse(timer.check('window shown', 1.0))
+        self.assertTrue(timer.check('not reached', 1.0))
+
+    def test_gui_imports_do_not_load_hardware_modules(self):
+        code = "import sys, pv, timing, startup, config, models\n" \
+               "print(' '.join(name for name in ('epics', 'measurement', 'numpy') if name in sys.modules))"
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=package_path)
+        self.assertEqual(output.strip(), '')
@@ -0,0 +1,58 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import shutil
+import tempfile
+import unittest
+
+from timing import TimingRecorder, read_spans
+
+
+class TimingRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.recorder = TimingRecorder()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_span_with_context(self):
+        self.recorder.set_context(scan_type='step', point='P1')
+        with self.recorder.span('ramp move', step=2):
+            pass
+        row = self.recorder.get_rows()[0]
+        self.assertEqual(row['name'], 'ramp move')
+        self.assertEqual(row['scan_type'], 'step')
+        self.assertEqual(row['step'], 2)
+        self.assertGreaterEqual(row['duration'], 0)
+
+    def test_flush(self):
+        self.recorder.set_context(point='P1')
+        self.recorder.record('PVT execution', 10.0, 12.5)
+        self.recorder.set_context()
+        self.recorder.record('gather save', 12.5, 12.75)
+        csv_filename, json_filename = self.recorder.flush(self.folder, 'session')
+        self.assertEqual(self.recorder.spans, [])
+        self.assertIsNone(self.recorder.flush(self.folder))
+
+        for filename in (csv_filename, json_filename):
+            spans = read_spans(filename)
+            self.assertEqual([span['name'] for span in spans], ['PVT execution', 'gather save'])
+            self.assertEqual(spans[0]['duration'], 2.5)
+            self.assertEqual(spans[0]['point'], 'P1')
@@ -0,0 +1,169 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import socket
+import unittest
+from threading import Thread
+
+from xps_trajectory.XPS_C8_drivers import XPS, XPSException, receive_reply, receive_replies, split_reply, \
+    get_return_types, parse_reply
+
+
+class ReceiveTest(unittest.TestCase):
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_reply_in_pieces(self):
+        reply = '0,' + '1;2;3\n' * 100 + ',EndOfAPI'
+        for ind in range(0, len(reply), 7):
+            self.sender.sendall(reply[ind:ind + 7])
+        received = receive_reply(self.receiver, buffer_size=16)
+        self.assertEqual(received, reply)
+        self.assertEqual(split_reply(received), [0, '1;2;3\n' * 100])
+
+    def test_error_reply(self):
+        self.sender.sendall('-17,,EndOfAPI')
+        self.assertEqual(split_reply(receive_reply(self.receiver)), [-17, ''])
+
+    def test_closed_connection(self):
+        self.sender.sendall('0,1')
+        self.sender.close()
+        self.assertRaises(socket.error, receive_reply, self.receiver)
+
+
+class ParseReplyTest(unittest.TestCase):
+    def test_return_types(self):
+        self.assertEqual(get_return_types('GatheringCurrentNumberGet(int *,int *)'), [int, int])
+        self.assertEqual(get_return_types('PositionerBacklashGet(G1.OM,double *,char *)'), [float, str])
+        self.assertEqual(get_return_types('GroupPositionCurrentGet(G1,double *,double *)'), [float, float])
+        self.assertEqual(get_return_types('GatheringReset()'), [])
+
+    def test_parse_reply(self):
+        self.assertEqual(parse_reply('12,1000', [int, int]), [12, 1000])
+        values = parse_reply('-1.5e-3,90', [float, float])
+        self.assertEqual(values, [-1.5e-3, 90.0])
+        self.assertIsInstance(values[1], float)
+        self.assertEqual(parse_reply('0.1,Enable', [float, str]), [0.1, 'Enable'])
+
+    def test_no_eval(self):
+        self.assertRaises(ValueError, parse_reply, '__import__("os"),1', [float, int])
+        self.assertRaises(XPSException, parse_reply, '1', [int, int])
+
+
+class CommandServer(object):
+    """answers every command with "0,<n>" where n counts the commands received on the connection"""
+
+    def __init__(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+        self.commands = []
+        self.thread = Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except socket.error:
+                return
+            thread = Thread(target=self.handle, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def handle(self, connection):
+        data = ''
+        num_commands = 0
+        while True:
+            received = connection.recv(4096)
+            if not received:
+                return
+            data += received
+            while ')' in data:
+                command, data = data.split(')', 1)
+                self.commands.append(command + ')')
+                num_commands += 1
+                if command == 'Hangup(':
+                    connection.close()
+                    return
+                connection.sendall('0,{},EndOfAPI'.format(num_commands))
+
+    def close(self):
+        self.server.close()
+
+
+class SendMultipleTest(unittest.TestCase):
+    def setUp(self):
+        self.server = CommandServer()
+        self.xps = XPS()
+        self.socket_ids = [self.xps.TCP_ConnectToServer('127.0.0.1', self.server.port, 5) for _ in range(2)]
+
+    def tearDown(self):
+        for socket_id in self.socket_ids:
+            self.xps.TCP_CloseSocket(socket_id)
+        self.server.close()
+
+    def check_batches(self, pipelined):
+        batches = [(self.socket_ids[0], ['GatheringReset()', 'EventExtendedStart(int *)']),
+                   (self.socket_ids[1], ['MultipleAxesPVTVerification(G1,a.trj)'])]
+        replies = self.xps.SendMultiple(batches, pipelined=pipelined)
+        self.assertEqual(replies[0], [[0, '1'], [0, 2]])
+        self.assertEqual(replies[1], [[0, '1']])
+        self.assertEqual(len(self.server.commands), 3)
+
+    def test_pipelined(self):
+        self.check_batches(True)
+
+    def test_sequential(self):
+        self.check_batches(False)
+
+    def check_socket_error(self, pipelined):
+        batches = [(self.socket_ids[0], ['GatheringReset()', 'Hangup()', 'GatheringStop()']),
+                   (self.socket_ids[1], ['GatheringReset()'])]
+        replies = self.xps.SendMultiple(batches, pipelined=pipelined)
+        self.assertEqual(replies[0][1:], [[-2, ''], [-2, '']])
+        self.assertEqual(replies[1], [[0, '1']])
+        # the socket with unread replies is closed instead of being reused
+        self.assertRaises(XPSException, self.xps.Send, self.socket_ids[0], 'GatheringReset()')
+        self.assertEqual(self.xps.Send(self.socket_ids[1], 'GatheringReset()'), (0, '2'))
+
+    def test_socket_error_pipelined(self):
+        self.check_socket_error(True)
+
+    def test_socket_error_sequential(self):
+        self.check_socket_error(False)
+
+    def test_same_socket(self):
+        self.assertRaises(XPSException, self.xps.SendMultiple, [(self.socket_ids[0], ['GatheringReset()']),
+                                                                (self.socket_ids[0], ['GatheringStop()'])])
+
+    def test_receive_replies(self):
+        sender, receiver = socket.socketpair()
+        sender.sendall('0,1,EndOfAPI0,,EndOfAPI-3,,End')
+        sender.sendall('OfAPI')
+        self.assertEqual(receive_replies(receiver, 3, buffer_size=8),
+                         ['0,1,EndOfAPI', '0,,EndOfAPI', '-3,,EndOfAPI'])
+        sender.close()
+        receiver.close()
@@ -0,0 +1,99 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import socket
+import unittest
+from threading import Thread
+
+from simulation.xps_simulator import XPSSimulator, XPSCommandHandler
+from xps_trajectory.xps_session import XPSSession
+from xps_trajectory.XPS_C8_drivers import XPS, XPSException
+
+
+class XPSSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.simulator = XPSSimulator(time_scale=0).start()
+        self.session = XPSSession(host=self.simulator.host, port=self.simulator.port,
+                                  ftp_port=self.simulator.ftp_port, reconnect_delay=0)
+
+    def tearDown(self):
+        self.session.close()
+        self.simulator.stop()
+
+    def borrow_in_thread(self):
+        trajectories = []
+
+        def borrow():
+            with self.session.borrow() as trajectory:
+                trajectories.append(trajectory)
+
+        thread = Thread(target=borrow)
+        thread.start()
+        thread.join(5)
+        return trajectories
+
+    def test_borrow_returns_session(self):
+        with self.session.borrow() as trajectory:
+            self.assertTrue(trajectory.is_connected())
+        # the session is released for other threads and the connection is kept
+        self.assertEqual(self.borrow_in_thread(), [trajectory])
+
+    def test_reconnect_after_socket_error(self):
+        with self.session.borrow() as trajectory:
+            pass
+        with self.assertRaises(socket.error):
+            with self.session.borrow():
+                raise socket.error('connection reset')
+        self.assertFalse(trajectory.is_connected())
+
+        with self.session.borrow() as new_trajectory:
+            self.assertIsNot(new_trajectory, trajectory)
+            self.assertTrue(new_trajectory.is_connected())
+
+    def test_reconnect_broken_connection(self):
+        trajectory = self.session.get_trajectory()
+        trajectory.disconnect()
+        self.assertFalse(trajectory.is_connected())
+        self.assertTrue(self.session.get_trajectory().is_connected())
+
+    def test_trajectory_connect_disconnect(self):
+        trajectory = self.session.get_trajectory()
+        trajectory.disconnect()
+        self.assertEqual(trajectory.ssid, -1)
+        trajectory.connect()
+        self.assertTrue(trajectory.is_connected())
+
+    def test_failed_login_closes_sockets(self):
+        num_sockets = XPS._XPS__nbSockets
+        cmd_login = XPSCommandHandler.cmd_Login
+        XPSCommandHandler.cmd_Login = lambda handler, user, password: handler.reply(-106)
+        try:
+            self.assertRaises(XPSException, self.session.get_trajectory)
+        finally:
+            XPSCommandHandler.cmd_Login = cmd_login
+        self.assertEqual(XPS._XPS__nbSockets, num_sockets)
+
+    def test_reconnect_after_batch_socket_closed(self):
+        trajectory = self.session.get_trajectory()
+        # e.g. closed by the driver after a socket error within a batch
+        trajectory.xps.TCP_CloseSocket(trajectory.batch_ssid)
+        self.assertFalse(trajectory.is_connected())
+        new_trajectory = self.session.get_trajectory()
+        self.assertIsNot(new_trajectory, trajectory)
+        self.assertTrue(new_trajectory.is_connected())
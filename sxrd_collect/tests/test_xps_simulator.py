@@ -0,0 +1,95 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+import numpy as np
+
+from simulation.xps_simulator import XPSSimulator
+from xps_trajectory.xps_trajectory import XPSTrajectory
+from xps_trajectory.XPS_C8_drivers import XPSException
+
+
+class XPSSimulatorTest(unittest.TestCase):
+    def setUp(self):
+        self.simulator = XPSSimulator(time_scale=0).start()
+        self.trajectory = XPSTrajectory(host=self.simulator.host, port=self.simulator.port,
+                                        ftp_port=self.simulator.ftp_port)
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.trajectory.disconnect()
+        self.simulator.stop()
+        shutil.rmtree(self.folder)
+
+    def test_connection(self):
+        self.assertTrue(self.trajectory.is_connected())
+        self.assertEqual(len(self.trajectory.get_accel_values()), 4)
+
+    def test_line_trajectory(self):
+        self.trajectory.define_line_trajectories_general(stop_values=[[0, 0, 0, 1.0]], scan_time=1.0,
+                                                         pulse_time=0.1, accel_values=[2, 2, 2, 2])
+        self.assertEqual(len(self.simulator.state.files), 1)
+
+        filename = os.path.join(self.folder, 'frame_001.npz')
+        npulses = self.trajectory.run_line_trajectory_general(outfile=filename)
+        self.assertEqual(npulses, 11)
+
+        saved = np.load(filename)
+        self.assertEqual(list(saved['columns'])[12], 'OM.CurrentPosition')
+        data = saved['data']
+        self.assertEqual(data.shape, (11, 16))
+        omega_positions = data[:, 12]
+        self.assertAlmostEqual(omega_positions[-1] - omega_positions[0], 1.0)
+        self.assertAlmostEqual(self.simulator.state.get_positions()[3], 1.0)
+
+    def test_step_trajectory(self):
+        self.trajectory.define_step_trajectory(step_values=[0, 0, 0, 0.5], num_steps=5, exposure_time=1.0,
+                                               dwell_time=2.0, accel_values=[2, 2, 2, 2])
+        npulses = self.trajectory.run_line_trajectory_general(outfile=os.path.join(self.folder, 'steps.npz'))
+        self.assertEqual(npulses, 5)
+        self.assertAlmostEqual(self.simulator.state.get_positions()[3], 2.5)
+
+    def test_upload_cache(self):
+        for _ in range(3):
+            self.trajectory.define_line_trajectories_general(stop_values=[[0, 0, 0, 2.0]], scan_time=2.0,
+                                                             accel_values=[2, 2, 2, 2])
+        self.assertEqual(len(self.simulator.state.files), 1)
+
+        self.trajectory.uploaded_files.clear()
+        self.trajectory.define_line_trajectories_general(stop_values=[[0, 0, 0, 2.0]], scan_time=2.0,
+                                                         accel_values=[2, 2, 2, 2])
+        self.assertEqual(len(self.trajectory.uploaded_files), 1)
+
+        self.trajectory.evict_trajectory_files(cache_size=0)
+        self.assertEqual(len(self.simulator.state.files), 1)
+
+    def test_failed_upload_raises(self):
+        unused_socket = socket.socket()
+        unused_socket.bind(('127.0.0.1', 0))
+        self.trajectory.ftp_port = unused_socket.getsockname()[1]
+        unused_socket.close()
+        with self.assertRaises(XPSException):
+            self.trajectory.define_line_trajectories_general(stop_values=[[0, 0, 0, 1.0]], scan_time=1.0,
+                                                             accel_values=[2, 2, 2, 2])
+        self.assertNotIn('file', self.trajectory.trajectories['default'])
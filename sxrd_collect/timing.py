@@ -0,0 +1,156 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Timing spans of the collection phases (stage preparation, trajectory definition, PVT execution, detector readout,
+...). Spans are appended to an in-memory recorder, which costs about a microsecond per span, and written to CSV and
+JSON at the end of a collection session:
+
+    with span('stage preparation'):
+        prepare_stage(...)
+
+The context set with set_context (e.g. scan type, sample point and setup of the current acquisition) is stored with
+every span recorded afterwards.
+"""
+__author__ = 'Clemens Prescher'
+
+import os
+import csv
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+BASE_COLUMNS = ['name', 'start', 'end', 'duration', 'thread']
+
+
+class _Span(object):
+    __slots__ = ('recorder', 'name', 'tags', 'start')
+
+    def __init__(self, recorder, name, tags):
+        self.recorder = recorder
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.recorder.record(self.name, self.start, time.time(), **self.tags)
+
+
+class TimingRecorder(object):
+    def __init__(self):
+        self.spans = []
+        self.context = {}
+
+    def set_context(self, **context):
+        self.context = context
+
+    def span(self, name, **tags):
+        """context manager recording the time spent within it as span with the given name"""
+        return _Span(self, name, tags)
+
+    def record(self, name, start, end, **tags):
+        """records a span measured elsewhere, start and end are given as time.time() values"""
+        if self.context:
+            context = dict(self.context)
+            context.update(tags)
+            tags = context
+        self.spans.append((name, start, end, threading.current_thread().name, tags))
+
+    def clear(self):
+        self.spans = []
+
+    def get_rows(self):
+        """returns the spans as list of dictionaries with the BASE_COLUMNS and the context and tag names as keys"""
+        rows = []
+        for name, start, end, thread, tags in self.spans:
+            row = {'name': name, 'start': start, 'end': end, 'duration': end - start, 'thread': thread}
+            row.update(tags)
+            rows.append(row)
+        return rows
+
+    def flush(self, folder, basename=None):
+        """
+        Writes all spans to <basename>.csv and <basename>.json in folder and clears the recorder.
+        :param basename: defaults to timing_<date>_<time>
+        :return: paths of the CSV and the JSON file or None if there were no spans
+        """
+        if not self.spans:
+            return None
+        rows = self.get_rows()
+        self.clear()
+        if basename is None:
+            basename = time.strftime('timing_%Y%m%d_%H%M%S')
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        columns = list(BASE_COLUMNS)
+        for row in rows:
+            columns.extend(sorted(key for key in row if key not in columns))
+
+        csv_filename = os.path.join(folder, basename + '.csv')
+        with open(csv_filename, 'wb') as fp:
+            writer = csv.DictWriter(fp, columns)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        json_filename = os.path.join(folder, basename + '.json')
+        with open(json_filename, 'w') as fp:
+            json.dump(rows, fp)
+        logger.info('Wrote {} timing spans to {}.'.format(len(rows), csv_filename))
+        return csv_filename, json_filename
+
+
+def read_spans(filename):
+    """reads the spans of a CSV or JSON file written by TimingRecorder.flush as list of dictionaries"""
+    if filename.endswith('.json'):
+        with open(filename) as fp:
+            return json.load(fp)
+    with open(filename, 'rb') as fp:
+        rows = list(csv.DictReader(fp))
+    for row in rows:
+        for key in ('start', 'end', 'duration'):
+            row[key] = float(row[key])
+    return rows
+
+
+recorder = TimingRecorder()
+
+
+def span(name, **tags):
+    return recorder.span(name, **tags)
+
+
+def record(name, start, end, **tags):
+    recorder.record(name, start, end, **tags)
+
+
+def set_context(**context):
+    recorder.set_context(**context)
+
+
+def timed(name, fcn, **tags):
+    """returns fcn wrapped into a span, e.g. for functions run as engine tasks"""
+    def timed_fcn(*args, **kwargs):
+        with recorder.span(name, **tags):
+            return fcn(*args, **kwargs)
+    return timed_fcn
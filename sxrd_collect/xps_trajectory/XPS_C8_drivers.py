@@ -14,6 +14,115 @@
 # ade many return values "consistent".
 
 import socket
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+REPLY_TERMINATOR = ',EndOfAPI'
+RECEIVE_BUFFER_SIZE = 65536
+
+
+def receive_reply(sock, buffer_size=RECEIVE_BUFFER_SIZE):
+    """
+    receives a reply of the XPS into a growing bytearray until it ends with ",EndOfAPI". Only the tail of the
+    received data is checked for the terminator, so long replies (e.g. gathering data) are read in linear time.
+    """
+    buff = bytearray(buffer_size)
+    size = 0
+    tail = len(REPLY_TERMINATOR)
+    while True:
+        if size == len(buff):
+            buff.extend(bytearray(len(buff)))
+        view = memoryview(buff)[size:]
+        num_bytes = sock.recv_into(view)
+        del view  # the bytearray can only be extended when no view of it exists
+        if num_bytes == 0:
+            raise socket.error('Connection closed by XPS')
+        size += num_bytes
+        if size >= tail and buff[size - tail:size] == REPLY_TERMINATOR:
+            return str(buff[:size])
+
+
+def receive_replies(sock, num_replies, buffer_size=RECEIVE_BUFFER_SIZE):
+    """
+    receives the replies of num_replies pipelined commands. The received data is only searched once for the
+    terminators, starting where the previous search stopped.
+    """
+    buff = bytearray(buffer_size)
+    size = 0
+    search_start = 0
+    num_found = 0
+    tail = len(REPLY_TERMINATOR)
+    while num_found < num_replies:
+        if size == len(buff):
+            buff.extend(bytearray(len(buff)))
+        view = memoryview(buff)[size:]
+        num_bytes = sock.recv_into(view)
+        del view
+        if num_bytes == 0:
+            raise socket.error('Connection closed by XPS')
+        size += num_bytes
+        while num_found < num_replies:
+            ind = buff.find(REPLY_TERMINATOR, search_start, size)
+            if ind < 0:
+                search_start = max(search_start, size - tail + 1)
+                break
+            num_found += 1
+            search_start = ind + tail
+    replies = str(buff[:size]).split(REPLY_TERMINATOR)[:num_replies]
+    return [reply + REPLY_TERMINATOR for reply in replies]
+
+
+def parse_command_reply(command, reply):
+    """converts the values of a successful [error, returnedString] reply if the command has output arguments"""
+    error, returned_string = reply
+    if error != 0 or not get_return_types(command):
+        return [error, returned_string]
+    return [error] + parse_reply(returned_string, get_return_types(command))
+
+
+def split_reply(reply):
+    """splits a reply into the error code and the returned string without terminator"""
+    error, _, returned_string = reply.partition(',')
+    return [int(error), returned_string[:-len(REPLY_TERMINATOR)]]
+
+
+# converters for the output arguments of the XPS functions
+RETURN_TYPES = {'double *': float,
+                'int *': int,
+                'short *': int,
+                'unsigned short *': int,
+                'bool *': int,
+                'char *': str}
+
+_return_types_cache = {}
+
+
+def get_return_types(command):
+    """
+    returns the converters for the values returned by a command, derived from the output arguments of its signature,
+    e.g. [float, float] for 'GroupPositionCurrentGet(G1,double *,double *)'
+    """
+    try:
+        return _return_types_cache[command]
+    except KeyError:
+        pass
+    arguments = command[command.index('(') + 1:command.rindex(')')].split(',')
+    return_types = [RETURN_TYPES[argument.strip()] for argument in arguments if argument.strip().endswith('*')]
+    if len(_return_types_cache) > 1000:
+        _return_types_cache.clear()
+    _return_types_cache[command] = return_types
+    return return_types
+
+
+def parse_reply(returned_string, return_types):
+    """splits the returned string of a command once and converts the values with the given converters"""
+    values = returned_string.split(',', len(return_types) - 1)
+    if len(values) != len(return_types):
+        raise XPSException('Expected {} values in reply "{}"'.format(len(return_types), returned_string))
+    return [convert(value) for convert, value in zip(return_types, values)]
+
 
 class XPSException(Exception):
     """XPS Controller Exception"""
@@ -57,19 +166,19 @@ class XPS:
     @withValidSocket
     def __sendAndReceive (self, socketId, command):
         try:
-            XPS.__sockets[socketId].send(command)
-            ret = XPS.__sockets[socketId].recv(1024)
-            while (ret.find(',EndOfAPI') == -1):
-                ret += XPS.__sockets[socketId].recv(1024)
-        except socket.timeout:
-            return [-2, '']
-        except socket.error (errNb, errString):
-            print('Socket error : ' + errString)
+            XPS.__sockets[socketId].sendall(command)
+            ret = receive_reply(XPS.__sockets[socketId])
+        except socket.error as e:
+            self.__closeAfterError(socketId, e)
             return [-2, '']
 
-        for i in range(len(ret)):
-            if (ret[i] == ','):
-                return [int(ret[0:i]), ret[i+1:-9]]
+        return split_reply(ret)
+
+    def __closeAfterError(self, socketId, error):
+        """replies which were not received would be read as the replies of the next commands, therefore the socket
+        is closed after an error and has to be reconnected"""
+        logger.error('Socket error on socket %s, closing it: %s' % (socketId, error))
+        self.TCP_CloseSocket(socketId)
 
     def Send(self, socketId=None, cmd=None, check=False):
         """send and receive command cmd from socketId
@@ -84,6 +193,79 @@ class XPS:
             raise XPSException(msg)
         return err, msg
 
+    def SendAndParse(self, socketId=None, cmd=None, check=False):
+        """send a command with output arguments and return [error, value1, value2, ...], whereby the values are
+        converted according to the output argument types (double *, int *, char *, ...) of the command.
+        On error [error, returnedString] is returned.
+        """
+        err, msg = self.Send(socketId, cmd, check)
+        if err != 0:
+            return [err, msg]
+        return [err] + parse_reply(msg, get_return_types(cmd))
+
+    def SendMultiple(self, batches, pipelined=True):
+        """send several lists of commands and collect all replies.
+        batches is a list of (socketId, commands) tuples. The commands of a batch are executed one after another in
+        the given order, different batches are executed concurrently on their sockets, i.e. all batches need to use
+        different sockets. With pipelined=True all commands are sent back to back before any reply is read, so the
+        whole call takes a single round trip; otherwise every batch sends its commands one by one in its own thread.
+        Returns a list of replies for every batch. Replies of commands with output arguments are parsed like in
+        SendAndParse, all others are [error, returnedString]. Socket errors result in [-2, ''] for the remaining
+        commands of the batch and close its socket.
+        """
+        socket_ids = [socketId for socketId, _ in batches]
+        if len(set(socket_ids)) != len(socket_ids):
+            raise XPSException('every batch needs its own socket')
+        for socketId in socket_ids:
+            if XPS.__usedSockets.get(socketId, 0) == 0:
+                raise XPSException('invalid socket %s in SendMultiple' % socketId)
+
+        if pipelined:
+            replies = self.__sendPipelined(batches)
+        else:
+            replies = [None] * len(batches)
+
+            def send_batch(ind, socketId, commands):
+                replies[ind] = []
+                for command in commands:
+                    if XPS.__usedSockets[socketId] == 0:  # closed after a socket error
+                        replies[ind].append([-2, ''])
+                    else:
+                        replies[ind].append(self.__sendAndReceive(socketId, command))
+
+            threads = [threading.Thread(target=send_batch, args=(ind, socketId, commands))
+                       for ind, (socketId, commands) in enumerate(batches)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        results = []
+        for (_, commands), batch_replies in zip(batches, replies):
+            results.append([parse_command_reply(command, reply) for command, reply in zip(commands, batch_replies)])
+        return results
+
+    def __sendPipelined(self, batches):
+        failed = set()
+        for ind, (socketId, commands) in enumerate(batches):
+            try:
+                XPS.__sockets[socketId].sendall(''.join(commands))
+            except socket.error as e:
+                self.__closeAfterError(socketId, e)
+                failed.add(ind)
+
+        replies = []
+        for ind, (socketId, commands) in enumerate(batches):
+            if ind not in failed:
+                try:
+                    replies.append([split_reply(reply) for reply in
+                                    receive_replies(XPS.__sockets[socketId], len(commands))])
+                    continue
+                except socket.error as e:
+                    self.__closeAfterError(socketId, e)
+            replies.append([[-2, ''] for _ in commands])
+        return replies
+
     # TCP_ConnectToServer
     def TCP_ConnectToServer (self, IP, port, timeOut):
         socketId = 0
@@ -104,6 +286,8 @@ class XPS:
             XPS.__sockets[socketId].settimeout(timeOut)
             XPS.__sockets[socketId].setblocking(1)
         except socket.error:
+            XPS.__usedSockets[socketId] = 0
+            XPS.__nbSockets -= 1
             return -1
 
         return socketId
@@ -115,7 +299,8 @@ class XPS:
 
     # TCP_CloseSocket
     def TCP_CloseSocket (self, socketId):
-        if (socketId >= 0 and socketId < self.MAX_NB_SOCKETS):
+        # sockets closed after an error are not counted twice
+        if (socketId >= 0 and socketId < self.MAX_NB_SOCKETS and XPS.__usedSockets[socketId] == 1):
             try:
                 XPS.__sockets[socketId].close()
                 XPS.__usedSockets[socketId] = 0
@@ -130,27 +315,11 @@ class XPS:
     # ControllerMotionKernelTimeLoadGet :  Get controller motion kernel time load
     def ControllerMotionKernelTimeLoadGet(self, socketId=None):
         command = 'ControllerMotionKernelTimeLoadGet(double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId=socketId, cmd=command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # ControllerStatusGet :  Read controller current status
     def ControllerStatusGet(self, socketId=None):
-        error, returnedString = self.Send(socketId=socketId,
-                                          cmd='ControllerStatusGet(int *)', check=True)
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, 'ControllerStatusGet(int *)', check=True)
 
     # ControllerStatusStringGet :  Return the controller status string corresponding to the controller status code
     def ControllerStatusStringGet(self, socketId, ControllerStatusCode):
@@ -161,16 +330,7 @@ class XPS:
     # ElapsedTimeGet :  Return elapsed time from controller power on
     def ElapsedTimeGet(self, socketId=None):
         command = 'ElapsedTimeGet(double *)'
-        [error, returnedString] = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # ErrorStringGet :  Return the error string corresponding to the error code
@@ -204,16 +364,7 @@ class XPS:
     # TimerGet :  Get a timer
     def TimerGet (self, socketId, TimerName):
         command = 'TimerGet(' + TimerName + ',int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # TimerSet :  Set a timer
     def TimerSet (self, socketId, TimerName, FrequencyTicks):
@@ -294,15 +445,7 @@ class XPS:
     # EventExtendedStart :  Launch the last event and action configuration and return an ID
     def EventExtendedStart (self, socketId):
         command = 'EventExtendedStart(int *)'
-        error, returnedString = self.Send(socketId, command) 
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # EventExtendedAllGet :  Read all event and action configurations
     def EventExtendedAllGet (self, socketId):
@@ -337,17 +480,7 @@ class XPS:
     # GatheringCurrentNumberGet :  Maximum number of samples and current number during acquisition
     def GatheringCurrentNumberGet (self, socketId):
         command = 'GatheringCurrentNumberGet(int *,int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # GatheringStopAndSave :  Stop acquisition and save data
     def GatheringStopAndSave (self, socketId):
@@ -403,17 +536,7 @@ class XPS:
     # GatheringExternalCurrentNumberGet :  Maximum number of samples and current number during acquisition
     def GatheringExternalCurrentNumberGet (self, socketId):
         command = 'GatheringExternalCurrentNumberGet(int *,int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GatheringExternalDataGet :  Get a data line from external gathering buffer
@@ -436,15 +559,7 @@ class XPS:
     # DoubleGlobalArrayGet :  Get double global array value
     def DoubleGlobalArrayGet (self, socketId, Number):
         command = 'DoubleGlobalArrayGet(' + str(Number) + ',double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # DoubleGlobalArraySet :  Set double global array value
     def DoubleGlobalArraySet (self, socketId, Number, DoubleValue):
@@ -460,17 +575,7 @@ class XPS:
             command += GPIOName[i] + ',' + 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(len(GPIOName)):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GPIOAnalogSet :  Set analog output for one or few output
@@ -493,17 +598,7 @@ class XPS:
             command += GPIOName[i] + ',' + 'int *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(len(GPIOName)):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GPIOAnalogGainSet :  Set analog input gain (1, 2, 4 or 8) for one or few input
@@ -521,15 +616,7 @@ class XPS:
     def GPIODigitalGet (self, socketId, GPIOName):
 
         command = 'GPIODigitalGet(' + GPIOName + ',unsigned short *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GPIODigitalSet :  Set Digital Output for one or few output TTL
@@ -546,17 +633,7 @@ class XPS:
             command += 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # GroupAnalogTrackingModeEnable :  Enable Analog Tracking mode on selected group
     def GroupAnalogTrackingModeEnable (self, socketId, GroupName, Type):
@@ -576,17 +653,7 @@ class XPS:
                 command += ','
             command += 'double *'
         command += ')'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupCurrentFollowingErrorGet :  Return current following errors
@@ -598,17 +665,7 @@ class XPS:
             command += 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupHomeSearch :  Start home search sequence
@@ -652,17 +709,7 @@ class XPS:
             command += 'double *' + ',' + 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement*2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # GroupJogCurrentGet :  Get Jog current on selected group
     def GroupJogCurrentGet (self, socketId, GroupName, nbElement):
@@ -673,18 +720,7 @@ class XPS:
             command += 'double *' + ',' + 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement*2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupJogModeEnable :  Enable Jog mode on selected group
@@ -736,17 +772,7 @@ class XPS:
     # GroupPositionCorrectedProfilerGet :  Return corrected profiler positions
     def GroupPositionCorrectedProfilerGet (self, socketId, GroupName, PositionX, PositionY):
         command = 'GroupPositionCorrectedProfilerGet(' + GroupName + ',' + str(PositionX) + ',' + str(PositionY) + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupPositionCurrentGet :  Return current positions
@@ -758,32 +784,12 @@ class XPS:
             command += 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # GroupPositionPCORawEncoderGet :  Return PCO raw encoder positions
     def GroupPositionPCORawEncoderGet (self, socketId, GroupName, PositionX, PositionY):
         command = 'GroupPositionPCORawEncoderGet(' + GroupName + ',' + str(PositionX) + ',' + str(PositionY) + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # GroupPositionSetpointGet :  Return setpoint positions
     def GroupPositionSetpointGet (self, socketId, GroupName, nbElement):
@@ -794,17 +800,7 @@ class XPS:
             command += 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupPositionTargetGet :  Return target positions
@@ -816,17 +812,7 @@ class XPS:
             command += 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupReferencingActionExecute :  Execute an action in referencing mode
@@ -845,15 +831,7 @@ class XPS:
     # GroupStatusGet :  Return group status
     def GroupStatusGet (self, socketId, GroupName):
         command = 'GroupStatusGet(' + GroupName + ',int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupStatusStringGet :  Return the group status string corresponding to the group status code
@@ -869,17 +847,7 @@ class XPS:
             command += 'double *'
         command += ')'
 
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(nbElement):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # KillAll :  Put all groups in 'Not initialized' state
@@ -889,17 +857,7 @@ class XPS:
     # PositionerAnalogTrackingPositionParametersGet :  Read dynamic parameters for one axe of a group for a future analog tracking position
     def PositionerAnalogTrackingPositionParametersGet (self, socketId, PositionerName):
         command = 'PositionerAnalogTrackingPositionParametersGet(' + PositionerName + ',char *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerAnalogTrackingPositionParametersSet :  Update dynamic parameters for one axe of a group for a future analog tracking position
     def PositionerAnalogTrackingPositionParametersSet (self, socketId, PositionerName, GPIOName, Offset, Scale, Velocity, Acceleration):
@@ -909,17 +867,7 @@ class XPS:
     # PositionerAnalogTrackingVelocityParametersGet :  Read dynamic parameters for one axe of a group for a future analog tracking velocity
     def PositionerAnalogTrackingVelocityParametersGet (self, socketId, PositionerName):
         command = 'PositionerAnalogTrackingVelocityParametersGet(' + PositionerName + ',char *,double *,double *,double *,int *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(6):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerAnalogTrackingVelocityParametersSet :  Update dynamic parameters for one axe of a group for a future analog tracking velocity
     def PositionerAnalogTrackingVelocityParametersSet (self, socketId, PositionerName, GPIOName, Offset, Scale, DeadBandThreshold, Order, Velocity, Acceleration):
@@ -929,17 +877,7 @@ class XPS:
     # PositionerBacklashGet :  Read backlash value and status
     def PositionerBacklashGet (self, socketId, PositionerName):
         command = 'PositionerBacklashGet(' + PositionerName + ',double *,char *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerBacklashSet :  Set backlash value
     def PositionerBacklashSet (self, socketId, PositionerName, BacklashValue):
@@ -962,17 +900,7 @@ class XPS:
     # PositionerCorrectorNotchFiltersGet :  Read filters parameters 
     def PositionerCorrectorNotchFiltersGet (self, socketId, PositionerName):
         command = 'PositionerCorrectorNotchFiltersGet(' + PositionerName + ',double *,double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(6):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerCorrectorPIDFFAccelerationSet :  Update corrector parameters
     def PositionerCorrectorPIDFFAccelerationSet (self, socketId, PositionerName, ClosedLoopStatus, KP, KI, KD, KS, IntegrationTime,
@@ -986,17 +914,7 @@ class XPS:
     # PositionerCorrectorPIDFFAccelerationGet :  Read corrector parameters
     def PositionerCorrectorPIDFFAccelerationGet (self, socketId, PositionerName):
         command = 'PositionerCorrectorPIDFFAccelerationGet(' + PositionerName + ',bool *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(12):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # PositionerCorrectorPIDFFVelocitySet :  Update corrector parameters
@@ -1009,17 +927,7 @@ class XPS:
     # PositionerCorrectorPIDFFVelocityGet :  Read corrector parameters
     def PositionerCorrectorPIDFFVelocityGet (self, socketId, PositionerName):
         command = 'PositionerCorrectorPIDFFVelocityGet(' + PositionerName + ',bool *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(12):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerCorrectorPIDDualFFVoltageSet :  Update corrector parameters
     def PositionerCorrectorPIDDualFFVoltageSet (self, socketId, PositionerName, ClosedLoopStatus, KP, KI, KD, KS, IntegrationTime, DerivativeFilterCutOffFrequency, GKP, GKI, GKD, KForm, FeedForwardGainVelocity, FeedForwardGainAcceleration, Friction):
@@ -1031,17 +939,7 @@ class XPS:
     # PositionerCorrectorPIDDualFFVoltageGet :  Read corrector parameters
     def PositionerCorrectorPIDDualFFVoltageGet (self, socketId, PositionerName):
         command = 'PositionerCorrectorPIDDualFFVoltageGet(' + PositionerName + ',bool *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(14):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerCorrectorPIPositionSet :  Update corrector parameters
     def PositionerCorrectorPIPositionSet (self, socketId, PositionerName, ClosedLoopStatus, KP, KI, IntegrationTime):
@@ -1051,17 +949,7 @@ class XPS:
     # PositionerCorrectorPIPositionGet :  Read corrector parameters
     def PositionerCorrectorPIPositionGet (self, socketId, PositionerName):
         command = 'PositionerCorrectorPIPositionGet(' + PositionerName + ',bool *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerCorrectorTypeGet :  Read corrector type
     def PositionerCorrectorTypeGet (self, socketId, PositionerName):
@@ -1070,17 +958,7 @@ class XPS:
     # PositionerCurrentVelocityAccelerationFiltersGet :  Get current velocity and acceleration cutoff frequencies
     def PositionerCurrentVelocityAccelerationFiltersGet (self, socketId, PositionerName):
         command = 'PositionerCurrentVelocityAccelerationFiltersGet(' + PositionerName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerCurrentVelocityAccelerationFiltersSet :  Set current velocity and acceleration cutoff frequencies
     def PositionerCurrentVelocityAccelerationFiltersSet (self, socketId, PositionerName, CurrentVelocityCutOffFrequency, CurrentAccelerationCutOffFrequency):
@@ -1090,17 +968,7 @@ class XPS:
     # PositionerDriverFiltersGet :  Get driver filters parameters
     def PositionerDriverFiltersGet (self, socketId, PositionerName):
         command = 'PositionerDriverFiltersGet(' + PositionerName + ',double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(5):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerDriverFiltersSet :  Set driver filters parameters
     def PositionerDriverFiltersSet (self, socketId, PositionerName, KI, NotchFrequency, NotchBandwidth, NotchGain, LowpassFrequency):
@@ -1110,30 +978,12 @@ class XPS:
     # PositionerDriverPositionOffsetsGet :  Get driver stage and gage position offset
     def PositionerDriverPositionOffsetsGet (self, socketId, PositionerName):
         command = 'PositionerDriverPositionOffsetsGet(' + PositionerName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerDriverStatusGet :  Read positioner driver status
     def PositionerDriverStatusGet (self, socketId, PositionerName):
         command = 'PositionerDriverStatusGet(' + PositionerName + ',int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # PositionerDriverStatusStringGet :  Return the positioner driver status string corresponding to the positioner error code
@@ -1144,58 +994,22 @@ class XPS:
     # PositionerEncoderAmplitudeValuesGet :  Read analog interpolated encoder amplitude values
     def PositionerEncoderAmplitudeValuesGet (self, socketId, PositionerName):
         command = 'PositionerEncoderAmplitudeValuesGet(' + PositionerName + ',double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerEncoderCalibrationParametersGet :  Read analog interpolated encoder calibration parameters
     def PositionerEncoderCalibrationParametersGet (self, socketId, PositionerName):
         command = 'PositionerEncoderCalibrationParametersGet(' + PositionerName + ',double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerErrorGet :  Read and clear positioner error code
     def PositionerErrorGet (self, socketId, PositionerName):
         command = 'PositionerErrorGet(' + PositionerName + ',int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerErrorRead :  Read only positioner error code without clear it
     def PositionerErrorRead (self, socketId, PositionerName):
         command = 'PositionerErrorRead(' + PositionerName + ',int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerErrorStringGet :  Return the positioner status string corresponding to the positioner error code
     def PositionerErrorStringGet (self, socketId, PositionerErrorCode):
@@ -1204,17 +1018,7 @@ class XPS:
     # PositionerExcitationSignalGet :  Read disturbing signal parameters
     def PositionerExcitationSignalGet (self, socketId, PositionerName):
         command = 'PositionerExcitationSignalGet(' + PositionerName + ',int *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerExcitationSignalSet :  Update disturbing signal parameters
     def PositionerExcitationSignalSet (self, socketId, PositionerName, Mode, Frequency, Amplitude, Time):
@@ -1224,28 +1028,12 @@ class XPS:
     # PositionerExternalLatchPositionGet :  Read external latch position
     def PositionerExternalLatchPositionGet (self, socketId, PositionerName):
         command = 'PositionerExternalLatchPositionGet(' + PositionerName + ',double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerHardwareStatusGet :  Read positioner hardware status
     def PositionerHardwareStatusGet (self, socketId, PositionerName):
         command = 'PositionerHardwareStatusGet(' + PositionerName + ',int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerHardwareStatusStringGet :  Return the positioner hardware status string corresponding to the positioner error code
     def PositionerHardwareStatusStringGet (self, socketId, PositionerHardwareStatus):
@@ -1254,15 +1042,7 @@ class XPS:
     # PositionerHardInterpolatorFactorGet :  Get hard interpolator parameters
     def PositionerHardInterpolatorFactorGet (self, socketId, PositionerName):
         command = 'PositionerHardInterpolatorFactorGet(' + PositionerName + ',int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerHardInterpolatorFactorSet :  Set hard interpolator parameters
     def PositionerHardInterpolatorFactorSet (self, socketId, PositionerName, InterpolationFactor):
@@ -1272,32 +1052,12 @@ class XPS:
     # PositionerMaximumVelocityAndAccelerationGet :  Return maximum velocity and acceleration of the positioner
     def PositionerMaximumVelocityAndAccelerationGet (self, socketId, PositionerName):
         command = 'PositionerMaximumVelocityAndAccelerationGet(' + PositionerName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerMotionDoneGet :  Read motion done parameters
     def PositionerMotionDoneGet (self, socketId, PositionerName):
         command = 'PositionerMotionDoneGet(' + PositionerName + ',double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(5):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerMotionDoneSet :  Update motion done parameters
     def PositionerMotionDoneSet (self, socketId, PositionerName, PositionWindow, VelocityWindow, CheckingTime, MeanPeriod, TimeOut):
@@ -1312,17 +1072,7 @@ class XPS:
     # PositionerPositionCompareAquadBWindowedGet :  Read position compare AquadB windowed parameters
     def PositionerPositionCompareAquadBWindowedGet (self, socketId, PositionerName):
         command = 'PositionerPositionCompareAquadBWindowedGet(' + PositionerName + ',double *,double *,bool *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(3):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerPositionCompareAquadBWindowedSet :  Set position compare AquadB windowed parameters
     def PositionerPositionCompareAquadBWindowedSet (self, socketId, PositionerName, MinimumPosition, MaximumPosition):
@@ -1332,17 +1082,7 @@ class XPS:
     # PositionerPositionCompareGet :  Read position compare parameters
     def PositionerPositionCompareGet (self, socketId, PositionerName):
         command = 'PositionerPositionCompareGet(' + PositionerName + ',double *,double *,double *,bool *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerPositionCompareSet :  Set position compare parameters
     def PositionerPositionCompareSet (self, socketId, PositionerName, MinimumPosition, MaximumPosition, PositionStep):
@@ -1362,17 +1102,7 @@ class XPS:
     # PositionerPositionComparePulseParametersGet :  Get position compare PCO pulse parameters
     def PositionerPositionComparePulseParametersGet (self, socketId, PositionerName):
         command = 'PositionerPositionComparePulseParametersGet(' + PositionerName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerPositionComparePulseParametersSet :  Set position compare PCO pulse parameters
     def PositionerPositionComparePulseParametersSet (self, socketId, PositionerName, PCOPulseWidth, EncoderSettlingTime):
@@ -1382,56 +1112,22 @@ class XPS:
     # PositionerRawEncoderPositionGet :  Get the raw encoder position
     def PositionerRawEncoderPositionGet (self, socketId, PositionerName, UserEncoderPosition):
         command = 'PositionerRawEncoderPositionGet(' + PositionerName + ',' + str(UserEncoderPosition) + ',double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionersEncoderIndexDifferenceGet :  Return the difference between index of primary axis and secondary axis (only after homesearch)
     def PositionersEncoderIndexDifferenceGet (self, socketId, PositionerName):
         command = 'PositionersEncoderIndexDifferenceGet(' + PositionerName + ',double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerSGammaExactVelocityAjustedDisplacementGet :  Return adjusted displacement to get exact velocity
     def PositionerSGammaExactVelocityAjustedDisplacementGet (self, socketId, PositionerName, DesiredDisplacement):
         command = 'PositionerSGammaExactVelocityAjustedDisplacementGet(' + PositionerName + ',' + str(DesiredDisplacement) + ',double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerSGammaParametersGet :  Read dynamic parameters for one axe of a group for a future displacement 
     def PositionerSGammaParametersGet (self, socketId, PositionerName):
         command = 'PositionerSGammaParametersGet(' + PositionerName + ',double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerSGammaParametersSet :  Update dynamic parameters for one axe of a group for a future displacement
     def PositionerSGammaParametersSet (self, socketId, PositionerName, Velocity, Acceleration, MinimumTjerkTime, MaximumTjerkTime):
@@ -1441,17 +1137,7 @@ class XPS:
     # PositionerSGammaPreviousMotionTimesGet :  Read SettingTime and SettlingTime
     def PositionerSGammaPreviousMotionTimesGet (self, socketId, PositionerName):
         command = 'PositionerSGammaPreviousMotionTimesGet(' + PositionerName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerStageParameterGet :  Return the stage parameter
     def PositionerStageParameterGet (self, socketId, PositionerName, ParameterName):
@@ -1466,17 +1152,7 @@ class XPS:
     # PositionerTimeFlasherGet :  Read time flasher parameters
     def PositionerTimeFlasherGet (self, socketId, PositionerName):
         command = 'PositionerTimeFlasherGet(' + PositionerName + ',double *,double *,double *,bool *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerTimeFlasherSet :  Set time flasher parameters
     def PositionerTimeFlasherSet (self, socketId, PositionerName, MinimumPosition, MaximumPosition, TimeInterval):
@@ -1494,17 +1170,7 @@ class XPS:
     # PositionerUserTravelLimitsGet :  Read UserMinimumTarget and UserMaximumTarget
     def PositionerUserTravelLimitsGet (self, socketId, PositionerName):
         command = 'PositionerUserTravelLimitsGet(' + PositionerName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # PositionerUserTravelLimitsSet :  Update UserMinimumTarget and UserMaximumTarget
@@ -1515,17 +1181,7 @@ class XPS:
     # PositionerDACOffsetGet :  Get DAC offsets
     def PositionerDACOffsetGet (self, socketId, PositionerName):
         command = 'PositionerDACOffsetGet(' + PositionerName + ',short *,short *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerDACOffsetSet :  Set DAC offsets
     def PositionerDACOffsetSet (self, socketId, PositionerName, DACOffset1, DACOffset2):
@@ -1535,17 +1191,7 @@ class XPS:
     # PositionerDACOffsetDualGet :  Get dual DAC offsets
     def PositionerDACOffsetDualGet (self, socketId, PositionerName):
         command = 'PositionerDACOffsetDualGet(' + PositionerName + ',short *,short *,short *,short *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # PositionerDACOffsetDualSet :  Set dual DAC offsets
@@ -1556,30 +1202,12 @@ class XPS:
     # PositionerCorrectorAutoTuning :  Astrom&Hagglund based auto-tuning
     def PositionerCorrectorAutoTuning (self, socketId, PositionerName, TuningMode):
         command = 'PositionerCorrectorAutoTuning(' + PositionerName + ',' + str(TuningMode) + ',double *,double *,double *)'
-        return self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(3):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # PositionerAccelerationAutoScaling :  Astrom&Hagglund based auto-scaling
     def PositionerAccelerationAutoScaling (self, socketId, PositionerName):
         command = 'PositionerAccelerationAutoScaling(' + PositionerName + ',double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # MultipleAxesPVTVerification :  Multiple axes PVT trajectory verification
     def MultipleAxesPVTVerification (self, socketId, GroupName, TrajectoryFileName):
@@ -1589,17 +1217,7 @@ class XPS:
     # MultipleAxesPVTVerificationResultGet :  Multiple axes PVT trajectory verification result get
     def MultipleAxesPVTVerificationResultGet (self, socketId, PositionerName):
         command = 'MultipleAxesPVTVerificationResultGet(' + PositionerName + ',char *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # MultipleAxesPVTExecution :  Multiple axes PVT trajectory execution
     def MultipleAxesPVTExecution (self, socketId, GroupName, TrajectoryFileName, ExecutionNumber):
@@ -1609,15 +1227,7 @@ class XPS:
     # MultipleAxesPVTParametersGet :  Multiple axes PVT trajectory get parameters
     def MultipleAxesPVTParametersGet (self, socketId, GroupName):
         command = 'MultipleAxesPVTParametersGet(' + GroupName + ',char *,int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # MultipleAxesPVTPulseOutputSet :  Configure pulse output on trajectory
     def MultipleAxesPVTPulseOutputSet (self, socketId, GroupName, StartElement, EndElement, TimeInterval):
@@ -1627,17 +1237,7 @@ class XPS:
     # MultipleAxesPVTPulseOutputGet :  Get pulse output on trajectory configuration
     def MultipleAxesPVTPulseOutputGet (self, socketId, GroupName):
         command = 'MultipleAxesPVTPulseOutputGet(' + GroupName + ',int *,int *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(3):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # SingleAxisSlaveModeEnable :  Enable the slave mode
     def SingleAxisSlaveModeEnable (self, socketId, GroupName):
@@ -1655,15 +1255,7 @@ class XPS:
     # SingleAxisSlaveParametersGet :  Get slave parameters
     def SingleAxisSlaveParametersGet (self, socketId, GroupName):
         command = 'SingleAxisSlaveParametersGet(' + GroupName + ',char *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # SpindleSlaveModeEnable :  Enable the slave mode
     def SpindleSlaveModeEnable (self, socketId, GroupName):
@@ -1681,15 +1273,7 @@ class XPS:
     # SpindleSlaveParametersGet :  Get slave parameters
     def SpindleSlaveParametersGet (self, socketId, GroupName):
         command = 'SpindleSlaveParametersGet(' + GroupName + ',char *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-            j += 1
-        retList.append(eval(returnedString[i:i+j]))
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # GroupSpinParametersSet :  Modify Spin parameters on selected group and activate the continuous move
     def GroupSpinParametersSet (self, socketId, GroupName, Velocity, Acceleration):
@@ -1699,33 +1283,13 @@ class XPS:
     # GroupSpinParametersGet :  Get Spin parameters on selected group
     def GroupSpinParametersGet (self, socketId, GroupName):
         command = 'GroupSpinParametersGet(' + GroupName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
 
     # GroupSpinCurrentGet :  Get Spin current on selected group
     def GroupSpinCurrentGet (self, socketId, GroupName):
         command = 'GroupSpinCurrentGet(' + GroupName + ',double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # GroupSpinModeStop :  Stop Spin mode on selected group with specified acceleration
     def GroupSpinModeStop (self, socketId, GroupName, Acceleration):
@@ -1740,17 +1304,7 @@ class XPS:
     # XYLineArcVerificationResultGet :  XY trajectory verification result get
     def XYLineArcVerificationResultGet (self, socketId, PositionerName):
         command = 'XYLineArcVerificationResultGet(' + PositionerName + ',char *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # XYLineArcExecution :  XY trajectory execution
     def XYLineArcExecution (self, socketId, GroupName, TrajectoryFileName, Velocity, Acceleration, ExecutionNumber):
@@ -1761,17 +1315,7 @@ class XPS:
     # XYLineArcParametersGet :  XY trajectory get parameters
     def XYLineArcParametersGet (self, socketId, GroupName):
         command = 'XYLineArcParametersGet(' + GroupName + ',char *,double *,double *,int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(3):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # XYLineArcPulseOutputSet :  Configure pulse output on trajectory
     def XYLineArcPulseOutputSet (self, socketId, GroupName, StartLength, EndLength, PathLengthInterval):
@@ -1781,32 +1325,12 @@ class XPS:
     # XYLineArcPulseOutputGet :  Get pulse output on trajectory configuration
     def XYLineArcPulseOutputGet (self, socketId, GroupName):
         command = 'XYLineArcPulseOutputGet(' + GroupName + ',double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(3):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # XYZGroupPositionCorrectedProfilerGet :  Return corrected profiler positions
     def XYZGroupPositionCorrectedProfilerGet (self, socketId, GroupName, PositionX, PositionY, PositionZ):
         command = 'XYZGroupPositionCorrectedProfilerGet(' + GroupName + ',' + str(PositionX) + ',' + str(PositionY) + ',' + str(PositionZ) + ',double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(3):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
     
     # XYZSplineVerification :  XYZ trajectory verifivation
     def XYZSplineVerification (self, socketId, GroupName, TrajectoryFileName):
@@ -1816,17 +1340,7 @@ class XPS:
     # XYZSplineVerificationResultGet :  XYZ trajectory verification result get
     def XYZSplineVerificationResultGet (self, socketId, PositionerName):
         command = 'XYZSplineVerificationResultGet(' + PositionerName + ',char *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(4):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # XYZSplineExecution :  XYZ trajectory execution
     def XYZSplineExecution (self, socketId, GroupName, TrajectoryFileName, Velocity, Acceleration):
@@ -1836,17 +1350,7 @@ class XPS:
     # XYZSplineParametersGet :  XYZ trajectory get parameters
     def XYZSplineParametersGet (self, socketId, GroupName):
         command = 'XYZSplineParametersGet(' + GroupName + ',char *,double *,double *,int *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(3):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # OptionalModuleExecute :  Execute an optional module
     def OptionalModuleExecute (self, socketId, ModuleFileName, TaskName):
@@ -1876,32 +1380,12 @@ class XPS:
     # CPUCoreAndBoardSupplyVoltagesGet :  Get power informations
     def CPUCoreAndBoardSupplyVoltagesGet (self, socketId):
         command = 'CPUCoreAndBoardSupplyVoltagesGet(double *,double *,double *,double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(8):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # CPUTemperatureAndFanSpeedGet :  Get CPU temperature and fan speed
     def CPUTemperatureAndFanSpeedGet (self, socketId):
         command = 'CPUTemperatureAndFanSpeedGet(double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(2):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # ActionListGet :  Action list
     def ActionListGet (self, socketId):
@@ -1982,32 +1466,12 @@ class XPS:
     # GatheringUserDatasGet :  Return user data values
     def GatheringUserDatasGet (self, socketId):
         command = 'GatheringUserDatasGet(double *,double *,double *,double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(8):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # ControllerMotionKernelPeriodMinMaxGet :  Get controller motion kernel min/max periods
     def ControllerMotionKernelPeriodMinMaxGet (self, socketId):
         command = 'ControllerMotionKernelPeriodMinMaxGet(double *,double *,double *,double *,double *,double *)'
-        error, returnedString = self.Send(socketId, command)
-        if (error != 0):
-            return [error, returnedString]
-
-        i, j, retList = 0, 0, [error]
-        for paramNb in range(6):
-            while ((i+j) < len(returnedString) and returnedString[i+j] != ','):
-                j += 1
-            retList.append(eval(returnedString[i:i+j]))
-            i, j = i+j+1, 0
-        return retList
+        return self.SendAndParse(socketId, command)
 
     # ControllerMotionKernelPeriodMinMaxReset :  Reset controller motion kernel min/max periods
     def ControllerMotionKernelPeriodMinMaxReset (self, socketId):
@@ -0,0 +1,98 @@
+# -*- coding: utf8 -*-
+# SXRD_Collect - GUI program for collection single crystal X-ray diffraction data
+# Copyright (C) 2015  Clemens Prescher (clemens.prescher@gmail.com)
+# GSECARS, University of Chicago
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+__author__ = 'Clemens Prescher'
+
+import time
+import socket
+import logging
+from threading import RLock
+from contextlib import contextmanager
+
+from .xps_trajectory import XPSTrajectory
+from .XPS_C8_drivers import XPSException
+
+logger = logging.getLogger(__name__)
+
+
+class XPSSession(object):
+    """
+    Long-lived connection to the XPS which is shared by all scans of a collection. The underlying XPSTrajectory is
+    only created (socket, login, group re-enable and event cleanup) on first use or when the connection turned out
+    to be broken, instead of once per scan.
+    """
+
+    def __init__(self, host=None, group=None, positioners=None, reconnect_attempts=3, reconnect_delay=1.0,
+                 port=None, ftp_port=None):
+        self.host = host
+        self.port = port
+        self.ftp_port = ftp_port
+        self.group = group
+        self.positioners = positioners
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+
+        self._trajectory = None
+        self._lock = RLock()
+
+    def get_trajectory(self):
+        """
+        Returns the connected XPSTrajectory of this session. (Re)connects if there is no connection yet or the
+        current one does not answer anymore.
+        """
+        with self._lock:
+            if self._trajectory is not None and self._trajectory.is_connected():
+                return self._trajectory
+            self._reconnect()
+            return self._trajectory
+
+    @contextmanager
+    def borrow(self):
+        """
+        Context manager giving exclusive access to the session's XPSTrajectory. When the XPS connection fails
+        within the block, the session is closed and will be reestablished on the next borrow.
+        """
+        with self._lock:
+            t1 = time.time()
+            trajectory = self.get_trajectory()
+            logger.debug('XPS session ready after {:.3f} s.'.format(time.time() - t1))
+            try:
+                yield trajectory
+            except (XPSException, socket.error):
+                self.close()
+                raise
+
+    def close(self):
+        with self._lock:
+            if self._trajectory is not None:
+                self._trajectory.disconnect()
+            self._trajectory = None
+
+    def _reconnect(self):
+        self.close()
+        for attempt in range(self.reconnect_attempts):
+            t1 = time.time()
+            try:
+                self._trajectory = XPSTrajectory(host=self.host, group=self.group, positioners=self.positioners,
+                                                 port=self.port, ftp_port=self.ftp_port)
+                logger.info('Connected to XPS in {:.3f} s.'.format(time.time() - t1))
+                return
+            except (XPSException, socket.error) as e:
+                logger.warning('Connecting to XPS failed (attempt {}/{}): {}'.format(attempt + 1,
+                                                                                   self.reconnect_attempts, e))
+                time.sleep(self.reconnect_delay)
+        raise XPSException('Could not connect to XPS after {} attempts'.format(self.reconnect_attempts))
@@ -17,15 +17,23 @@
 #     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 __author__ = 'Clemens Prescher'
 
+import os
 import time
+import string
+import hashlib
 import numpy as np
 import ftplib
+from collections import OrderedDict
 from cStringIO import StringIO
-from .XPS_C8_drivers import XPS
+from .XPS_C8_drivers import XPS, XPSException
 from config import xps_config
+from timing import span
 
 import logging
-logger = logging.getLevelName(__name__)
+logger = logging.getLogger(__name__)
+
+TRAJECTORY_FILE_PREFIX = 'traj_'
+GATHER_SEPARATORS = string.maketrans(';\r\t', '   ')
 
 
 class XPSTrajectory(object):
@@ -38,8 +46,10 @@ class XPSTrajectory(object):
 
     def __init__(self, host=None, user=None, passwd=None,
                  group=None, positioners=None, mode=None, type=None,
-                 default_accel=[]):
+                 default_accel=[], port=None, ftp_port=None):
         self.host = host or xps_config['HOST']
+        self.port = port or xps_config['PORT']
+        self.ftp_port = ftp_port or xps_config['FTP PORT']
         self.user = user or xps_config['USER']
         self.passwd = passwd or xps_config['PASSWORD']
         self.group_name = group or xps_config['GROUP NAME']
@@ -53,29 +63,87 @@ class XPSTrajectory(object):
                 gout.append('%s.%s.%s' % (self.group_name, pname, out))
                 gtit.append('%s.%s' % (pname, out))
         self.gather_outputs = gout
+        self.gather_columns = gtit
         self.gather_titles = "%s\n#%s\n" % (xps_config['GATHER TITLES'],
                                             "  ".join(gtit))
 
         # self.gather_titles  = "%s %s\n" % " ".join(gtit)
 
         self.xps = XPS()
-        self.ssid = self.xps.TCP_ConnectToServer(self.host, xps_config['PORT'], xps_config['TIMEOUT'])
-        ret = self.xps.Login(self.ssid, self.user, self.passwd)
+        self.ssid = -1
+        self.batch_ssid = -1
         self.trajectories = {}
 
         self.ftpconn = ftplib.FTP()
+        self.FTP_connected = False
+        # trajectory files uploaded or verified in this session, in order of their last use
+        self.uploaded_files = OrderedDict()
         self.nlines_out = 0
-
-        self.xps.GroupMotionDisable(self.ssid, self.group_name)
-        time.sleep(0.1)
-        self.xps.GroupMotionEnable(self.ssid, self.group_name)
-
-        for i in range(64):
-            self.xps.EventExtendedRemove(self.ssid, i)
+        self.gather_data = None
 
         self.create_templates()
         self.default_accel = default_accel
 
+        self.connect()
+
+    def connect(self):
+        """opens the socket to the XPS, logs in and brings the group into a clean state (motion enabled and no
+        extended events left over from previous scans). Sockets which were already opened are closed again when
+        this fails."""
+        try:
+            self.ssid = self.open_socket()
+            # second socket for commands which are sent concurrently with the ones on the main socket
+            # (see SendMultiple)
+            self.batch_ssid = self.open_socket()
+
+            self.xps.GroupMotionDisable(self.ssid, self.group_name)
+            time.sleep(0.1)
+            self.xps.GroupMotionEnable(self.ssid, self.group_name)
+
+            self.xps.SendMultiple([(self.ssid, ['EventExtendedRemove(%i)' % i for i in range(64)])],
+                                  pipelined=xps_config['PIPELINE COMMANDS'])
+        except Exception:
+            self.disconnect()
+            raise
+
+    def open_socket(self):
+        """opens and logs in a socket to the XPS and returns its ID"""
+        socket_id = self.xps.TCP_ConnectToServer(self.host, self.port, xps_config['TIMEOUT'])
+        if socket_id < 0:
+            raise XPSException('Could not connect to XPS at %s' % self.host)
+        try:
+            error, _ = self.xps.Login(socket_id, self.user, self.passwd)
+            if error != 0:
+                raise XPSException('Login to XPS at %s failed with error %s' % (self.host, error))
+        except Exception:
+            self.xps.TCP_CloseSocket(socket_id)
+            raise
+        return socket_id
+
+    def disconnect(self):
+        if self.FTP_connected:
+            self.ftp_disconnect()
+        if self.batch_ssid >= 0:
+            self.xps.TCP_CloseSocket(self.batch_ssid)
+        if self.ssid >= 0:
+            self.xps.TCP_CloseSocket(self.ssid)
+        self.ssid = -1
+        self.batch_ssid = -1
+
+    def is_connected(self):
+        """checks with a cheap round trip on each of the two sockets whether the connection to the XPS is still
+        usable"""
+        if self.ssid < 0 or self.batch_ssid < 0:
+            return False
+        try:
+            for socket_id in (self.ssid, self.batch_ssid):
+                error, _ = self.xps.FirmwareVersionGet(socket_id)
+                if error != 0:
+                    return False
+        except (XPSException, KeyError):
+            return False
+        return True
+
     def create_templates(self):
         self.ramp_template = "%(ramptime)f"
         self.move_template = "%(scantime)f"
@@ -87,7 +155,7 @@ class XPSTrajectory(object):
             self.down_template += ", %({0}ramp)f, %({0}zero)f".format(positioner)
 
     def ftp_connect(self):
-        self.ftpconn.connect(self.host)
+        self.ftpconn.connect(self.host, self.ftp_port)
         self.ftpconn.login(self.user, self.passwd)
         self.FTP_connected = True
 
@@ -96,13 +164,72 @@ class XPSTrajectory(object):
         self.ftpconn.close()
         self.FTP_connected = False
 
-    def upload_trajectory_file(self, fname, data):
-        self.ftp_connect()
-        self.ftpconn.cwd(xps_config['TRAJ_FOLDER'])
+    def upload_trajectory(self, data):
+        """
+        Uploads trajectory data to a file named after the MD5 hash of its content. The upload is skipped if the file
+        was already uploaded in this session or exists on the XPS with the right size. The FTP connection is kept
+        open for subsequent uploads.
+        :return: name of the trajectory file on the XPS
+        """
+        fname = TRAJECTORY_FILE_PREFIX + hashlib.md5(data).hexdigest() + '.trj'
+        if fname in self.uploaded_files:
+            self.uploaded_files[fname] = self.uploaded_files.pop(fname)
+            logger.debug('Trajectory {} is already on the XPS.'.format(fname))
+            return fname
+
+        try:
+            self._upload_if_missing(fname, data)
+        except ftplib.all_errors:
+            # the server might have closed the idle connection, try once more with a new one
+            self.ftp_disconnect()
+            self._upload_if_missing(fname, data)
+
+        self.uploaded_files[fname] = len(data)
+        self.evict_trajectory_files()
+        return fname
+
+    def _upload_if_missing(self, fname, data):
+        if not self.FTP_connected:
+            self.ftp_connect()
+            self.ftpconn.cwd(xps_config['TRAJ_FOLDER'])
+            self.ftpconn.voidcmd('TYPE I')
+
+        try:
+            if self.ftpconn.size(fname) == len(data):
+                logger.info('Trajectory {} found on the XPS.'.format(fname))
+                return
+        except ftplib.error_perm:
+            pass  # file does not exist or SIZE is not supported
+
+        t1 = time.time()
         self.ftpconn.storbinary('STOR %s' % fname, StringIO(data))
-        self.ftp_disconnect()
-        #print 'Uploaded trajectory ', fname
-        #print data
+        logger.info('Trajectory {} uploaded in {:.3f} s.'.format(fname, time.time() - t1))
+
+    def evict_trajectory_files(self, cache_size=None):
+        """
+        Deletes content named trajectory files on the XPS when there are more than cache_size of them. Files not
+        used in this session are deleted first, then the least recently used ones.
+        """
+        if cache_size is None:
+            cache_size = xps_config['TRAJECTORY CACHE SIZE']
+        try:
+            fnames = [fname for fname in self.ftpconn.nlst() if fname.startswith(TRAJECTORY_FILE_PREFIX)]
+        except ftplib.all_errors as e:
+            logger.warning('Could not list trajectory files: {}'.format(e))
+            return
+
+        num_evict = len(fnames) - cache_size
+        if num_evict <= 0:
+            return
+        stale = [fname for fname in fnames if fname not in self.uploaded_files]
+        stale += [fname for fname in self.uploaded_files if fname in fnames][:-1]
+        for fname in stale[:num_evict]:
+            try:
+                self.ftpconn.delete(fname)
+                self.uploaded_files.pop(fname, None)
+                logger.debug('Deleted trajectory file {}'.format(fname))
+            except ftplib.all_errors as e:
+                logger.warning('Could not delete trajectory file {}: {}'.format(fname, e))
 
     def define_line_trajectories_general(self, name='default',
                                          start_values=None,
@@ -120,13 +247,7 @@ class XPSTrajectory(object):
         else:
             stop_values = np.array(stop_values)
 
-        if accel_values is None:
-            accel_values = []
-            for positioner in self.positioners:
-                response = self.xps.PositionerMaximumVelocityAndAccelerationGet(self.ssid,
-                                                                                self.group_name + '.' + positioner)
-                accel_values.append(response[2] / 3.0)
-        accel_values = np.array(accel_values)
+        accel_values = self.get_accel_values(accel_values)
 
         distances = []
         velocities = []
@@ -173,36 +294,122 @@ class XPSTrajectory(object):
         for ind, positioner in enumerate(self.positioners):
             self.trajectories[name][positioner + 'ramp'] = ramp[ind]
 
-        ret = False
+        self.store_trajectory_file(name, trajectory_str)
+        return trajectory_str
+
+    def store_trajectory_file(self, name, trajectory_str):
+        """
+        uploads the trajectory through the content cache and remembers the file name for running it. Raises an
+        XPSException when the upload fails, otherwise an outdated trajectory file on the XPS could be run.
+        """
         try:
-            self.upload_trajectory_file(name + '.trj', trajectory_str)
-            ret = True
-            logger.info('Trajectory File uploaded.')
-        except:
-            pass
+            with span('trajectory upload'):
+                self.trajectories[name]['file'] = self.upload_trajectory(trajectory_str)
+        except ftplib.all_errors as e:
+            raise XPSException('Uploading trajectory {} failed: {}'.format(name, e))
+
+    def get_accel_values(self, accel_values=None):
+        """returns the given accelerations as array, or a third of the maximum accelerations of all positioners
+        stored in the XPS"""
+        if accel_values is None:
+            accel_values = []
+            for positioner in self.positioners:
+                response = self.xps.PositionerMaximumVelocityAndAccelerationGet(self.ssid,
+                                                                                self.group_name + '.' + positioner)
+                accel_values.append(response[2] / 3.0)
+        return np.array(accel_values)
+
+    def define_step_trajectory(self, name='default', step_values=None, num_steps=1, accel_values=None,
+                               exposure_time=1.0, dwell_time=3.0):
+        """
+        Defines a single PVT trajectory performing num_steps consecutive steps of step_values. Every step is
+        scanned with constant velocity during exposure_time. Between two steps the stage decelerates, returns by
+        the ramp distances and accelerates again within dwell_time, which gives the detector the time to read out.
+        One trajectory pulse is emitted at the start of each constant velocity element, i.e. for every frame.
+
+        :param step_values:
+            relative displacement of each positioner per step
+        :param num_steps:
+            number of steps (frames) in the trajectory
+        :param exposure_time:
+            time in seconds for the constant velocity part of one step
+        :param dwell_time:
+            time in seconds between the end of one step and the start of the next one, has to be larger than the
+            detector readout time
+        :return: trajectory string
+        """
+        if step_values is None:
+            step_values = np.zeros(len(self.positioners))
+        step_values = np.array(step_values) * 1.0
+        accel_values = self.get_accel_values(accel_values)
+
+        velocities = step_values / exposure_time
+        ramp_time = np.max(abs(velocities / accel_values))
+        ramp = 0.5 * velocities * ramp_time
+
+        ramp_attr = {'ramptime': ramp_time}
+        move_attr = {'scantime': exposure_time}
+        down_attr = {'ramptime': ramp_time}
+        dwell_attr = {'scantime': dwell_time}
+        for ind, positioner in enumerate(self.positioners):
+            ramp_attr[positioner + 'ramp'] = ramp[ind]
+            ramp_attr[positioner + 'velo'] = velocities[ind]
+            move_attr[positioner + 'dist'] = step_values[ind]
+            move_attr[positioner + 'velo'] = velocities[ind]
+            down_attr[positioner + 'ramp'] = ramp[ind]
+            down_attr[positioner + 'zero'] = 0
+            dwell_attr[positioner + 'dist'] = -2 * ramp[ind]
+            dwell_attr[positioner + 'velo'] = 0
+
+        step_strings = [self.ramp_template % ramp_attr,
+                        self.move_template % move_attr,
+                        self.down_template % down_attr]
+        dwell_string = self.move_template % dwell_attr
+
+        trajectory_lines = []
+        for step in range(num_steps):
+            if step > 0:
+                trajectory_lines.append(dwell_string)
+            trajectory_lines.extend(step_strings)
+        trajectory_str = '\n'.join(trajectory_lines) + '\n'
+
+        # every step consists of 4 elements (ramp, move, down, dwell) and the first move is element 2
+        self.trajectories[name] = {'pulse_time': 2 * ramp_time + exposure_time + dwell_time,
+                                   'pulse_start': 2,
+                                   'pulse_end': 4 * (num_steps - 1) + 2,
+                                   'step_number': len(trajectory_lines)}
+        for ind, positioner in enumerate(self.positioners):
+            self.trajectories[name][positioner + 'ramp'] = ramp[ind]
+
+        self.store_trajectory_file(name, trajectory_str)
         return trajectory_str
 
     def run_line_trajectory_general(self, name='default', verbose=False, save=True,
-                                    outfile='Gather.dat'):
-        """run trajectory in PVT mode"""
+                                    outfile='Gather.npz', move_to_start=True, move_back=True):
+        """run trajectory in PVT mode
+        :param move_to_start:
+            moves back by the ramp distances before the trajectory is run. Can be disabled when the stage is already
+            in position, e.g. after move_to_next_start.
+        :param move_back:
+            moves back by the ramp distances after the trajectory to end at the nominal stop position.
+        """
         traj = self.trajectories.get(name, None)
         if traj is None:
             logger.error('Cannot find trajectory named %s' % name)
             return
 
-        traj_file = '%s.trj' % name
+        traj_file = traj['file']
         dtime = traj['pulse_time']
-        ramps = []
-        for positioner in self.positioners:
-            ramps.append(-traj[positioner + 'ramp'])
-        ramps = np.array(ramps)
+        ramps = self.get_ramps(name)
 
         try:
             step_number = traj['step_number']
         except KeyError:
             step_number = 1
 
-        self.xps.GroupMoveRelative(self.ssid, self.group_name, ramps)
+        if move_to_start:
+            with span('ramp move'):
+                self.xps.GroupMoveRelative(self.ssid, self.group_name, ramps)
 
         self.gather_outputs = []
         gather_titles = []
@@ -211,39 +418,77 @@ class XPSTrajectory(object):
             for out in xps_config['GATHER OUTPUTS']:
                 self.gather_outputs.append('%s.%s.%s' % (self.group_name, positioner, out))
                 gather_titles.append('%s.%s' % (positioner, out))
+        self.gather_columns = gather_titles
         self.gather_titles = "%s\n#%s\n" % (xps_config['GATHER TITLES'],
                                             "  ".join(gather_titles))
 
-        self.xps.GatheringReset(self.ssid)
-        self.xps.GatheringConfigurationSet(self.ssid, self.gather_outputs)
+        with span('trajectory arming'):
+            eventID = self.arm_trajectory(traj_file, traj.get('pulse_start', 2),
+                                          traj.get('pulse_end', step_number + 1), dtime)
 
-        ret = self.xps.MultipleAxesPVTPulseOutputSet(self.ssid, self.group_name,
-                                                     2, step_number + 1, dtime)
-        ret = self.xps.MultipleAxesPVTVerification(self.ssid, self.group_name, traj_file)
-
-        buffer = ('Always', self.group_name + '.PVT.TrajectoryPulse')
-        o = self.xps.EventExtendedConfigurationTriggerSet(self.ssid, buffer,
-                                                          ('0', '0'), ('0', '0'),
-                                                          ('0', '0'), ('0', '0'))
-
-        o = self.xps.EventExtendedConfigurationActionSet(self.ssid, ('GatheringOneData',),
-                                                         ('',), ('',), ('',), ('',))
-
-        eventID, m = self.xps.EventExtendedStart(self.ssid)
-
-        ret = self.xps.MultipleAxesPVTExecution(self.ssid, self.group_name, traj_file, 1)
+        with span('PVT execution'):
+            ret = self.xps.MultipleAxesPVTExecution(self.ssid, self.group_name, traj_file, 1)
         o = self.xps.EventExtendedRemove(self.ssid, eventID)
         o = self.xps.GatheringStop(self.ssid)
 
         npulses = 0
         if save:
-            npulses = self.save_results(outfile, verbose=verbose)
+            with span('gather save'):
+                npulses = self.save_results(outfile, verbose=verbose)
 
-        self.xps.GroupMoveRelative(self.ssid, self.group_name, ramps)
+        if move_back:
+            with span('return move'):
+                self.xps.GroupMoveRelative(self.ssid, self.group_name, ramps)
         return npulses
 
+    def arm_trajectory(self, traj_file, pulse_start, pulse_end, pulse_time):
+        """
+        Configures gathering, trajectory pulses and the gathering event and verifies the trajectory. The gathering and
+        event commands are sent on the main socket while the pulse output and verification run concurrently on the
+        batch socket, all pipelined within a single round trip.
+        :return: ID of the started extended event
+        """
+        t1 = time.time()
+        gathering_event_commands = [
+            'GatheringReset()',
+            'GatheringConfigurationSet(%s)' % ','.join(self.gather_outputs),
+            'EventExtendedConfigurationTriggerSet(Always,0,0,0,0,%s.PVT.TrajectoryPulse,0,0,0,0)' % self.group_name,
+            'EventExtendedConfigurationActionSet(GatheringOneData,,,,)',
+            'EventExtendedStart(int *)']
+        trajectory_commands = [
+            'MultipleAxesPVTPulseOutputSet(%s,%s,%s,%s)' % (self.group_name, pulse_start, pulse_end, pulse_time),
+            'MultipleAxesPVTVerification(%s,%s)' % (self.group_name, traj_file)]
+
+        replies = self.xps.SendMultiple([(self.ssid, gathering_event_commands),
+                                         (self.batch_ssid, trajectory_commands)],
+                                        pipelined=xps_config['PIPELINE COMMANDS'])
+
+        for command, reply in zip(gathering_event_commands + trajectory_commands, replies[0] + replies[1]):
+            if reply[0] != 0:
+                logger.error('XPS command {} failed with error {}'.format(command, reply[0]))
+        logger.debug('Trajectory armed in {:.3f} s.'.format(time.time() - t1))
+        return replies[0][-1][1]
+
+    def get_ramps(self, name='default'):
+        """returns the relative move from the nominal start position to the start of the acceleration ramp"""
+        traj = self.trajectories[name]
+        return np.array([-traj[positioner + 'ramp'] for positioner in self.positioners])
+
+    def move_to_next_start(self, name='default'):
+        """
+        Moves from the end of a trajectory run with move_back=False to the start of the next run of the same
+        trajectory, i.e. combines the return move of the last run with the ramp move of the next one.
+        """
+        with span('ramp move'):
+            self.xps.GroupMoveRelative(self.ssid, self.group_name, 2 * self.get_ramps(name))
+
+    def move_to_stop(self, name='default'):
+        """moves from the end of a trajectory run with move_back=False to the nominal stop position"""
+        with span('return move'):
+            self.xps.GroupMoveRelative(self.ssid, self.group_name, self.get_ramps(name))
+
     def save_results(self, filename, verbose=False):
-        """read gathering data from XPS
+        """read gathering data from XPS and save it as binary .npz file (see save_gathering_data)
         """
         # self.xps.GatheringStop(self.ssid)
         # db = debugtime()
@@ -253,55 +498,79 @@ class XPSTrajectory(object):
             counter += 1
             time.sleep(1.50)
             ret, npulses, nx = self.xps.GatheringCurrentNumberGet(self.ssid)
-            print('Had to do repeat XPS Gathering: ', ret, npulses, nx)
-
-        # db.add(' Will Save %i pulses , ret=%i ' % (npulses, ret))
-        ret, buff = self.xps.GatheringDataMultipleLinesGet(self.ssid, 0, npulses)
-        # db.add('MLGet ret=%i, buff_len = %i ' % (ret, len(buff)))
-
-        if ret < 0:  # gathering too long: need to read in chunks
-            print('Need to read Data in Chunks!!!')  # how many chunks are needed??
-            Nchunks = 3
-            nx = int((npulses - 2) / Nchunks)
-            ret = 1
-            while True:
-                time.sleep(0.1)
-                ret, xbuff = self.xps.GatheringDataMultipleLinesGet(self.ssid, 0, nx)
-                if ret == 0:
-                    break
-                Nchunks = Nchunks + 2
-                nx = int((npulses - 2) / Nchunks)
-                if Nchunks > 10:
-                    print('looks like something is wrong with the XPS!')
-                    break
-            print(' -- will use %i Chunks for %i Pulses ' % (Nchunks, npulses))
-            # db.add(' Will use %i chunks ' % (Nchunks))
-            buff = [xbuff]
-            for i in range(1, Nchunks):
-                ret, xbuff = self.xps.GatheringDataMultipleLinesGet(self.ssid, i * nx, nx)
-                buff.append(xbuff)
-                # db.add('   chunk %i' % (i))
-            ret, xbuff = self.xps.GatheringDataMultipleLinesGet(self.ssid, Nchunks * nx,
-                                                                npulses - Nchunks * nx)
-            buff.append(xbuff)
-            buff = ''.join(buff)
-            # db.add('   chunk last')
-
-        obuff = buff[:]
-        for x in ';\r\t':
-            obuff = obuff.replace(x, ' ')
-        # db.add('  data fixed')
-        f = open(filename, 'w')
-        f.write(self.gather_titles)
-        f.write(obuff)
-        f.close()
-        nlines = len(obuff.split('\n')) - 1
+            logger.warning('Had to repeat reading the XPS gathering number: {}, {}, {}'.format(ret, npulses, nx))
+
+        data = self.read_gathering_data(npulses)
+        t1 = time.time()
+        if save_gathering_data(filename, data, self.gather_columns):
+            logger.debug('Gathering data {} saved in {:.3f} s.'.format(data.shape, time.time() - t1))
         if verbose:
-            print('Wrote %i lines, %i bytes to %s' % (nlines, len(buff), filename))
-        self.nlines_out = nlines
-        # db.show()
+            print('Wrote %i lines to %s' % (len(data), filename))
+        self.gather_data = data
+        self.nlines_out = len(data)
         return npulses
 
+    def read_gathering_data(self, npulses):
+        """
+        Reads npulses lines of gathering data in chunks which are guaranteed to fit into a single reply of the XPS
+        (see get_gathering_chunk_size) and fills them into a preallocated array with one row per pulse and one column
+        per gathering output.
+        """
+        num_columns = len(self.gather_outputs)
+        chunk_size = get_gathering_chunk_size(num_columns)
+        data = np.empty((npulses, num_columns))
+
+        t1 = time.time()
+        num_bytes = 0
+        for start in range(0, npulses, chunk_size):
+            num_lines = min(chunk_size, npulses - start)
+            ret, buff = self.xps.GatheringDataMultipleLinesGet(self.ssid, start, num_lines)
+            if ret != 0:
+                raise XPSException('Reading gathering lines {} to {} failed with error {}'.format(
+                    start, start + num_lines, ret))
+            data[start:start + num_lines] = parse_gathering_data(buff, num_columns)
+            num_bytes += len(buff)
+
+        duration = time.time() - t1
+        logger.info('Read {} gathering lines ({:.1f} kB) in {} chunks within {:.3f} s ({:.0f} kB/s).'.format(
+            npulses, num_bytes / 1024., -(-npulses // chunk_size), duration, num_bytes / 1024. / max(duration, 1e-6)))
+        return data
+
+
+def get_gathering_chunk_size(num_columns):
+    """
+    number of gathering lines which fit into one XPS reply, given by the reply limit of the controller and the
+    maximum number of bytes a value (including separator) can take
+    """
+    line_size = num_columns * xps_config['GATHER BYTES PER VALUE']
+    return max(1, xps_config['GATHER REPLY LIMIT'] // line_size)
+
+
+def parse_gathering_data(buff, num_columns):
+    """
+    converts the gathering buffer of the XPS (";" separated values, one line per pulse) into an array with one row
+    per pulse and one column per gathering output
+    """
+    data = np.fromstring(buff.translate(GATHER_SEPARATORS), sep=' ')
+    return data.reshape(-1, num_columns)
+
+
+def save_gathering_data(filename, data, columns):
+    """
+    saves gathering data as .npz file with the arrays "data" (one row per pulse) and "columns" (title of every column,
+    e.g. "OM.CurrentPosition"). The gathering data is only a by-product of a scan, a file which cannot be written is
+    logged as warning and False is returned.
+    """
+    try:
+        folder = os.path.dirname(filename)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        np.savez(filename, data=data, columns=np.array(columns))
+    except (IOError, OSError) as e:
+        logger.warning('Gathering data could not be saved to {}: {}'.format(filename, e))
+        return False
+    return True
+
 
 if __name__ == '__main__':
     pass